@@ -0,0 +1,184 @@
+"""
+Created: 18 Oct 2026
+Process-wide registry of MongoDB Atlas/Arctic connections, keyed by user and cluster, so that
+repeated reads and writes share one MongoClient connection pool rather than reconnecting
+"""
+import os
+import threading
+from time import time
+from typing import Dict, Tuple, Union
+
+from arctic import Arctic
+from arctic.chunkstore.chunkstore import ChunkStore
+from arctic.store.version_store import VersionStore
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError, ServerSelectionTimeoutError
+
+# Default keyword arguments passed to MongoClient, override with set_pool_options or with a
+# "pool_options" dict in the mongo config
+POOL_OPTIONS = {
+    "maxPoolSize": 50,
+    "minPoolSize": 0,
+    "maxIdleTimeMS": 5 * 60 * 1000,
+    "serverSelectionTimeoutMS": 30 * 1000,
+}
+
+# Seconds between pings of a cached client before it is handed out again
+HEALTH_CHECK_INTERVAL = 60
+
+_LOCK = threading.RLock()
+_REGISTRY = {}  # type: Dict[Tuple[str, str], _Connection]
+_PID = os.getpid()
+
+
+class _Connection:
+    """Cached client, arctic store and library handles for one cluster"""
+    __slots__ = ("client", "arctic", "libraries", "library_names", "last_checked")
+
+    def __init__(self, client: MongoClient):
+        self.client = client
+        self.arctic = None
+        self.libraries = {}
+        self.library_names = None
+        self.last_checked = time()
+
+
+def _registry_key(mongo_config: dict) -> Tuple[str, str]:
+    """Connections are shared between configs with the same user and cluster"""
+    return mongo_config["mongo_user"], mongo_config["url_cluster"]
+
+
+def _host_url(mongo_config: dict) -> str:
+    return "".join(["mongodb+srv://", mongo_config["mongo_user"], ":",
+                    mongo_config["mongo_pwd"], "@", mongo_config["url_cluster"]])
+
+
+def _clear_registry() -> None:
+    """Drop every cached connection without closing it (sockets may belong to the parent)"""
+    global _PID
+    _REGISTRY.clear()
+    _PID = os.getpid()
+
+
+# MongoClient is not fork-safe, children must build their own pool
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_clear_registry)
+
+
+def set_pool_options(**kwargs) -> None:
+    """Update the MongoClient keyword arguments used for new connections, e.g.
+    set_pool_options(maxPoolSize=100). Existing connections are not affected until
+    close_connections is called."""
+    with _LOCK:
+        POOL_OPTIONS.update(kwargs)
+
+
+def _new_connection(mongo_config: dict) -> _Connection:
+    pool_options = dict(POOL_OPTIONS, **mongo_config.get("pool_options", {}))
+    client = MongoClient(host=_host_url(mongo_config), **pool_options)
+    return _Connection(client=client)
+
+
+def _is_healthy(connection: _Connection) -> bool:
+    try:
+        connection.client.admin.command("ping")
+    except PyMongoError:
+        return False
+    connection.last_checked = time()
+    return True
+
+
+def _get_connection(mongo_config: dict) -> _Connection:
+    """Return the cached connection for the config, creating or replacing it if required"""
+    key = _registry_key(mongo_config)
+    with _LOCK:
+        if os.getpid() != _PID:
+            _clear_registry()
+
+        connection = _REGISTRY.get(key)
+        if connection is not None and time() - connection.last_checked > HEALTH_CHECK_INTERVAL:
+            if not _is_healthy(connection):
+                connection.client.close()
+                connection = None
+
+        if connection is None:
+            connection = _new_connection(mongo_config)
+            if not _is_healthy(connection):
+                connection.client.close()
+                raise ServerSelectionTimeoutError('MongoDB is not hosted.')
+            _REGISTRY[key] = connection
+
+        return connection
+
+
+def get_client(mongo_config: dict) -> MongoClient:
+    """
+    Pooled MongoClient for the cluster in mongo_config
+
+    Args:
+        mongo_config: Dict-like object with the keys ["mongo_user", "mongo_pwd", "url_cluster"],
+            optionally "pool_options" with MongoClient keyword arguments
+
+    Returns:
+        MongoClient
+    """
+    return _get_connection(mongo_config).client
+
+
+def get_arctic(mongo_config: dict) -> Arctic:
+    """Arctic store wrapping the pooled MongoClient for the cluster in mongo_config"""
+    connection = _get_connection(mongo_config)
+    with _LOCK:
+        if connection.arctic is None:
+            connection.arctic = Arctic(connection.client)
+        return connection.arctic
+
+
+def list_libraries(mongo_config: dict, refresh: bool = False) -> list:
+    """List of library names in the Arctic database, cached until refresh is True"""
+    store = get_arctic(mongo_config)
+    connection = _get_connection(mongo_config)
+    with _LOCK:
+        if refresh or connection.library_names is None:
+            connection.library_names = store.list_libraries()
+        return list(connection.library_names)
+
+
+def get_library(mongo_config: dict, lib_name: str) -> Union[VersionStore, ChunkStore]:
+    """
+    Cached Arctic library handle. The library list is re-read from the database once before
+    failing, in case the library has been created since the list was cached.
+
+    Raises:
+        AssertionError: If the library does not exist in the Arctic database
+    """
+    connection = _get_connection(mongo_config)
+    with _LOCK:
+        if lib_name in connection.libraries:
+            return connection.libraries[lib_name]
+
+    if lib_name not in list_libraries(mongo_config):
+        assert lib_name in list_libraries(mongo_config, refresh=True), \
+            f"\n Library: '{lib_name}' does not exist in Arctic database"
+
+    with _LOCK:
+        lib_store = get_arctic(mongo_config)[lib_name]
+        connection.libraries[lib_name] = lib_store
+        return lib_store
+
+
+def invalidate_libraries(mongo_config: dict) -> None:
+    """Forget the cached library list and handles, e.g. after a library is created"""
+    with _LOCK:
+        connection = _REGISTRY.get(_registry_key(mongo_config))
+        if connection is not None:
+            connection.library_names = None
+            connection.libraries.clear()
+
+
+def close_connections() -> None:
+    """Close every pooled client and empty the registry"""
+    with _LOCK:
+        for connection in _REGISTRY.values():
+            connection.client.close()
+        _REGISTRY.clear()
@@ -2,16 +2,21 @@
 Created: 13 Oct 2019
 Cloud database: mongoDB Atlas: initialise, write, append, read to library
 """
+import hashlib
 import json
-from typing import Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple, Union
 
 import pandas as pd
 from arctic import Arctic, VERSION_STORE, CHUNK_STORE, TICK_STORE
-from arctic.chunkstore.chunkstore import ChunkStore
+from arctic.date import DateRange
+from arctic.chunkstore.chunkstore import ChunkStore, SHA as CHUNK_SHA, SYMBOL as CHUNK_SYMBOL
 from arctic.store.version_store import VersionStore
-from pymongo import MongoClient
 from pymongo.collection import Collection
-from pymongo.errors import ServerSelectionTimeoutError
+
+from src.dataload import disk_cache
+from src.dataload.connection import get_arctic, get_client, get_library, list_libraries, \
+    invalidate_libraries
 
 
 # connect to database
@@ -20,7 +25,8 @@ def db_connect(mongo_config: dict,
                lib_name: str = None) -> Union[object, Arctic, VersionStore, ChunkStore, Collection]:
     """
     Connect to the MongoDB Atlas instance using a config containing user, password, url_cluster
-    parameters
+    parameters. Clients, Arctic stores and library handles are cached per cluster, so repeated
+    calls reuse the same connection pool.
 
     Args:
         mongo_config: Dict-like object with the keys ["mongo_user", "mongo_pwd", "url_cluster"]
@@ -33,34 +39,17 @@ def db_connect(mongo_config: dict,
             lib_collection: pymongo collection
             db_connection: arctic.arctic.Arctic, pymongo.database.Database
     """
-    user = mongo_config["mongo_user"]
-    password = mongo_config["mongo_pwd"]
-    mongo_url = mongo_config["url_cluster"]
-
-    host_url = "".join(["mongodb+srv://", user, ":", password, "@", mongo_url])
-    client = MongoClient(host=host_url)
-
-    # check the connection to the database
-    try:
-        client.PORT
-        # print(f"Listing existing database names: {client.list_database_names()}")
-    except ServerSelectionTimeoutError:
-        raise ServerSelectionTimeoutError('MongoDB is not hosted.')
-
+    # connections are pooled per cluster, see dataload.connection
     if is_arctic:
-        db_connection = Arctic(client)
-        library_list = db_connection.list_libraries()
         if lib_name is not None:
-            assert lib_name in library_list, \
-                f"\n Library: '{lib_name}' does not exist in Arctic database"
-            lib_store = db_connection[lib_name]
-            return lib_store
+            return get_library(mongo_config=mongo_config, lib_name=lib_name)
         else:
-            print(f"List of libraries in 'Arctic' database: \n {library_list}")
-            return db_connection
+            print(f"List of libraries in 'Arctic' database: \n "
+                  f"{list_libraries(mongo_config=mongo_config)}")
+            return get_arctic(mongo_config=mongo_config)
     # non-arctic collection
     else:
-        return client
+        return get_client(mongo_config=mongo_config)
         # Check if I want to add a non-time series dataset
 
 
@@ -111,12 +100,10 @@ def db_arctic_library(mongo_config: dict,
     Returns
         arctic_store
     """
-    store = db_connect(mongo_config=mongo_config, is_arctic=True)
-
     if library is None:
-        return store.list_libraries()
+        return list_libraries(mongo_config=mongo_config)
     else:
-        return store
+        return db_connect(mongo_config=mongo_config, is_arctic=True)
 
 
 # -----------------------
@@ -124,14 +111,26 @@ def db_arctic_library(mongo_config: dict,
 # -----------------------
 def db_arctic_read(mongo_config: dict,
                    library: str,
-                   symbol: str = None) -> pd.DataFrame:
+                   symbol: str = None,
+                   date_range: Union[DateRange, Tuple[str, str]] = None,
+                   columns: List[str] = None,
+                   use_cache: bool = False,
+                   validate_cache: bool = False) -> pd.DataFrame:
     """
-    Returning the data frame stored in MongoDB Arctic database.
+    Returning the data frame stored in MongoDB Arctic database. The date range and columns are
+    passed to the store so only the requested slice is transferred and deserialised.
 
     Args:
         mongo_config: Dict-like object with the keys ["mongo_user", "mongo_pwd", "url_cluster"]
         library: Name of library in individual mongo cluster
         symbol: Named symbol present in library
+        date_range: arctic DateRange or (start, end) tuple, either end can be None
+        columns: Subset of columns to return, default all columns
+        use_cache: Read through the local disk cache (dataload.disk_cache), the full history of
+            the symbol is cached and sliced locally
+        validate_cache: Check the stored version of the symbol before using the cached copy. Not
+            required if the symbol is only written through this package, since db_arctic_write,
+            db_arctic_append and the bulk writer invalidate the cache on disk
 
     Returns:
         pd.DataFrame
@@ -142,17 +141,138 @@ def db_arctic_read(mongo_config: dict,
     >>> store = db_connect(mongo_config=mongo_config, is_arctic=True)
     >>> store.list_libraries()
     """
+    if symbol is None:
+        lib = db_connect(mongo_config=mongo_config, is_arctic=True, lib_name=library)
+        raise KeyError(f"No symbol chosen from the library, the following symbols can be"
+                       f" read from the {library}: {lib.list_symbols()}")
+
+    date_range = _to_date_range(date_range)
+
+    if use_cache:
+        cache = disk_cache.get_cache()
+        # a hot symbol is served from disk without touching the database
+        version = None
+        if validate_cache:
+            lib = db_connect(mongo_config=mongo_config, is_arctic=True, lib_name=library)
+            version = _symbol_version(lib, symbol)
+        out = cache.get(library=library, symbol=symbol, version=version)
+        if out is None:
+            lib = db_connect(mongo_config=mongo_config, is_arctic=True, lib_name=library)
+            assert lib.has_symbol(symbol), f"{symbol} not found in library: {library}"
+            version = version if version is not None else _symbol_version(lib, symbol)
+            out = _sort_index(lib, _read_symbol(lib, symbol))
+            cache.put(library=library, symbol=symbol, version=version, df=out)
+        if date_range is not None:
+            out = out.loc[date_range.start:date_range.end]
+        return out if columns is None else out[columns]
+
+    lib = db_connect(mongo_config=mongo_config, is_arctic=True, lib_name=library)
+    assert lib.has_symbol(symbol), f"{symbol} not found in library: {library}"
+    out = _read_symbol(lib, symbol, date_range=date_range, columns=columns)
+
+    return _sort_index(lib, out)
+
+
+def _symbol_version(lib: Union[VersionStore, ChunkStore], symbol: str) -> str:
+    """Version of the stored symbol, used to key the local cache. Chunk store has no versions,
+    so the row, append and chunk counts and a digest of the content hashes of its segments stand
+    in for it (a rewrite of the same size changes the segment hashes)"""
+    if isinstance(lib, ChunkStore):
+        info = lib.get_info(symbol)
+        segments = lib._collection.find({CHUNK_SYMBOL: symbol},
+                                        projection={CHUNK_SHA: True, '_id': False})
+        digest = hashlib.blake2b(digest_size=8)
+        for sha in sorted(bytes(x[CHUNK_SHA]) for x in segments):
+            digest.update(sha)
+        return f"{info['len']}.{info['appended_rows']}.{info['chunk_count']}.{digest.hexdigest()}"
+    return str(lib.read_metadata(symbol).version)
+
+
+def _to_date_range(date_range: Union[DateRange, Tuple[str, str], None]) -> Union[DateRange, None]:
+    """Turn a (start, end) tuple of date-likes (either may be None) into an arctic DateRange"""
+    if date_range is None or isinstance(date_range, DateRange):
+        return date_range
+    start, end = (None if x is None else pd.Timestamp(x).to_pydatetime() for x in date_range)
+    return DateRange(start, end)
+
+
+def _read_symbol(lib: Union[VersionStore, ChunkStore],
+                 symbol: str,
+                 date_range: DateRange = None,
+                 columns: List[str] = None) -> pd.DataFrame:
+    """Read one symbol from an arctic store, returning the data frame. Chunk store filters both
+    chunks and columns in the query, version store only reads the segments in date_range"""
+    if isinstance(lib, ChunkStore):
+        out = lib.read(symbol, chunk_range=date_range, columns=columns)
+    else:
+        out = lib.read(symbol, date_range=date_range).data
+        if columns is not None:
+            out = out[columns]
+    return out
+
+
+def _sort_index(lib: Union[VersionStore, ChunkStore], df: pd.DataFrame) -> pd.DataFrame:
+    """Chunk store returns chunks in date order, otherwise only sort if the index is unordered"""
+    if isinstance(lib, ChunkStore) or df.index.is_monotonic_increasing:
+        return df
+    return df.sort_index()
+
+
+def db_arctic_read_many(mongo_config: dict,
+                        library: str,
+                        symbols: List[str],
+                        date_range: Union[DateRange, Tuple[str, str]] = None,
+                        columns: List[str] = None,
+                        output: str = "dict",
+                        max_workers: int = 8) -> Union[Dict[str, pd.DataFrame], pd.DataFrame]:
+    """
+    Read many symbols from an Arctic library over one pooled connection. Chunk store libraries
+    are read with a single query, version store symbols are read concurrently.
+
+    Args:
+        mongo_config: Dict-like object with the keys ["mongo_user", "mongo_pwd", "url_cluster"]
+        library: Name of library in individual mongo cluster
+        symbols: Symbols present in library
+        date_range: arctic DateRange or (start, end) tuple, either end can be None
+        columns: Subset of columns to return, default all columns
+        output: "dict" for {symbol: pd.DataFrame}, "wide" for one frame with (symbol, column)
+            columns, "long" for one frame with a "symbol" column
+        max_workers: Number of threads reading a version store concurrently
+
+    Returns:
+        dict or pd.DataFrame
+
+    Raises:
+        KeyError: If any of the symbols are not in the library
+    """
+    assert output in ["dict", "wide", "long"], "output must be one of: dict, wide, long"
 
     lib = db_connect(mongo_config=mongo_config, is_arctic=True, lib_name=library)
 
-    if symbol is not None:
-        assert lib.has_symbol(symbol), f"{symbol} not found in library: {library}"
-        out = lib.read(symbol)
+    missing = set(symbols).difference(lib.list_symbols())
+    if missing:
+        raise KeyError(f"Symbols not found in library {library}: {sorted(missing)}")
+
+    date_range = _to_date_range(date_range)
+    if isinstance(lib, ChunkStore):
+        # chunk store reads a list of symbols in one query
+        frames = lib.read(list(symbols), chunk_range=date_range, columns=columns)
+        if len(symbols) == 1:
+            frames = {symbols[0]: frames}
     else:
-        raise KeyError(f"No symbol chosen from the library, the following symbols can be"
-                       f" read from the {library}: {lib.list_symbols()}")
+        # pymongo clients are thread safe, so the library handle is shared between threads
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(
+                lambda x: _read_symbol(lib, x, date_range=date_range, columns=columns), symbols)
+            frames = dict(zip(symbols, results))
+
+    frames = {sym: _sort_index(lib, frames[sym]) for sym in symbols}
 
-    return out.sort_index()
+    if output == "wide":
+        return pd.concat(frames, axis=1, names=["symbol"])
+    elif output == "long":
+        return pd.concat(frames, names=["symbol"]).reset_index(level="symbol")
+    return frames
 
 
 def db_arctic_initialise(mongo_config: dict,
@@ -182,6 +302,7 @@ def db_arctic_initialise(mongo_config: dict,
     # This is important because arctic will not show the existing
     # libraries upon creation of a new library.
     Arctic.reload_cache(lib)
+    invalidate_libraries(mongo_config=mongo_config)
 
 
 def db_arctic_write(mongo_config: dict,
@@ -204,12 +325,14 @@ def db_arctic_write(mongo_config: dict,
 
     lib = db_connect(mongo_config=mongo_config, is_arctic=True, lib_name=library_name)
     lib.write(symbol, df)
+    disk_cache.invalidate(library=library_name, symbol=symbol)
 
 
 def db_arctic_append(mongo_config: dict,
                      df: pd.DataFrame,
                      symbol: str,
-                     library_name: str = None) -> None:
+                     library_name: str = None,
+                     metadata: dict = None) -> None:
     """
     Appending existing arctic library.
 
@@ -218,6 +341,7 @@ def db_arctic_append(mongo_config: dict,
         df: pd.DataFrame
         symbol: Name of symbol
         library_name: Name of arctic library to append on
+        metadata: Replaces the metadata stored with the symbol, default keeps it unchanged
 
     Returns:
         None
@@ -225,7 +349,8 @@ def db_arctic_append(mongo_config: dict,
 
     assert library_name is not None, "lib_name must be passed in to specify library to append."
     lib = db_connect(mongo_config=mongo_config, is_arctic=True, lib_name=library_name)
-    lib.append(symbol, df, upsert=True)
+    lib.append(symbol, df, upsert=True, metadata=metadata)
+    disk_cache.invalidate(library=library_name, symbol=symbol)
 
 
 if __name__ == '__main__':
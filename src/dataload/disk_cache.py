@@ -0,0 +1,192 @@
+"""
+Created: 18 Oct 2026
+Local read-through cache of Arctic symbols on disk, so repeated reads of unchanged history do not
+go back to MongoDB Atlas. Entries are keyed by library/symbol/version and evicted least recently
+used first once the cache grows past max_bytes.
+"""
+import hashlib
+import json
+import os
+import threading
+from time import time
+from typing import Union
+
+import pandas as pd
+
+from src.get_paths import get_dataload_path
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3  # 2GB
+
+
+class ArcticDiskCache:
+    """
+    Pickled data frames under cache_dir with a json index of
+    {library/symbol: {"version", "file", "size", "last_access"}}
+
+    Args:
+        cache_dir: Folder for the cache, defaults to the 'cache' folder in dataload
+        max_bytes: Size of the cache on disk before the least recently used symbols are removed
+
+    Note:
+        The index is shared between processes through the file system and re-read before every
+        change, but is not locked, so only one process should write to the same cache_dir at a
+        time. Access times of hits are kept in memory and saved with the next change.
+    """
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or get_dataload_path("cache")
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._index_path = os.path.join(self.cache_dir, "index.json")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._index = self._load_index()
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self._index_path, "r") as fp:
+                return json.load(fp)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_index(self) -> None:
+        tmp_path = self._index_path + ".tmp"
+        with open(tmp_path, "w") as fp:
+            json.dump(self._index, fp)
+        os.replace(tmp_path, self._index_path)
+
+    def _reload_index(self) -> None:
+        """Pick up changes made by other processes, keeping the access times of this one"""
+        index = self._load_index()
+        for key, entry in index.items():
+            if key in self._index and self._index[key]["file"] == entry["file"]:
+                entry["last_access"] = max(entry["last_access"], self._index[key]["last_access"])
+        self._index = index
+
+    @staticmethod
+    def _key(library: str, symbol: str) -> str:
+        return f"{library}/{symbol}"
+
+    def _file_name(self, library: str, symbol: str, version: str) -> str:
+        digest = hashlib.sha1(self._key(library, symbol).encode()).hexdigest()
+        return f"{digest}_{version}.pkl"
+
+    def _remove(self, key: str) -> None:
+        entry = self._index.pop(key, None)
+        if entry is not None:
+            try:
+                os.remove(os.path.join(self.cache_dir, entry["file"]))
+            except FileNotFoundError:
+                pass
+
+    @property
+    def size(self) -> int:
+        """Bytes on disk used by cached symbols"""
+        return sum(entry["size"] for entry in self._index.values())
+
+    def get(self,
+            library: str,
+            symbol: str,
+            version: Union[str, int] = None) -> Union[pd.DataFrame, None]:
+        """
+        Cached data frame for the symbol, or None on a miss
+
+        Args:
+            library: Name of arctic library
+            symbol: Name of symbol
+            version: Version the caller expects, None accepts whichever version is cached
+
+        Returns:
+            pd.DataFrame or None
+        """
+        key = self._key(library, symbol)
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+            if version is not None and entry["version"] != str(version):
+                self._remove(key)
+                self._save_index()
+                return None
+            try:
+                df = pd.read_pickle(os.path.join(self.cache_dir, entry["file"]))
+            except FileNotFoundError:
+                self._remove(key)
+                self._save_index()
+                return None
+            entry["last_access"] = time()
+            return df
+
+    def put(self, library: str, symbol: str, version: Union[str, int], df: pd.DataFrame) -> None:
+        """Store the data frame for library/symbol/version, evicting old entries if needed"""
+        key = self._key(library, symbol)
+        file_name = self._file_name(library, symbol, str(version))
+        with self._lock:
+            self._reload_index()
+            self._remove(key)
+            file_path = os.path.join(self.cache_dir, file_name)
+            df.to_pickle(file_path)
+            self._index[key] = {"version": str(version),
+                                "file": file_name,
+                                "size": os.path.getsize(file_path),
+                                "last_access": time()}
+            self._evict()
+            self._save_index()
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the cache is within max_bytes"""
+        by_last_access = sorted(self._index, key=lambda x: self._index[x]["last_access"])
+        total = self.size
+        for key in by_last_access:
+            if total <= self.max_bytes:
+                break
+            total -= self._index[key]["size"]
+            self._remove(key)
+
+    def invalidate(self, library: str, symbol: str = None) -> None:
+        """Remove a symbol, or every symbol of the library if symbol is None"""
+        with self._lock:
+            self._reload_index()
+            if symbol is not None:
+                self._remove(self._key(library, symbol))
+            else:
+                for key in [k for k in self._index if k.startswith(f"{library}/")]:
+                    self._remove(key)
+            self._save_index()
+
+    def clear(self) -> None:
+        """Remove every cached symbol"""
+        with self._lock:
+            self._reload_index()
+            for key in list(self._index):
+                self._remove(key)
+            self._save_index()
+
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_cache() -> ArcticDiskCache:
+    """Process-wide cache used by dataload.database, created on first use"""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = ArcticDiskCache()
+        return _CACHE
+
+
+def set_cache(cache: Union[ArcticDiskCache, None]) -> None:
+    """Replace the process-wide cache, e.g. with a different folder or size limit"""
+    global _CACHE
+    with _CACHE_LOCK:
+        _CACHE = cache
+
+
+def invalidate(library: str, symbol: str = None) -> None:
+    """
+    Invalidate the process-wide cache, including entries written to disk by other processes, so
+    writes from a process which never read through the cache still reach the cache on disk
+    """
+    if _CACHE is None and not os.path.isdir(get_dataload_path("cache")):
+        return  # nothing has been cached
+    get_cache().invalidate(library=library, symbol=symbol)
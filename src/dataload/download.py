@@ -0,0 +1,175 @@
+"""
+Created: 18 Oct 2026
+Download engine for price data: tickers are split into batches and fetched on a bounded thread
+pool under a rate limit, with retries and exponential backoff, and completed batches are streamed
+back to the caller. The provider call is pluggable (yahoo finance by default).
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from time import monotonic, sleep
+from typing import Callable, Iterator, List, NamedTuple, Union
+
+import pandas as pd
+import yfinance as yf  # third party import
+
+from src.utils_lists import chunk
+
+# provider(tickers, start_date, end_date, interval) -> frame with (field, ticker) columns
+Provider = Callable[[List[str], str, str, str], pd.DataFrame]
+
+
+class BatchResult(NamedTuple):
+    """Download for one batch of tickers, error is set if every attempt failed"""
+    tickers: List[str]
+    data: Union[pd.DataFrame, None]
+    error: Union[Exception, None]
+
+
+def missing_tickers(data: pd.DataFrame, tickers: List[str]) -> List[str]:
+    """Tickers with no values in a (field, ticker) frame, missing columns count as no values"""
+    if data is None or data.empty:
+        return list(tickers)
+    has_values = data.notna().any(axis=0).groupby(level=-1).any()
+    return [x for x in tickers if not has_values.get(x, False)]
+
+
+def yahoo_provider(tickers: List[str],
+                   start_date: str,
+                   end_date: str,
+                   interval: str = "1d") -> pd.DataFrame:
+    """
+    Yahoo finance download, columns are always (field, ticker) even for one ticker
+
+    Raises:
+        RuntimeError: If no ticker of the batch returned any data. yfinance logs download errors
+            and returns empty or NaN frames rather than raising, so this lets the engine retry
+            the batch and report it as failed
+    """
+    data = yf.download(tickers=tickers,
+                       start=start_date,
+                       end=end_date,
+                       interval=interval,
+                       threads=False,  # threading is handled by the engine
+                       progress=False)
+    if not isinstance(data.columns, pd.MultiIndex):
+        data.columns = pd.MultiIndex.from_product([data.columns, tickers])
+    if len(missing_tickers(data, tickers)) == len(tickers):
+        raise RuntimeError(f"No data returned for tickers: {tickers}")
+    return data
+
+
+class RateLimiter:
+    """Spaces calls at least 1 / calls_per_second seconds apart across threads"""
+
+    def __init__(self, calls_per_second: float):
+        assert calls_per_second > 0, "calls_per_second must be positive"
+        self._interval = 1.0 / calls_per_second
+        self._next_call = monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = monotonic()
+            wait_time = self._next_call - now
+            self._next_call = max(now, self._next_call) + self._interval
+        if wait_time > 0:
+            sleep(wait_time)
+
+
+def _download_batch(provider: Provider,
+                    rate_limiter: RateLimiter,
+                    tickers: List[str],
+                    start_date: str,
+                    end_date: str,
+                    interval: str,
+                    max_retries: int,
+                    backoff: float) -> BatchResult:
+    for attempt in range(max_retries + 1):
+        rate_limiter.wait()
+        try:
+            data = provider(tickers, start_date, end_date, interval)
+            return BatchResult(tickers=tickers, data=data, error=None)
+        except Exception as err:  # provider errors are not known in advance
+            if attempt == max_retries:
+                return BatchResult(tickers=tickers, data=None, error=err)
+            sleep(backoff * 2 ** attempt)
+
+
+def iter_download_batches(tickers: List[str],
+                          start_date: str = "2019-01-01",
+                          end_date: str = "2019-12-31",
+                          interval: str = "1d",
+                          batch_size: int = 100,
+                          max_workers: int = 4,
+                          calls_per_second: float = 2.0,
+                          max_retries: int = 3,
+                          backoff: float = 1.0,
+                          provider: Provider = yahoo_provider) -> Iterator[BatchResult]:
+    """
+    Download tickers in batches, yielding each batch as soon as it completes (not in the order
+    of tickers). At most 2 * max_workers batches are in flight, so memory stays bounded when the
+    caller consumes results as they arrive.
+
+    Args:
+        tickers: list of tickers to download
+        start_date
+        end_date
+        interval: Data interval, e.g. "1d"
+        batch_size: Number of tickers per provider call
+        max_workers: Number of concurrent provider calls
+        calls_per_second: Maximum rate of provider calls (including retries)
+        max_retries: Retries per batch before the batch is returned with its error
+        backoff: Seconds to wait before the first retry, doubled on each retry
+        provider: Function (tickers, start_date, end_date, interval) -> pd.DataFrame
+
+    Yields:
+        BatchResult
+    """
+    batches = iter(chunk(lst=list(tickers), chunk_size=batch_size))
+    rate_limiter = RateLimiter(calls_per_second=calls_per_second)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def submit_next() -> bool:
+            batch = next(batches, None)
+            if batch is None:
+                return False
+            in_flight.add(executor.submit(_download_batch, provider, rate_limiter, batch,
+                                          start_date, end_date, interval, max_retries, backoff))
+            return True
+
+        in_flight = set()
+        for _ in range(2 * max_workers):
+            if not submit_next():
+                break
+
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                submit_next()
+                yield future.result()
+
+
+def download_stock_data(tickers: List[str],
+                        start_date: str = "2019-01-01",
+                        end_date: str = "2019-12-31",
+                        interval: str = "1d",
+                        **kwargs) -> pd.DataFrame:
+    """
+    Download all tickers with iter_download_batches and join the batches into one frame with
+    (field, ticker) columns, keyword arguments are passed to iter_download_batches.
+
+    Raises:
+        RuntimeError: If any batch failed after all retries, listing the failed tickers
+    """
+    frames, failed = [], []
+    for result in iter_download_batches(tickers=tickers, start_date=start_date,
+                                        end_date=end_date, interval=interval, **kwargs):
+        if result.error is None:
+            frames.append(result.data)
+        else:
+            failed.extend(result.tickers)
+
+    if failed:
+        raise RuntimeError(f"Download failed for tickers: {failed}")
+
+    return pd.concat(frames, axis=1).sort_index(axis=1, level=0, sort_remaining=False)
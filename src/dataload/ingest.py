@@ -0,0 +1,102 @@
+"""
+Created: 18 Oct 2026
+Bulk ingest into Arctic: frames are written in chunks, many symbols in parallel over the pooled
+connection, with progress checkpointed so an interrupted backfill resumes where it stopped
+"""
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+from typing import Dict
+
+import pandas as pd
+
+from src.dataload import disk_cache
+from src.dataload.database import db_connect
+
+
+def _load_checkpoint(checkpoint_path: str) -> Dict[str, int]:
+    """Rows already written per symbol"""
+    if checkpoint_path is None or not os.path.exists(checkpoint_path):
+        return {}
+    with open(checkpoint_path, "r") as fp:
+        return json.load(fp)
+
+
+def _save_checkpoint(checkpoint_path: str, progress: Dict[str, int]) -> None:
+    tmp_path = checkpoint_path + ".tmp"
+    with open(tmp_path, "w") as fp:
+        json.dump(progress, fp)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def db_arctic_bulk_write(mongo_config: dict,
+                         frames: Dict[str, pd.DataFrame],
+                         library_name: str,
+                         chunk_size: int = 50000,
+                         max_workers: int = 4,
+                         append: bool = False,
+                         checkpoint_path: str = None) -> dict:
+    """
+    Write many symbols to an existing arctic library in chunks of rows.
+
+    Args:
+        mongo_config: Dict-like object with the keys ["mongo_user", "mongo_pwd", "url_cluster"]
+        frames: {symbol: pd.DataFrame} to write
+        library_name: Name of arctic library to write on
+        chunk_size: Number of rows sent to the database per call
+        max_workers: Number of symbols written concurrently
+        append: Append to existing symbols, rather than overwrite them with the first chunk
+        checkpoint_path: json file recording the rows written per symbol. If the file exists
+            the rows already recorded are skipped, it is removed once every symbol is written
+
+    Returns:
+        dict: rows, seconds and rows_per_sec written in this run
+
+    Example:
+        >>> db_arctic_bulk_write(mongo_config, frames={'AMZN': amzn_df, 'TSLA': tsla_df},
+        ...                      library_name='security_data',
+        ...                      checkpoint_path='/tmp/security_data_backfill.json')
+    """
+    assert chunk_size > 0, "chunk_size must be a positive number of rows"
+
+    lib = db_connect(mongo_config=mongo_config, is_arctic=True, lib_name=library_name)
+
+    progress = _load_checkpoint(checkpoint_path)
+    if progress:
+        print(f"Resuming from checkpoint: {checkpoint_path}")
+    lock = threading.Lock()
+
+    def write_symbol(symbol: str) -> int:
+        df = frames[symbol]
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index()  # chunks must be appended in index order
+        rows_done = progress.get(symbol, 0)
+        rows_written = 0
+        for start in range(rows_done, len(df), chunk_size):
+            chunk = df.iloc[start:start + chunk_size]
+            if start == 0 and not append:
+                lib.write(symbol, chunk)
+            else:
+                lib.append(symbol, chunk, upsert=True)
+            rows_written += len(chunk)
+            with lock:
+                progress[symbol] = start + len(chunk)
+                if checkpoint_path is not None:
+                    _save_checkpoint(checkpoint_path, progress)
+        disk_cache.invalidate(library=library_name, symbol=symbol)
+        return rows_written
+
+    start_time = time()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        rows = sum(executor.map(write_symbol, frames))
+    seconds = time() - start_time
+
+    if checkpoint_path is not None and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    rows_per_sec = rows / seconds if seconds > 0 else float("inf")
+    print(f"Wrote {rows} rows for {len(frames)} symbols to {library_name} in {seconds: 2.2f} sec "
+          f"({rows_per_sec: ,.0f} rows/sec)")
+    return {"rows": rows, "seconds": seconds, "rows_per_sec": rows_per_sec}
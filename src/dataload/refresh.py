@@ -0,0 +1,132 @@
+"""
+Created: 18 Oct 2026
+Incremental (delta) refresh of price data stored in Arctic: looks up the last stored date for
+each symbol, downloads only the missing days and appends them, rather than re-downloading and
+overwriting the full history
+"""
+from collections import defaultdict
+from typing import Dict, List, Union
+
+import pandas as pd
+from arctic.chunkstore.chunkstore import ChunkStore
+from arctic.date import DateRange
+from arctic.store.version_store import VersionStore
+
+from src.dataload.database import db_arctic_append, db_connect
+from src.dataload.download import Provider, iter_download_batches, yahoo_provider
+
+LAST_DATE_KEY = "last_date"  # version store metadata written on every refresh
+
+
+def _index_dates(df: pd.DataFrame) -> pd.DatetimeIndex:
+    """Dates of a stored frame, either the 'date' index level or a 'date' column"""
+    if "date" in df.index.names:
+        return pd.DatetimeIndex(df.index.get_level_values("date"))
+    elif "date" in df.columns:
+        return pd.DatetimeIndex(df["date"])
+    return pd.DatetimeIndex(df.index)
+
+
+def db_arctic_last_date(lib: Union[VersionStore, ChunkStore],
+                        symbol: str) -> Union[pd.Timestamp, None]:
+    """
+    Last stored date of a symbol, None if the symbol is not in the library.
+
+    Chunk store reads only the last chunk. Version store reads the last_date metadata written by
+    refresh_stock_data, and only falls back to reading the symbol if it has none. Appends made
+    outside refresh_stock_data carry the metadata forward unchanged, so the rows from last_date
+    on are read to check for later dates.
+    """
+    if not lib.has_symbol(symbol):
+        return None
+
+    if isinstance(lib, ChunkStore):
+        start, end = next(lib.get_chunk_ranges(symbol, reverse=True))
+        last_chunk = lib.read(symbol,
+                              chunk_range=DateRange(pd.Timestamp(start.decode()).to_pydatetime(),
+                                                    pd.Timestamp(end.decode()).to_pydatetime()))
+        return _index_dates(last_chunk).max()
+
+    metadata = lib.read_metadata(symbol).metadata
+    if metadata and LAST_DATE_KEY in metadata:
+        last_date = pd.Timestamp(metadata[LAST_DATE_KEY])
+        tail = lib.read(symbol, date_range=DateRange(last_date.to_pydatetime(), None)).data
+        return max(last_date, _index_dates(tail).max()) if len(tail) else last_date
+    return _index_dates(lib.read(symbol).data).max()
+
+
+def refresh_stock_data(mongo_config: dict,
+                       library_name: str,
+                       stocks: List[str],
+                       start_date: str = "2019-01-01",
+                       end_date: str = None,
+                       provider: Provider = yahoo_provider,
+                       **kwargs) -> Dict[str, int]:
+    """
+    Bring every symbol in the library up to end_date, downloading only the days after its last
+    stored date. Symbols not yet in the library are downloaded from start_date. Symbols sharing
+    a last date are downloaded together, in batches (see dataload.download).
+
+    Args:
+        mongo_config: Dict-like object with the keys ["mongo_user", "mongo_pwd", "url_cluster"]
+        library_name: Name of arctic library, each symbol is stored as a frame of fields
+            (Open, High, ..., Volume) with a 'date' index
+        stocks: Tickers to refresh, used as the symbol names
+        start_date: First date downloaded for new symbols
+        end_date: Last date to download (exclusive, as for yfinance), default today
+        provider: Function (tickers, start_date, end_date, interval) -> pd.DataFrame
+        kwargs: Passed to iter_download_batches, e.g. batch_size, max_workers
+
+    Returns:
+        dict: {symbol: number of rows appended}
+
+    Raises:
+        RuntimeError: If the download failed for any batch, after the other batches are stored
+    """
+    end_date = end_date or pd.Timestamp.today().strftime("%Y-%m-%d")
+    lib = db_connect(mongo_config=mongo_config, is_arctic=True, lib_name=library_name)
+
+    # group symbols by the first missing day, so each group is one download window
+    last_dates = {}
+    by_start_date = defaultdict(list)
+    for symbol in stocks:
+        last_dates[symbol] = db_arctic_last_date(lib, symbol)
+        if last_dates[symbol] is None:
+            by_start_date[start_date].append(symbol)
+        else:
+            next_day = (last_dates[symbol] + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+            if next_day < end_date:
+                by_start_date[next_day].append(symbol)
+
+    rows_appended = {symbol: 0 for symbol in stocks}
+    failed = []
+    for group_start, tickers in by_start_date.items():
+        print(f"Downloading from {group_start} to {end_date} for stocks: {tickers}")
+        for result in iter_download_batches(tickers=tickers, start_date=group_start,
+                                            end_date=end_date, provider=provider, **kwargs):
+            if result.error is not None:
+                failed.extend(result.tickers)
+                continue
+            for ticker in result.tickers:
+                df = result.data.xs(ticker, axis=1, level=1).dropna(how="all")
+                df.index.name = "date"
+                if last_dates[ticker] is not None:
+                    df = df.loc[df.index > last_dates[ticker]]
+                if df.empty:
+                    continue
+                metadata = None
+                if isinstance(lib, VersionStore):
+                    # append replaces the metadata, so keep the other keys of the symbol
+                    metadata = {}
+                    if last_dates[ticker] is not None:
+                        metadata = dict(lib.read_metadata(ticker).metadata or {})
+                    metadata[LAST_DATE_KEY] = df.index.max().strftime("%Y-%m-%d")
+                db_arctic_append(mongo_config=mongo_config, df=df, symbol=ticker,
+                                 library_name=library_name, metadata=metadata)
+                rows_appended[ticker] = len(df)
+
+    if failed:
+        raise RuntimeError(f"Download failed for tickers: {failed}")
+
+    print(f"Appended {sum(rows_appended.values())} rows for {len(stocks)} stocks")
+    return rows_appended
@@ -2,16 +2,23 @@
 Created: 7 Aug 2020
 Data retrieval for stock data (mainly using YahooFinance API)
 """
-from typing import Union, List
+import threading
+from time import time
+from typing import Dict, List, NamedTuple, Tuple, Union
 
 import pandas as pd
 import yfinance as yf  # third party import
 
+from src.dataload.download import Provider, download_stock_data, iter_download_batches, \
+    missing_tickers, yahoo_provider
+
 
 def return_stock_data(stocks: Union[List[str], str],
                       start_date: str = "2019-01-01",
                       end_date: str = "2019-12-31",
-                      return_price: bool = True) -> pd.DataFrame:
+                      return_price: bool = True,
+                      batch_size: int = None,
+                      wide: bool = False) -> Union[pd.DataFrame, Dict[str, pd.DataFrame]]:
     """Wrapper on Yahoo Finance on which to download stock data (daily returns), will return
     a melted dataframe
 
@@ -19,20 +26,43 @@ def return_stock_data(stocks: Union[List[str], str],
         stocks: list of stocks from the acceptable universe
         start_date
         end_date
+        batch_size: If given, download in batches of this many tickers with the parallel,
+            rate limited engine in dataload.download (suited to large universes)
+        wide: Return date x stock float64 matrices instead of the melted dataframe, these can be
+            passed straight to the securityAnalysis.utils_finance methods
 
     Returns
         pd.DataFrame: with columns ["Open", "High", "Low", "Close", "Adj Close", "Volume"], index
         is the dates in datetime
+        if wide:
+            pd.DataFrame: Adj Close with a column per stock if return_price
+            dict: {field: pd.DataFrame with a column per stock} otherwise
 
     """
     if not isinstance(stocks, List):
         stocks = [stocks]
 
     print(f"Downloading data from YahooFinance for stocks: {stocks}")
-    data_download = yf.download(tickers=stocks,
-                                start=start_date,
-                                end=end_date,
-                                interval="1d")
+    if batch_size is None:
+        data_download = yf.download(tickers=stocks,
+                                    start=start_date,
+                                    end=end_date,
+                                    interval="1d")
+    else:
+        data_download = download_stock_data(tickers=stocks,
+                                            start_date=start_date,
+                                            end_date=end_date,
+                                            interval="1d",
+                                            batch_size=batch_size)
+
+    if wide:
+        return _wide_stock_data(data_download=data_download,
+                                stocks=stocks,
+                                return_price=return_price)
+
+    if not return_price:
+        print(f"Returning all data for {stocks}")
+        return data_download.unstack().reset_index()
 
     melted_data = data_download.unstack().reset_index()
 
@@ -43,7 +73,7 @@ def return_stock_data(stocks: Union[List[str], str],
         0: 'value'
     }
 
-    if len(stocks) == 1:
+    if not isinstance(data_download.columns, pd.MultiIndex):
         melted_data['stock'] = stocks[0]
         rename_cols_dict.pop('level_1')
         rename_cols_dict['stock'] = 'stock'
@@ -51,24 +81,120 @@ def return_stock_data(stocks: Union[List[str], str],
     melted_data.rename(columns=rename_cols_dict,
                        inplace=True)
 
+    print(f"Returning daily price data for {stocks}")
+    return melted_data.loc[melted_data['measure'] == 'Adj Close']
+
+
+def _wide_stock_data(data_download: pd.DataFrame,
+                     stocks: List[str],
+                     return_price: bool) -> Union[pd.DataFrame, Dict[str, pd.DataFrame]]:
+    """Split the yfinance download into one date x stock matrix per field, selecting the columns
+    rather than melting and filtering the whole download"""
+    if isinstance(data_download.columns, pd.MultiIndex):
+        fields = data_download.columns.get_level_values(0).unique()
+        wide_data = {field: data_download[field].astype('float64') for field in fields}
+    else:
+        # single stock downloads have one column per field
+        wide_data = {field: data_download[[field]].astype('float64').set_axis(stocks, axis=1)
+                     for field in data_download.columns}
+
     if return_price:
         print(f"Returning daily price data for {stocks}")
-        return melted_data.loc[melted_data['measure'] == 'Adj Close']
-    else:
-        print(f"Returning all data for {stocks}")
-        return data_download.unstack().reset_index()
+        return wide_data['Adj Close']
+    print(f"Returning all data for {stocks}")
+    return wide_data
+
+
+class TickerValidation(NamedTuple):
+    """Result of validate_tickers, failed tickers could not be checked (e.g. network errors)"""
+    valid: List[str]
+    invalid: List[str]
+    failed: List[str]
+
 
+TICKER_CACHE_TTL = 24 * 60 * 60  # seconds a validation result is reused for
+CONTROL_TICKER = "SPY"  # always has prices, tells an outage from invalid tickers
+_TICKER_CACHE = {}  # type: Dict[str, Tuple[bool, float]]
+_TICKER_CACHE_LOCK = threading.Lock()
 
-def is_valid_ticker(ticker: str) -> None:
+
+def validate_tickers(tickers: List[str],
+                     ttl: float = TICKER_CACHE_TTL,
+                     probe_days: int = 14,
+                     provider: Provider = yahoo_provider,
+                     control_ticker: str = CONTROL_TICKER,
+                     **kwargs) -> TickerValidation:
+    """
+    Check which tickers can be downloaded, by downloading the last probe_days of prices for all
+    unchecked tickers in batches (see dataload.download). A ticker is valid if it has any price
+    in that window. Results are cached for ttl seconds, failed downloads are not cached.
+    Providers (yfinance included) return empty or NaN frames rather than raising during an
+    outage, so control_ticker is downloaded with every batch: if it has no prices the batch is
+    reported as failed, otherwise tickers with no prices are invalid.
+
+    Args:
+        tickers: list of tickers to check
+        ttl: Seconds to reuse a cached result, 0 to always re-check
+        probe_days: Number of calendar days downloaded to check each ticker
+        provider: Function (tickers, start_date, end_date, interval) -> pd.DataFrame
+        control_ticker: Ticker known to have prices. None to skip the control, in which case a
+            batch with no prices for any of its tickers is reported as failed
+        kwargs: Passed to iter_download_batches, e.g. batch_size, max_workers
+
+    Returns:
+        TickerValidation: valid, invalid and failed lists, in the order of tickers
+    """
+    now = time()
+    with _TICKER_CACHE_LOCK:
+        results = {ticker: _TICKER_CACHE[ticker][0] for ticker in tickers
+                   if ticker in _TICKER_CACHE and now - _TICKER_CACHE[ticker][1] < ttl}
+
+    to_check = [ticker for ticker in dict.fromkeys(tickers) if ticker not in results]
+    if to_check:
+        end_date = pd.Timestamp.today() + pd.Timedelta(days=1)
+        start_date = end_date - pd.Timedelta(days=probe_days)
+
+        def probe(batch, *args):
+            if control_ticker is None:
+                return provider(batch, *args)
+            return provider(list(dict.fromkeys(batch + [control_ticker])), *args)
+
+        for result in iter_download_batches(tickers=to_check,
+                                            start_date=start_date.strftime("%Y-%m-%d"),
+                                            end_date=end_date.strftime("%Y-%m-%d"),
+                                            provider=probe,
+                                            **kwargs):
+            if result.error is not None:
+                continue
+            if control_ticker is None:
+                missing = missing_tickers(result.data, result.tickers)
+                if len(missing) == len(result.tickers):
+                    continue
+            else:
+                missing = missing_tickers(result.data, result.tickers + [control_ticker])
+                if control_ticker in missing:
+                    continue
+            with _TICKER_CACHE_LOCK:
+                for ticker in result.tickers:
+                    results[ticker] = ticker not in missing
+                    _TICKER_CACHE[ticker] = (results[ticker], now)
+
+    return TickerValidation(valid=[x for x in tickers if results.get(x) is True],
+                            invalid=[x for x in tickers if results.get(x) is False],
+                            failed=[x for x in tickers if x not in results])
+
+
+def is_valid_ticker(ticker: str) -> bool:
     """Method to check if the ticker is valid and therefore can download data
-    from yfinance API"""
+    from yfinance API, see validate_tickers to check many tickers at once"""
 
-    try:
-        yf._download_one(ticker=ticker) # use the hidden method to see if the symbol exists
+    if ticker in validate_tickers(tickers=[ticker]).valid:
         print(f"Success! Ticker: {ticker} exists")
-    except ValueError:
+        return True
+    else:
         print(f'Ticker {ticker} does not exist/cannot be downloaded from yfinance API.'
               f' Try another!')
+        return False
 
 
 if __name__ == '__main__':
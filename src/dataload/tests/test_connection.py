@@ -0,0 +1,69 @@
+"""
+Created on: 18 Oct 2026
+
+Test the pooled connection registry, MongoClient and Arctic are mocked so no cluster is needed
+"""
+import unittest
+from unittest import mock
+
+from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+
+from src.dataload import connection
+
+
+class TestConnectionRegistry(unittest.TestCase):
+    def setUp(self) -> None:
+        self.mongo_config = {'mongo_user': 'user', 'mongo_pwd': 'pwd', 'url_cluster': 'cluster'}
+        connection._clear_registry()
+        client_patch = mock.patch.object(connection, 'MongoClient')
+        arctic_patch = mock.patch.object(connection, 'Arctic')
+        self.mongo_client = client_patch.start()
+        self.arctic = arctic_patch.start()
+        self.arctic.return_value.list_libraries.return_value = ['security_data']
+        self.addCleanup(client_patch.stop)
+        self.addCleanup(arctic_patch.stop)
+        self.addCleanup(connection._clear_registry)
+
+    def test_get_client__reuses_pool(self):
+        first = connection.get_client(self.mongo_config)
+        second = connection.get_client(dict(self.mongo_config))
+        self.assertIs(first, second)
+        self.assertEqual(self.mongo_client.call_count, 1)
+
+    def test_get_client__pool_options(self):
+        connection.get_client(dict(self.mongo_config, pool_options={'maxPoolSize': 5}))
+        self.assertEqual(self.mongo_client.call_args[1]['maxPoolSize'], 5)
+
+    def test_get_library__lists_libraries_once(self):
+        for _ in range(3):
+            connection.get_library(self.mongo_config, 'security_data')
+        self.assertEqual(self.arctic.return_value.list_libraries.call_count, 1)
+
+    def test_get_library__missing_library(self):
+        with self.assertRaises(AssertionError):
+            connection.get_library(self.mongo_config, 'no_library')
+
+    def test_health_check__replaces_dead_client(self):
+        first = connection.get_client(self.mongo_config)
+        first.admin.command.side_effect = ConnectionFailure()
+        self.mongo_client.return_value = mock.MagicMock()
+        with mock.patch.object(connection, 'HEALTH_CHECK_INTERVAL', -1):
+            second = connection.get_client(self.mongo_config)
+        self.assertIsNot(first, second)
+        first.close.assert_called_once()
+
+    def test_health_check__unreachable_cluster(self):
+        self.mongo_client.return_value.admin.command.side_effect = ConnectionFailure()
+        with self.assertRaises(ServerSelectionTimeoutError):
+            connection.get_client(self.mongo_config)
+
+    def test_fork__new_pool_in_child(self):
+        first = connection.get_client(self.mongo_config)
+        self.mongo_client.return_value = mock.MagicMock()
+        with mock.patch.object(connection, '_PID', -1):
+            second = connection.get_client(self.mongo_config)
+        self.assertIsNot(first, second)
+
+
+if __name__ == '__main__':
+    unittest.main()
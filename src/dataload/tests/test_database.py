@@ -5,13 +5,20 @@ Created by: Philip.P_adm
 Test database functions for MongoDB (non-relational database)
 """
 import json
+import tempfile
 import unittest
+from unittest import mock
 
 # 3rd party import
+import pandas as pd
+from arctic.chunkstore.chunkstore import ChunkStore
+from arctic.store.version_store import VersionStore
 from pymongo import MongoClient
 
 # local import
-from src.dataload.database import (db_connect, db_keys_and_symbols)
+from src.dataload import database, disk_cache
+from src.dataload.database import (db_connect, db_keys_and_symbols, db_arctic_read,
+                                   db_arctic_read_many)
 
 
 class TestMongoDB(unittest.TestCase):
@@ -43,5 +50,117 @@ class TestMongoDB(unittest.TestCase):
                                 mongo_config=self.mongo_config))
 
 
+class TestArcticRead(unittest.TestCase):
+    """Arctic libraries are mocked, so these tests do not need a MongoDB cluster"""
+
+    def setUp(self) -> None:
+        self.mongo_config = {'mongo_user': 'user', 'mongo_pwd': 'pwd', 'url_cluster': 'cluster'}
+        dates = pd.date_range("2020-01-01", periods=3, name='date')
+        self.frames = {
+            'AMZN': pd.DataFrame({'Adj Close': [3., 2., 1.], 'Volume': [1, 2, 3]},
+                                 index=dates[::-1]),
+            'TSLA': pd.DataFrame({'Adj Close': [4., 5., 6.], 'Volume': [4, 5, 6]}, index=dates)
+        }
+
+    def _read_many(self, lib, **kwargs):
+        lib.list_symbols.return_value = list(self.frames)
+        with mock.patch.object(database, 'db_connect', return_value=lib):
+            return db_arctic_read_many(mongo_config=self.mongo_config,
+                                       library='security_data',
+                                       symbols=['AMZN', 'TSLA'],
+                                       **kwargs)
+
+    def test_db_arctic_read_many__version_store(self):
+        lib = mock.MagicMock(spec=VersionStore)
+        lib.read.side_effect = lambda sym, date_range: mock.Mock(data=self.frames[sym])
+        out = self._read_many(lib, columns=['Adj Close'])
+        self.assertEqual(list(out), ['AMZN', 'TSLA'])
+        pd.testing.assert_frame_equal(out['AMZN'],
+                                      self.frames['AMZN'][['Adj Close']].sort_index())
+
+    def test_db_arctic_read_many__chunk_store_single_query(self):
+        lib = mock.MagicMock(spec=ChunkStore)
+        lib.read.return_value = self.frames
+        out = self._read_many(lib, date_range=("2020-01-01", None), output='wide')
+        lib.read.assert_called_once()
+        self.assertEqual(out.shape, (3, 4))
+        self.assertEqual(out[('TSLA', 'Volume')].tolist(), [4, 5, 6])
+
+    def test_db_arctic_read_many__long(self):
+        lib = mock.MagicMock(spec=ChunkStore)
+        lib.read.return_value = self.frames
+        out = self._read_many(lib, output='long')
+        self.assertEqual(out['symbol'].tolist(), ['AMZN'] * 3 + ['TSLA'] * 3)
+
+    def test_db_arctic_read__chunk_store_pushdown(self):
+        lib = mock.MagicMock(spec=ChunkStore)
+        lib.read.return_value = self.frames['AMZN'][['Adj Close']]
+        with mock.patch.object(database, 'db_connect', return_value=lib):
+            out = db_arctic_read(mongo_config=self.mongo_config,
+                                 library='security_data',
+                                 symbol='AMZN',
+                                 date_range=('2020-01-02', None),
+                                 columns=['Adj Close'])
+        kwargs = lib.read.call_args[1]
+        self.assertEqual(kwargs['columns'], ['Adj Close'])
+        self.assertEqual(kwargs['chunk_range'].start.day, 2)
+        # chunk store already returns data in chunk order, so it is not re-sorted
+        self.assertIs(out, lib.read.return_value)
+
+    def test_db_arctic_read__version_store_sorts_unordered_index(self):
+        lib = mock.MagicMock(spec=VersionStore)
+        lib.read.return_value = mock.Mock(data=self.frames['AMZN'])
+        with mock.patch.object(database, 'db_connect', return_value=lib):
+            out = db_arctic_read(mongo_config=self.mongo_config,
+                                 library='security_data',
+                                 symbol='AMZN',
+                                 columns=['Adj Close'])
+        self.assertEqual(out['Adj Close'].tolist(), [1., 2., 3.])
+
+    def test_db_arctic_read__cache(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        disk_cache.set_cache(disk_cache.ArcticDiskCache(cache_dir=tmp_dir.name))
+        self.addCleanup(disk_cache.set_cache, None)
+
+        lib = mock.MagicMock(spec=VersionStore)
+        lib.read.return_value = mock.Mock(data=self.frames['TSLA'])
+        lib.read_metadata.return_value = mock.Mock(version=1)
+        with mock.patch.object(database, 'db_connect', return_value=lib) as connect:
+            for _ in range(2):
+                out = db_arctic_read(mongo_config=self.mongo_config,
+                                     library='security_data',
+                                     symbol='TSLA',
+                                     date_range=('2020-01-02', None),
+                                     columns=['Adj Close'],
+                                     use_cache=True)
+            # second read is served from disk
+            self.assertEqual(connect.call_count, 1)
+            self.assertEqual(out['Adj Close'].tolist(), [5., 6.])
+
+            database.db_arctic_write(mongo_config=self.mongo_config, df=self.frames['TSLA'],
+                                     symbol='TSLA', library_name='security_data')
+            self.assertIsNone(disk_cache.get_cache().get('security_data', 'TSLA'))
+
+    def test_symbol_version__chunk_store_rewrite(self):
+        lib = mock.MagicMock(spec=ChunkStore)
+        lib.get_info.return_value = {'len': 3, 'appended_rows': 0, 'chunk_count': 1}
+        lib._collection = mock.Mock()
+        lib._collection.find.return_value = [{'sh': b'first'}]
+        version = database._symbol_version(lib, 'AMZN')
+        # same size, different content
+        lib._collection.find.return_value = [{'sh': b'second'}]
+        self.assertNotEqual(database._symbol_version(lib, 'AMZN'), version)
+
+    def test_db_arctic_read_many__missing_symbol(self):
+        lib = mock.MagicMock(spec=ChunkStore)
+        lib.list_symbols.return_value = ['AMZN']
+        with mock.patch.object(database, 'db_connect', return_value=lib):
+            with self.assertRaises(KeyError):
+                db_arctic_read_many(mongo_config=self.mongo_config,
+                                    library='security_data',
+                                    symbols=['AMZN', 'GZC'])
+
+
 if __name__ == '__main__':
     unittest.main()
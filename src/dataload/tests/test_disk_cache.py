@@ -0,0 +1,85 @@
+"""
+Created on: 18 Oct 2026
+
+Test the local disk cache placed in front of the Arctic store
+"""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from src.dataload import disk_cache
+from src.dataload.disk_cache import ArcticDiskCache
+
+
+class TestArcticDiskCache(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.cache_dir = tmp_dir.name
+        self.cache = ArcticDiskCache(cache_dir=self.cache_dir)
+        self.df = pd.DataFrame({'Adj Close': np.arange(100.)},
+                               index=pd.date_range('2020-01-01', periods=100))
+
+    def test_get__miss(self):
+        self.assertIsNone(self.cache.get('security_data', 'AMZN'))
+
+    def test_put_and_get(self):
+        self.cache.put('security_data', 'AMZN', 3, self.df)
+        pd.testing.assert_frame_equal(self.cache.get('security_data', 'AMZN', version=3), self.df)
+        # any version is accepted when the caller does not give one
+        pd.testing.assert_frame_equal(self.cache.get('security_data', 'AMZN'), self.df)
+
+    def test_get__stale_version(self):
+        self.cache.put('security_data', 'AMZN', 3, self.df)
+        self.assertIsNone(self.cache.get('security_data', 'AMZN', version=4))
+        self.assertIsNone(self.cache.get('security_data', 'AMZN'))
+
+    def test_index_persisted(self):
+        self.cache.put('security_data', 'AMZN', 1, self.df)
+        new_cache = ArcticDiskCache(cache_dir=self.cache_dir)
+        pd.testing.assert_frame_equal(new_cache.get('security_data', 'AMZN', version=1), self.df)
+
+    def test_evict_least_recently_used(self):
+        self.cache.put('security_data', 'AMZN', 1, self.df)
+        self.cache.max_bytes = int(self.cache.size * 2.5)
+        self.cache.put('security_data', 'TSLA', 1, self.df)
+        self.cache.get('security_data', 'AMZN')
+        self.cache.put('security_data', 'GOOGL', 1, self.df)
+        self.assertIsNone(self.cache.get('security_data', 'TSLA'))
+        self.assertIsNotNone(self.cache.get('security_data', 'AMZN'))
+        self.assertLessEqual(self.cache.size, self.cache.max_bytes)
+        # index.json plus the two remaining symbols
+        self.assertEqual(len(os.listdir(self.cache_dir)), 3)
+
+    def test_invalidate_library(self):
+        self.cache.put('security_data', 'AMZN', 1, self.df)
+        self.cache.put('security_data', 'TSLA', 1, self.df)
+        self.cache.put('other_data', 'AMZN', 1, self.df)
+        self.cache.invalidate('security_data')
+        self.assertIsNone(self.cache.get('security_data', 'TSLA'))
+        self.assertIsNotNone(self.cache.get('other_data', 'AMZN'))
+
+    def test_get__does_not_rewrite_index(self):
+        self.cache.put('security_data', 'AMZN', 1, self.df)
+        index_path = os.path.join(self.cache_dir, 'index.json')
+        modified = os.stat(index_path).st_mtime_ns
+        os.utime(index_path, ns=(modified - 10 ** 9, modified - 10 ** 9))
+        self.cache.get('security_data', 'AMZN')
+        self.assertEqual(os.stat(index_path).st_mtime_ns, modified - 10 ** 9)
+
+    def test_invalidate__other_process(self):
+        self.cache.put('security_data', 'AMZN', 1, self.df)
+        # a process which never read through the cache invalidates the entry on disk
+        with mock.patch.object(disk_cache, '_CACHE', None), \
+                mock.patch.object(disk_cache, 'get_dataload_path', return_value=self.cache_dir):
+            disk_cache.invalidate('security_data', 'AMZN')
+        self.assertIsNone(ArcticDiskCache(cache_dir=self.cache_dir).get('security_data', 'AMZN'))
+        self.assertIsNone(self.cache.get('security_data', 'AMZN'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Created on: 18 Oct 2026
+
+Test the batched download engine against a local fake provider (no network access)
+"""
+import threading
+import unittest
+from time import monotonic
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from src.dataload import download
+from src.dataload.download import RateLimiter, download_stock_data, iter_download_batches
+
+
+class FakeProvider:
+    """Returns a frame of (field, ticker) columns, failing the first `failures` calls for any
+    ticker in `flaky`"""
+
+    def __init__(self, flaky=(), failures=0):
+        self.flaky = set(flaky)
+        self.failures = failures
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, tickers, start_date, end_date, interval):
+        with self._lock:
+            self.calls.append(list(tickers))
+            if self.flaky.intersection(tickers) and self.failures > 0:
+                self.failures -= 1
+                raise ConnectionError('rate limited')
+        dates = pd.date_range(start_date, end_date, name='Date')
+        columns = pd.MultiIndex.from_product([['Adj Close', 'Volume'], tickers])
+        return pd.DataFrame(np.ones((len(dates), len(columns))), index=dates, columns=columns)
+
+
+class TestDownloadEngine(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tickers = [f'T{i}' for i in range(10)]
+        self.kwargs = {'start_date': '2020-01-01', 'end_date': '2020-01-10',
+                       'calls_per_second': 1000, 'backoff': 0}
+
+    def test_iter_download_batches__batches(self):
+        provider = FakeProvider()
+        results = list(iter_download_batches(tickers=self.tickers, batch_size=3,
+                                             provider=provider, **self.kwargs))
+        self.assertEqual(len(results), 4)
+        self.assertEqual(sorted(t for r in results for t in r.tickers), sorted(self.tickers))
+        self.assertTrue(all(r.error is None for r in results))
+
+    def test_iter_download_batches__retry(self):
+        provider = FakeProvider(flaky=['T0'], failures=2)
+        results = list(iter_download_batches(tickers=self.tickers, batch_size=5, max_retries=2,
+                                             provider=provider, **self.kwargs))
+        self.assertTrue(all(r.error is None for r in results))
+        self.assertEqual(len(provider.calls), 4)
+
+    def test_iter_download_batches__failed_batch(self):
+        provider = FakeProvider(flaky=['T0'], failures=10)
+        results = list(iter_download_batches(tickers=self.tickers, batch_size=5, max_retries=1,
+                                             provider=provider, **self.kwargs))
+        failed = [r for r in results if r.error is not None]
+        self.assertEqual(len(failed), 1)
+        self.assertEqual(failed[0].tickers, self.tickers[:5])
+        self.assertIsInstance(failed[0].error, ConnectionError)
+
+    def test_download_stock_data(self):
+        out = download_stock_data(tickers=self.tickers, batch_size=4, provider=FakeProvider(),
+                                  **self.kwargs)
+        self.assertEqual(out.shape, (10, 20))
+        self.assertEqual(sorted(out['Adj Close'].columns), sorted(self.tickers))
+
+    def test_download_stock_data__raises_on_failure(self):
+        with self.assertRaises(RuntimeError):
+            download_stock_data(tickers=self.tickers, batch_size=4, max_retries=0,
+                                provider=FakeProvider(flaky=['T9'], failures=1), **self.kwargs)
+
+    def test_yahoo_provider__no_data_retried(self):
+        # yfinance logs failed downloads and returns an empty frame instead of raising
+        empty = pd.DataFrame(columns=pd.MultiIndex.from_product([['Adj Close'], ['T0', 'T1']]))
+        with mock.patch.object(download.yf, 'download', return_value=empty) as yf_download:
+            results = list(iter_download_batches(tickers=['T0', 'T1'], max_retries=2,
+                                                 **self.kwargs))
+        self.assertEqual(yf_download.call_count, 3)
+        self.assertIsInstance(results[0].error, RuntimeError)
+
+    def test_yahoo_provider__partial_data(self):
+        dates = pd.date_range('2020-01-01', '2020-01-03')
+        data = pd.DataFrame({('Adj Close', 'T0'): [1., 2., 3.], ('Adj Close', 'T1'): np.nan},
+                            index=dates)
+        with mock.patch.object(download.yf, 'download', return_value=data):
+            out = download.yahoo_provider(['T0', 'T1'], '2020-01-01', '2020-01-03')
+        self.assertEqual(download.missing_tickers(out, ['T0', 'T1']), ['T1'])
+
+    def test_rate_limiter(self):
+        rate_limiter = RateLimiter(calls_per_second=50)
+        start = monotonic()
+        for _ in range(6):
+            rate_limiter.wait()
+        # first call is immediate, the next five are spaced 0.02 sec apart
+        self.assertGreaterEqual(monotonic() - start, 0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
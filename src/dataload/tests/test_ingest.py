@@ -0,0 +1,84 @@
+"""
+Created on: 18 Oct 2026
+
+Test the chunked bulk writer against a mocked Arctic library
+"""
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from arctic.store.version_store import VersionStore
+
+from src.dataload import ingest
+from src.dataload.ingest import db_arctic_bulk_write
+
+
+class TestBulkWrite(unittest.TestCase):
+    def setUp(self) -> None:
+        self.mongo_config = {'mongo_user': 'user', 'mongo_pwd': 'pwd', 'url_cluster': 'cluster'}
+        index = pd.date_range('2020-01-01', periods=10, name='date')
+        self.frames = {'AMZN': pd.DataFrame({'Adj Close': np.arange(10.)}, index=index),
+                       'TSLA': pd.DataFrame({'Adj Close': np.arange(10.)}, index=index[::-1])}
+        self.lib = mock.MagicMock(spec=VersionStore)
+        connect_patch = mock.patch.object(ingest, 'db_connect', return_value=self.lib)
+        connect_patch.start()
+        self.addCleanup(connect_patch.stop)
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.checkpoint_path = os.path.join(tmp_dir.name, 'checkpoint.json')
+
+    def _bulk_write(self, **kwargs):
+        return db_arctic_bulk_write(mongo_config=self.mongo_config,
+                                    frames=self.frames,
+                                    library_name='security_data',
+                                    chunk_size=4,
+                                    checkpoint_path=self.checkpoint_path,
+                                    **kwargs)
+
+    def _rows_sent(self, method, symbol):
+        return sum(len(c[0][1]) for c in method.call_args_list if c[0][0] == symbol)
+
+    def test_db_arctic_bulk_write__chunks(self):
+        result = self._bulk_write()
+        self.assertEqual(result['rows'], 20)
+        # first chunk overwrites the symbol, the other two are appended
+        self.assertEqual(self.lib.write.call_count, 2)
+        self.assertEqual(self.lib.append.call_count, 4)
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+
+    def test_db_arctic_bulk_write__sorted_chunks(self):
+        self._bulk_write()
+        first_chunk = [c[0][1] for c in self.lib.write.call_args_list if c[0][0] == 'TSLA'][0]
+        self.assertTrue(first_chunk.index.is_monotonic_increasing)
+
+    def test_db_arctic_bulk_write__append(self):
+        self._bulk_write(append=True)
+        self.lib.write.assert_not_called()
+        self.assertEqual(self.lib.append.call_count, 6)
+
+    def test_db_arctic_bulk_write__resume(self):
+        def fail_on_tsla(symbol, chunk, upsert):
+            if symbol == 'TSLA' and chunk.index[0] == pd.Timestamp('2020-01-09'):
+                raise ConnectionError('connection dropped')
+
+        self.lib.append.side_effect = fail_on_tsla
+        with self.assertRaises(ConnectionError):
+            self._bulk_write()
+        with open(self.checkpoint_path, 'r') as fp:
+            self.assertEqual(json.load(fp), {'AMZN': 10, 'TSLA': 8})
+
+        self.lib.reset_mock()
+        self.lib.append.side_effect = None
+        result = self._bulk_write()
+        self.assertEqual(result['rows'], 2)
+        self.lib.write.assert_not_called()
+        self.assertEqual(self._rows_sent(self.lib.append, 'TSLA'), 2)
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
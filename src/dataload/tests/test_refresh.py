@@ -0,0 +1,92 @@
+"""
+Created on: 18 Oct 2026
+
+Test the incremental price refresh against a mocked Arctic library and a fake provider
+"""
+import unittest
+from unittest import mock
+
+import pandas as pd
+from arctic.chunkstore.chunkstore import ChunkStore
+from arctic.store.version_store import VersionStore
+
+from src.dataload import database, refresh
+from src.dataload.refresh import db_arctic_last_date, refresh_stock_data
+from src.dataload.tests.test_download import FakeProvider
+
+
+class TestRefresh(unittest.TestCase):
+    def setUp(self) -> None:
+        self.mongo_config = {'mongo_user': 'user', 'mongo_pwd': 'pwd', 'url_cluster': 'cluster'}
+        self.stored = pd.DataFrame({'Adj Close': [1., 2.]},
+                                   index=pd.DatetimeIndex(['2020-01-02', '2020-01-03'],
+                                                          name='date'))
+
+    def _refresh(self, lib, provider):
+        with mock.patch.object(refresh, 'db_connect', return_value=lib), \
+                mock.patch.object(database, 'db_connect', return_value=lib):
+            return refresh_stock_data(mongo_config=self.mongo_config,
+                                      library_name='security_data',
+                                      stocks=['AMZN', 'TSLA'],
+                                      start_date='2020-01-01',
+                                      end_date='2020-01-10',
+                                      provider=provider,
+                                      calls_per_second=1000)
+
+    def test_db_arctic_last_date__chunk_store(self):
+        lib = mock.MagicMock(spec=ChunkStore)
+        lib.get_chunk_ranges.return_value = iter([(b'2020-01-01 00:00:00',
+                                                   b'2020-01-31 23:59:59.999000')])
+        lib.read.return_value = self.stored
+        self.assertEqual(db_arctic_last_date(lib, 'AMZN'), pd.Timestamp('2020-01-03'))
+        self.assertEqual(lib.read.call_args[1]['chunk_range'].end.day, 31)
+
+    def test_db_arctic_last_date__version_store_metadata(self):
+        lib = mock.MagicMock(spec=VersionStore)
+        lib.read_metadata.return_value = mock.Mock(metadata={'last_date': '2020-01-03'})
+        lib.read.return_value = mock.Mock(data=self.stored.iloc[1:])
+        self.assertEqual(db_arctic_last_date(lib, 'AMZN'), pd.Timestamp('2020-01-03'))
+        # only the rows from the metadata date on are read
+        self.assertEqual(lib.read.call_args[1]['date_range'].start.day, 3)
+
+    def test_db_arctic_last_date__version_store_stale_metadata(self):
+        # appended outside refresh_stock_data, which carries the old metadata forward
+        lib = mock.MagicMock(spec=VersionStore)
+        lib.read_metadata.return_value = mock.Mock(metadata={'last_date': '2020-01-02'})
+        lib.read.return_value = mock.Mock(data=self.stored)
+        self.assertEqual(db_arctic_last_date(lib, 'AMZN'), pd.Timestamp('2020-01-03'))
+
+    def test_db_arctic_last_date__missing_symbol(self):
+        lib = mock.MagicMock(spec=VersionStore)
+        lib.has_symbol.return_value = False
+        self.assertIsNone(db_arctic_last_date(lib, 'AMZN'))
+
+    def test_refresh_stock_data(self):
+        lib = mock.MagicMock(spec=VersionStore)
+        lib.has_symbol.side_effect = lambda symbol: symbol == 'AMZN'
+        lib.read_metadata.return_value = mock.Mock(metadata={'last_date': '2020-01-03',
+                                                             'source': 'yahoo'})
+        provider = FakeProvider()
+
+        rows = self._refresh(lib, provider)
+
+        # AMZN only downloads the missing days, TSLA is new so downloads from start_date
+        self.assertEqual(sorted(provider.calls), [['AMZN'], ['TSLA']])
+        self.assertEqual(rows, {'AMZN': 7, 'TSLA': 10})
+        appended = {c[0][0]: c for c in lib.append.call_args_list}
+        self.assertEqual(appended['AMZN'][0][1].index[0], pd.Timestamp('2020-01-04'))
+        self.assertEqual(appended['AMZN'][1]['metadata'],
+                         {'last_date': '2020-01-10', 'source': 'yahoo'})
+        self.assertEqual(appended['TSLA'][1]['metadata'], {'last_date': '2020-01-10'})
+        lib.write.assert_not_called()
+
+    def test_refresh_stock_data__up_to_date(self):
+        lib = mock.MagicMock(spec=VersionStore)
+        lib.read_metadata.return_value = mock.Mock(metadata={'last_date': '2020-01-09'})
+        provider = FakeProvider()
+        self.assertEqual(self._refresh(lib, provider), {'AMZN': 0, 'TSLA': 0})
+        self.assertEqual(provider.calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
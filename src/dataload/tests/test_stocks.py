@@ -4,8 +4,13 @@ Unit tests for database functions
 """
 
 import unittest
+from unittest import mock
 
-from src.dataload.stocks import return_stock_data
+import numpy as np
+import pandas as pd
+
+from src.dataload import stocks
+from src.dataload.stocks import return_stock_data, validate_tickers
 
 
 class MyTestCase(unittest.TestCase):
@@ -26,5 +31,101 @@ class MyTestCase(unittest.TestCase):
                              msg='This should not be none')
 
 
+class TestWideStockData(unittest.TestCase):
+    """yfinance is mocked, so these tests do not need network access"""
+
+    def setUp(self) -> None:
+        self.dates = pd.date_range('2020-01-01', periods=3, name='Date')
+        self.fields = ['Adj Close', 'Close', 'Volume']
+
+    def _download(self, tickers, **kwargs):
+        if len(tickers) == 1:
+            return pd.DataFrame(np.arange(9).reshape(3, 3), index=self.dates, columns=self.fields)
+        columns = pd.MultiIndex.from_product([self.fields, tickers])
+        return pd.DataFrame(np.arange(3. * len(columns)).reshape(3, -1),
+                            index=self.dates, columns=columns)
+
+    def test_return_stock_data__wide_price(self):
+        with mock.patch.object(stocks.yf, 'download', side_effect=self._download):
+            out = return_stock_data(stocks=['TSLA', 'AMZN'], wide=True)
+        self.assertEqual(list(out.columns), ['TSLA', 'AMZN'])
+        self.assertEqual(out.dtypes.unique().tolist(), [np.float64])
+        self.assertEqual(out['AMZN'].tolist(), [1., 7., 13.])
+
+    def test_return_stock_data__wide_all_fields_single_stock(self):
+        with mock.patch.object(stocks.yf, 'download', side_effect=self._download):
+            out = return_stock_data(stocks='AMZN', return_price=False, wide=True)
+        self.assertEqual(sorted(out), sorted(self.fields))
+        self.assertEqual(out['Volume'].columns.tolist(), ['AMZN'])
+        self.assertEqual(out['Volume']['AMZN'].tolist(), [2., 5., 8.])
+
+
+class TestValidateTickers(unittest.TestCase):
+    """Tickers starting with 'X' have no prices, tickers starting with 'E' raise an error"""
+
+    def setUp(self) -> None:
+        self.calls = []
+        self.call_tickers = []
+        stocks._TICKER_CACHE.clear()
+        self.addCleanup(stocks._TICKER_CACHE.clear)
+
+    def _provider(self, tickers, start_date, end_date, interval, outage=False):
+        self.calls.append([t for t in tickers if t != 'SPY'])
+        self.call_tickers.append(list(tickers))
+        if any(t.startswith('E') for t in tickers):
+            raise ConnectionError('connection dropped')
+        dates = pd.date_range(start_date, end_date)
+        columns = pd.MultiIndex.from_product([['Adj Close', 'Volume'], tickers])
+        data = pd.DataFrame(1., index=dates, columns=columns)
+        data.loc[:, [outage or t.startswith('X') for _, t in columns]] = np.nan
+        return data
+
+    def _validate(self, tickers, **kwargs):
+        return validate_tickers(tickers=tickers, provider=self._provider, batch_size=2,
+                                max_retries=0, calls_per_second=1000, **kwargs)
+
+    def test_validate_tickers(self):
+        result = self._validate(['AMZN', 'XYZ', 'ERR', 'TSLA'])
+        self.assertEqual(result.valid, ['AMZN'])
+        self.assertEqual(result.invalid, ['XYZ'])
+        # TSLA is in the same batch as ERR
+        self.assertEqual(result.failed, ['ERR', 'TSLA'])
+
+    def test_validate_tickers__cached(self):
+        self._validate(['AMZN', 'XYZ', 'ERR'])
+        self.calls.clear()
+        result = self._validate(['XYZ', 'AMZN', 'ERR'])
+        self.assertEqual(result.valid, ['AMZN'])
+        self.assertEqual(result.invalid, ['XYZ'])
+        # only the ticker that failed is checked again
+        self.assertEqual(self.calls, [['ERR']])
+
+    def test_validate_tickers__empty_batch_invalid(self):
+        # the control ticker has prices, so a batch with none is invalid and cached
+        result = self._validate(['XYZ', 'XAB', 'AMZN', 'XCD'])
+        self.assertEqual(result.valid, ['AMZN'])
+        self.assertEqual(result.invalid, ['XYZ', 'XAB', 'XCD'])
+        self.assertIn('XYZ', stocks._TICKER_CACHE)
+        self.assertTrue(all('SPY' in c for c in self.call_tickers))
+
+    def test_validate_tickers__outage(self):
+        # no prices for the control ticker either, so nothing is cached
+        result = validate_tickers(tickers=['AMZN', 'XYZ'],
+                                  provider=lambda *args: self._provider(*args, outage=True),
+                                  max_retries=0, calls_per_second=1000)
+        self.assertEqual(result.failed, ['AMZN', 'XYZ'])
+        self.assertEqual(stocks._TICKER_CACHE, {})
+
+    def test_validate_tickers__no_control(self):
+        result = self._validate(['XYZ', 'XAB', 'AMZN', 'XCD'], control_ticker=None)
+        self.assertEqual(result.invalid, ['XCD'])
+        self.assertEqual(result.failed, ['XYZ', 'XAB'])
+
+    def test_validate_tickers__expired(self):
+        self._validate(['AMZN'])
+        self._validate(['AMZN'], ttl=0)
+        self.assertEqual(self.calls, [['AMZN'], ['AMZN']])
+
+
 if __name__ == '__main__':
     unittest.main()
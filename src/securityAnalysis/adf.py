@@ -0,0 +1,208 @@
+"""
+Created on: 18 Oct 2026
+
+Batched augmented Dickey Fuller test, for testing many time series of the same length at once.
+Follows statsmodels.tsa.stattools.adfuller (same maximum lag, lag search sample, information
+criteria and MacKinnon p-values/critical values), but instead of fitting one OLS per lag per series,
+the lagged design matrices of a batch of series are stacked and QR decomposed together. The residual
+sum of squares of every candidate lag is then read off the one decomposition, as the regression on
+the first k columns of X only needs the first k columns of Q and R.
+"""
+from typing import NamedTuple, Union
+
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.adfvalues import mackinnoncrit, mackinnonp
+
+ADF_COLUMNS = ['Test Statistic', 'p-value', '#Lags Used', 'Number of Observations Used',
+               'Critical Value (1%)', 'Critical Value (5%)', 'Critical Value (10%)', 'IC Best']
+REGRESSION_TYPES = ('n', 'nc', 'c', 'ct', 'ctt')  # 'nc' is the statsmodels < 0.12 spelling of 'n'
+
+
+def _mackinnon_no_trend() -> str:
+    """Spelling of no deterministic terms understood by the installed statsmodels: 'nc' for the
+    pinned 0.10, 'n' from 0.12 on"""
+    try:
+        mackinnoncrit(N=1, regression='n')
+        return 'n'
+    except (ValueError, TypeError, KeyError):  # 0.10 raises a TypeError formatting its message
+        return 'nc'
+
+
+_MACKINNON_NO_TREND = _mackinnon_no_trend()
+# one record per series for output="array", so batch results stay columnar
+ADF_DTYPE = np.dtype([('statistic', np.float64), ('p_value', np.float64), ('lags', np.int64),
+                      ('nobs', np.int64), ('crit_1', np.float64), ('crit_5', np.float64),
+                      ('crit_10', np.float64), ('ic_best', np.float64)])
+
+
+class AdfResult(NamedTuple):
+    """Result of an augmented Dickey Fuller test on one series, as returned by adfuller"""
+    statistic: float
+    p_value: float
+    lags: int
+    nobs: int
+    critical_values: dict  # {'1%': , '5%': , '10%': }
+    ic_best: float
+
+
+def _max_lag(nobs: int, ntrend: int) -> int:
+    """Default maximum lag of adfuller (Schwert, 1989)"""
+    maxlag = int(np.ceil(12. * np.power(nobs / 100., 1 / 4.)))
+    maxlag = min(nobs // 2 - ntrend - 1, maxlag)
+    assert maxlag >= 0, "sample size is too short to use selected regression component"
+    return maxlag
+
+
+def _trend(nobs: int, ntrend: int) -> np.ndarray:
+    """Deterministic regressors: constant, linear and quadratic trend (nobs x ntrend)"""
+    time_trend = np.arange(1, nobs + 1, dtype=np.float64)
+    return time_trend[:, None] ** np.arange(ntrend)
+
+
+def _design(x: np.ndarray, lags: int, ntrend: int, level_first: bool):
+    """
+    Regression of the differenced series on its level and lagged differences for every series
+    (columns of x), with the sample trimmed so that `lags` lagged differences are available
+
+    Returns:
+        tuple: (y of shape (series, nobs), X of shape (series, nobs, ntrend + 1 + lags)), with
+        columns [trend, level, lags] if level_first else [trend, lags, level]
+    """
+    xdiff = np.diff(x, axis=0)
+    nobs = xdiff.shape[0] - lags
+    y = xdiff[lags:].T
+    level = x[lags:lags + nobs].T[:, :, None]
+    lagged = np.stack([xdiff[lags - j:lags - j + nobs].T for j in range(1, lags + 1)], axis=2) \
+        if lags else np.empty((x.shape[1], nobs, 0))
+    trend = np.broadcast_to(_trend(nobs, ntrend), (x.shape[1], nobs, ntrend))
+    blocks = (trend, level, lagged) if level_first else (trend, lagged, level)
+    return y, np.concatenate(blocks, axis=2)
+
+
+def _qr_fit(y: np.ndarray, X: np.ndarray):
+    """
+    Stacked least squares through QR decompositions
+
+    Returns:
+        tuple: (R of shape (series, k, k), Q'y of shape (series, k), residual sum of squares of
+        the regression on all k columns)
+    """
+    q, r = np.linalg.qr(X)
+    qty = np.einsum('snk,sn->sk', q, y)
+    resid = y - np.einsum('snk,sk->sn', q, qty)
+    return r, qty, np.einsum('sn,sn->s', resid, resid)
+
+
+def _select_lag(x: np.ndarray, maxlag: int, ntrend: int, autolag: str):
+    """
+    Information criterion of every lag from 0 to maxlag, on the sample trimmed by maxlag as in
+    adfuller, returning the best lag of each series (the smallest lag on a tie) and its criterion
+    """
+    y, X = _design(x, lags=maxlag, ntrend=ntrend, level_first=True)
+    nobs = y.shape[1]
+    _, qty, ssr_full = _qr_fit(y, X)
+
+    # ssr using the first k columns adds back the explained sum of squares of columns k+1 onwards
+    explained = np.square(qty)
+    tail = np.cumsum(explained[:, ::-1], axis=1)[:, ::-1]
+    tail = np.concatenate([tail[:, 1:], np.zeros((tail.shape[0], 1))], axis=1)
+    ssr = ssr_full[:, None] + tail[:, ntrend:]  # k from ntrend + 1 (level only) to ntrend+1+maxlag
+
+    k = np.arange(ntrend + 1, ntrend + maxlag + 2)
+    llf = -nobs / 2 * (np.log(2 * np.pi) + np.log(ssr / nobs) + 1)
+    penalty = 2 * k if autolag == 'aic' else np.log(nobs) * k
+    info_criterion = -2 * llf + penalty
+
+    best_lag = np.argmin(info_criterion, axis=1)
+    return best_lag, info_criterion[np.arange(len(best_lag)), best_lag]
+
+
+def _t_statistic(x: np.ndarray, lags: int, ntrend: int):
+    """t-statistic of the level coefficient, for series which all use the same number of lags"""
+    y, X = _design(x, lags=lags, ntrend=ntrend, level_first=False)
+    nobs, n_regressors = X.shape[1], X.shape[2]
+    r, qty, ssr = _qr_fit(y, X)
+    # level is the last column, so its coefficient is qty / r and its variance sigma^2 / r^2
+    sigma = np.sqrt(ssr / (nobs - n_regressors))
+    return qty[:, -1] * np.sign(r[:, -1, -1]) / sigma, nobs
+
+
+def adfuller_batch(data: Union[pd.DataFrame, np.ndarray],
+                   maxlag: int = None,
+                   regression: str = 'c',
+                   autolag: Union[str, None] = 'AIC',
+                   chunk_size: int = 256,
+                   output: str = "frame") -> Union[pd.DataFrame, np.ndarray]:
+    """
+    Augmented Dickey Fuller test on every column of data, matching statsmodels adfuller
+
+    Args:
+        data: Time series as columns, all of the same length with no NaNs
+        maxlag: Maximum lag of the differences, default 12 * (nobs / 100) ^ 1/4 as in adfuller
+        regression: Deterministic terms: 'n' (or 'nc') none, 'c' constant, 'ct' constant and
+            trend, 'ctt' constant, linear and quadratic trend
+        autolag: 'AIC' or 'BIC' to choose the lag by information criterion, None to use maxlag
+        chunk_size: Number of series decomposed at once, limits memory to about
+            chunk_size * nobs * (maxlag + 3) floats
+        output: "frame" for a DataFrame or "array" for a structured array of ADF_DTYPE
+
+    Returns:
+        pd.DataFrame: One row per series (indexed by column name), with the columns of ADF_COLUMNS
+        ('IC Best' is NaN when autolag is None). For output="array", a structured array with one
+        record per series in column order
+    """
+    assert output in ("frame", "array"), f"output of {output} must be one of frame or array"
+    assert regression in REGRESSION_TYPES, f"regression must be one of {REGRESSION_TYPES}"
+    assert autolag is None or autolag.lower() in ('aic', 'bic'), "autolag must be AIC, BIC or None"
+
+    if isinstance(data, pd.DataFrame):
+        index = data.columns
+        x = data.values.astype(np.float64)
+    else:
+        x = np.asarray(data, dtype=np.float64)
+        x = x[:, None] if x.ndim == 1 else x
+        index = pd.RangeIndex(x.shape[1])
+    assert not np.isnan(x).any(), "data must not contain NaNs"
+
+    regression = 'n' if regression == 'nc' else regression
+    mackinnon_regression = _MACKINNON_NO_TREND if regression == 'n' else regression
+    ntrend = 0 if regression == 'n' else len(regression)
+    if maxlag is None:
+        maxlag = _max_lag(nobs=x.shape[0], ntrend=ntrend)
+    else:
+        assert maxlag <= x.shape[0] // 2 - ntrend - 1, \
+            "maxlag must be less than (nobs/2 - 1 - ntrend)"
+
+    n_series = x.shape[1]
+    result = np.zeros(n_series, dtype=ADF_DTYPE)
+    result['lags'] = maxlag
+    result['ic_best'] = np.nan
+
+    if autolag is not None:
+        for start in range(0, n_series, chunk_size):
+            chunk = slice(start, start + chunk_size)
+            result['lags'][chunk], result['ic_best'][chunk] = \
+                _select_lag(x[:, chunk], maxlag=maxlag, ntrend=ntrend, autolag=autolag.lower())
+
+    # refit each group of series sharing a lag on its own (longer) sample
+    for lag in np.unique(result['lags']):
+        columns = np.flatnonzero(result['lags'] == lag)
+        for start in range(0, len(columns), chunk_size):
+            group = columns[start:start + chunk_size]
+            result['statistic'][group], result['nobs'][group] = \
+                _t_statistic(x[:, group], lags=int(lag), ntrend=ntrend)
+
+    result['p_value'] = [mackinnonp(i, regression=mackinnon_regression, N=1)
+                         for i in result['statistic']]
+    for nobs in np.unique(result['nobs']):
+        is_nobs = result['nobs'] == nobs
+        crit_values = mackinnoncrit(N=1, regression=mackinnon_regression, nobs=nobs)
+        for field, value in zip(('crit_1', 'crit_5', 'crit_10'), crit_values):
+            result[field][is_nobs] = value
+
+    if output == "array":
+        return result
+
+    columns = zip(ADF_COLUMNS, ADF_DTYPE.names)
+    return pd.DataFrame({column: result[field] for column, field in columns}, index=index)
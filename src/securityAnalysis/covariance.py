@@ -0,0 +1,278 @@
+"""
+Created on: 18 Oct 2026
+
+Covariance of returns for portfolio work. CovarianceEstimator keeps running sums of the returns
+(sufficient statistics), so new rows of returns update the estimate in O(rows * securities^2)
+instead of recalculating over the full history. It gives the sample covariance, the Ledoit-Wolf
+shrinkage covariance (as sklearn.covariance.ledoit_wolf) and an exponentially weighted covariance.
+get_covariance caches results keyed by a hash of the returns, so repeated optimisations reuse them.
+"""
+import threading
+from collections import OrderedDict
+from typing import Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from utils_generic import array_key
+
+COVARIANCE_METHODS = ("sample", "ledoit_wolf", "ewma")
+DEFAULT_EWMA_DECAY = 0.94  # RiskMetrics daily decay
+DEFAULT_MAX_ENTRIES = 32
+
+
+class CovarianceEstimator:
+    """
+    Running sums of returns for one universe of securities
+
+    Args:
+        securities: Names of the securities, in the column order of the returns given to update
+        ewma_decay: Weight of the previous estimate in the exponentially weighted covariance,
+            each row further back is weighted by another factor of ewma_decay
+        ledoit_wolf: Keep the fourth moment sums needed by ledoit_wolf_covariance, two more
+            securities^2 matrix products per update, False if only the sample or exponentially
+            weighted covariance is needed
+
+    Example:
+        >>> estimator = CovarianceEstimator.from_returns(returns_df)
+        >>> estimator.update(todays_returns_df)
+        >>> estimator.covariance(method="ledoit_wolf")
+    """
+    __slots__ = ("securities", "ewma_decay", "ledoit_wolf", "count", "as_of", "_sum", "_sum_sq",
+                 "_cross", "_cross_sq", "_cross_sq_lin", "_ewma_weight", "_ewma_sum",
+                 "_ewma_cross", "_results")
+
+    def __init__(self,
+                 securities: list,
+                 ewma_decay: float = DEFAULT_EWMA_DECAY,
+                 ledoit_wolf: bool = True):
+        assert 0 < ewma_decay < 1, f"ewma_decay of {ewma_decay} must lie between 0 and 1"
+        size = len(securities)
+        self.securities = list(securities)
+        self.ewma_decay = ewma_decay
+        self.ledoit_wolf = ledoit_wolf
+        self.count = 0
+        self.as_of = None
+        self._sum = np.zeros(size)
+        self._sum_sq = np.zeros(size)
+        self._cross = np.zeros((size, size))  # sum of r_i r_j
+        self._cross_sq = np.zeros((size, size))  # sum of r_i^2 r_j^2, for Ledoit-Wolf
+        self._cross_sq_lin = np.zeros((size, size))  # sum of r_i^2 r_j, for Ledoit-Wolf
+        self._ewma_weight = 0.
+        self._ewma_sum = np.zeros(size)
+        self._ewma_cross = np.zeros((size, size))
+        self._results = {}
+
+    @classmethod
+    def from_returns(cls,
+                     returns: pd.DataFrame,
+                     ewma_decay: float = DEFAULT_EWMA_DECAY,
+                     ledoit_wolf: bool = True):
+        """Estimator of the columns of returns, updated with every row"""
+        estimator = cls(securities=list(returns.columns), ewma_decay=ewma_decay,
+                        ledoit_wolf=ledoit_wolf)
+        estimator.update(returns)
+        return estimator
+
+    def update(self, returns: Union[pd.DataFrame, np.ndarray]) -> None:
+        """
+        Add new rows of returns
+
+        Args:
+            returns: Rows of returns with no NaNs, columns in the order of securities (a DataFrame
+                is aligned by column name and its last index value is kept as as_of)
+        """
+        if isinstance(returns, pd.DataFrame):
+            if len(returns.index):
+                self.as_of = returns.index[-1]
+            returns = returns.reindex(columns=self.securities).values
+        rtn = np.atleast_2d(np.asarray(returns, dtype=np.float64))
+        assert rtn.shape[1] == len(self.securities), \
+            f"returns have {rtn.shape[1]} columns, expected {len(self.securities)}"
+        assert not np.isnan(rtn).any(), "returns must not contain NaNs"
+
+        rtn_sq = np.square(rtn)
+        self.count += rtn.shape[0]
+        self._sum += rtn.sum(axis=0)
+        self._sum_sq += rtn_sq.sum(axis=0)
+        self._cross += rtn.T @ rtn
+        if self.ledoit_wolf:
+            self._cross_sq += rtn_sq.T @ rtn_sq
+            self._cross_sq_lin += rtn_sq.T @ rtn
+
+        # the newest row has weight 1, each earlier row ewma_decay times the row after it
+        weights = self.ewma_decay ** np.arange(rtn.shape[0] - 1, -1, -1)
+        decay = self.ewma_decay ** rtn.shape[0]
+        self._ewma_weight = decay * self._ewma_weight + weights.sum()
+        self._ewma_sum = decay * self._ewma_sum + weights @ rtn
+        self._ewma_cross = decay * self._ewma_cross + (rtn * weights[:, None]).T @ rtn
+
+        self._results = {}
+
+    @property
+    def mean(self) -> np.ndarray:
+        return self._sum / self.count
+
+    def _centred_cross(self) -> np.ndarray:
+        """Sum of (r_i - mean_i)(r_j - mean_j)"""
+        return self._cross - self.count * np.outer(self.mean, self.mean)
+
+    def sample_covariance(self, ddof: int = 1) -> np.ndarray:
+        """Sample covariance, as pd.DataFrame.cov for ddof=1"""
+        assert self.count > ddof, "Not enough returns for the covariance"
+        return self._centred_cross() / (self.count - ddof)
+
+    def ledoit_wolf_covariance(self) -> Tuple[np.ndarray, float]:
+        """
+        Ledoit-Wolf shrinkage of the (biased) sample covariance towards a scaled identity,
+        matching sklearn.covariance.ledoit_wolf
+
+        Returns:
+            tuple: (shrunk covariance, shrinkage)
+        """
+        assert self.ledoit_wolf, "Create the estimator with ledoit_wolf=True for shrinkage"
+        assert self.count > 1, "Not enough returns for the covariance"
+        n_samples, n_features = self.count, len(self.securities)
+        mean = self.mean
+        emp_cov = self._centred_cross() / n_samples
+        emp_cov_trace = np.diag(emp_cov)
+        mu = emp_cov_trace.sum() / n_features
+
+        # sum over rows of (r_i - mean_i)^2 (r_j - mean_j)^2, expanded into the running sums
+        mean_i, mean_j = mean[:, None], mean[None, :]
+        sum_i, sum_j = self._sum[:, None], self._sum[None, :]
+        sum_sq_i, sum_sq_j = self._sum_sq[:, None], self._sum_sq[None, :]
+        centred_cross_sq = (self._cross_sq
+                            - 2 * mean_j * self._cross_sq_lin
+                            - 2 * mean_i * self._cross_sq_lin.T
+                            + np.square(mean_j) * sum_sq_i
+                            + np.square(mean_i) * sum_sq_j
+                            + 4 * mean_i * mean_j * self._cross
+                            - 2 * mean_i * np.square(mean_j) * sum_i
+                            - 2 * np.square(mean_i) * mean_j * sum_j
+                            + n_samples * np.square(mean_i) * np.square(mean_j))
+
+        delta_ = np.sum(np.square(self._centred_cross())) / n_samples ** 2
+        beta_ = np.sum(centred_cross_sq)
+        beta = 1. / (n_features * n_samples) * (beta_ / n_samples - delta_)
+        delta = (delta_ - 2. * mu * emp_cov_trace.sum() + n_features * mu ** 2) / n_features
+        beta = min(beta, delta)
+        shrinkage = 0. if beta == 0 else beta / delta
+
+        shrunk_cov = (1. - shrinkage) * emp_cov
+        shrunk_cov.flat[::n_features + 1] += shrinkage * mu
+        return shrunk_cov, shrinkage
+
+    def ewma_covariance(self) -> np.ndarray:
+        """
+        Exponentially weighted covariance about the weighted mean, as
+        pd.DataFrame.ewm(alpha=1 - ewma_decay).cov(bias=True) on the last row
+        """
+        assert self.count > 0, "Not enough returns for the covariance"
+        ewma_mean = self._ewma_sum / self._ewma_weight
+        return self._ewma_cross / self._ewma_weight - np.outer(ewma_mean, ewma_mean)
+
+    def covariance(self, method: str = "sample") -> pd.DataFrame:
+        """
+        Covariance by method, calculated once per update
+
+        Args:
+            method: One of COVARIANCE_METHODS
+
+        Returns:
+            pd.DataFrame: securities x securities covariance
+        """
+        assert method in COVARIANCE_METHODS, f"method must be one of {COVARIANCE_METHODS}"
+        if method not in self._results:
+            if method == "sample":
+                cov = self.sample_covariance()
+            elif method == "ledoit_wolf":
+                cov, _ = self.ledoit_wolf_covariance()
+            else:
+                cov = self.ewma_covariance()
+            self._results[method] = pd.DataFrame(cov, index=self.securities,
+                                                 columns=self.securities)
+        return self._results[method]
+
+
+class CovarianceCache:
+    """
+    Least recently used cache of covariance matrices, keyed by a hash of the returns, method and
+    parameters
+
+    Args:
+        max_entries: Number of covariance matrices kept, each is securities^2 floats
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Union[pd.DataFrame, None]:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: str, cov: pd.DataFrame) -> None:
+        with self._lock:
+            self._entries[key] = cov
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_CACHE = CovarianceCache()
+
+
+def get_cache() -> CovarianceCache:
+    """Process wide cache used by get_covariance"""
+    return _CACHE
+
+
+def get_covariance(returns: pd.DataFrame,
+                   method: str = "sample",
+                   ewma_decay: float = DEFAULT_EWMA_DECAY,
+                   use_cache: bool = True) -> pd.DataFrame:
+    """
+    Covariance of returns, reusing the cached result for the same returns (values, columns and
+    dates) and method
+
+    Args:
+        returns: Returns with securities as columns and no NaNs (drop the first row of
+            calculate_return_df)
+        method: "sample", "ledoit_wolf" (shrinkage) or "ewma" (exponentially weighted)
+        ewma_decay: Decay of the exponentially weighted covariance
+        use_cache: Look up and store the result in the process wide cache
+
+    Returns:
+        pd.DataFrame: securities x securities covariance
+    """
+    assert method in COVARIANCE_METHODS, f"method must be one of {COVARIANCE_METHODS}"
+    if use_cache:
+        # hashing the values is O(rows * securities), the covariance O(rows * securities^2)
+        key = array_key(returns.values,
+                        columns=tuple(returns.columns),
+                        index=(str(returns.index[0]), str(returns.index[-1])) if len(returns)
+                        else None,
+                        method=method,
+                        ewma_decay=ewma_decay if method == "ewma" else None)
+        cov = _CACHE.get(key)
+        if cov is not None:
+            return cov
+
+    estimator = CovarianceEstimator.from_returns(returns, ewma_decay=ewma_decay,
+                                                 ledoit_wolf=method == "ledoit_wolf")
+    cov = estimator.covariance(method)
+    if use_cache:
+        _CACHE.put(key, cov)
+    return cov
@@ -4,25 +4,293 @@ Created on: 5 May 2019
 Efficient frontier for a given portfolio of securities, thus portfolio optimisation
 Inspiration:
 https://towardsdatascience.com/efficient-frontier-portfolio-optimisation-in-python-e7844051e7f
+
+The annualised mean returns and covariance are computed once (get_portfolio_moments) and passed to
+the optimisers. Without a long only constraint the minimum variance, maximum Sharpe and target
+return portfolios have closed form solutions, so the whole frontier is one matrix expression.
+Long only portfolios are solved with SLSQP.
 """
+from typing import NamedTuple, Tuple, Union
 
 import numpy as np
 import pandas as pd
+from scipy.optimize import minimize
+
+from securityAnalysis.covariance import get_covariance
+from securityAnalysis.utils_finance import calculate_return_df
+
+
+class PortfolioStats(NamedTuple):
+    """Weights and annualised performance of one portfolio"""
+    weights: pd.Series
+    annualised_return: float
+    annualised_volatility: float
+    sharpe_ratio: float
+
+
+def get_portfolio_moments(data: pd.DataFrame,
+                          is_returns: bool = False,
+                          periods_per_year: int = 252,
+                          cov_method: str = "sample") -> Tuple[pd.Series, pd.DataFrame]:
+    """
+    Annualised mean return vector and covariance matrix, the inputs of every optimiser here
+
+    Args:
+        data: Prices (or returns if is_returns) with securities as columns
+        is_returns: data is already returns, e.g. from calculate_return_df
+        periods_per_year: Number of periods (rows) per year used to annualise
+        cov_method: "sample", "ledoit_wolf" or "ewma", see covariance.get_covariance (results
+            are cached). Rows with a NaN return are dropped, so both moments use the same rows
+
+    Returns:
+        tuple: (mean returns as pd.Series, covariance as pd.DataFrame), both annualised
+    """
+    returns = data if is_returns else calculate_return_df(data=data, is_relative_return=True)
+    returns = returns.dropna()
+    cov = get_covariance(returns=returns, method=cov_method)
+    return returns.mean() * periods_per_year, cov * periods_per_year
+
+
+def get_portfolio_performance(weights: np.ndarray,
+                              mean_returns: Union[pd.Series, np.ndarray],
+                              cov: Union[pd.DataFrame, np.ndarray],
+                              risk_free: float = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Annualised return, volatility and Sharpe ratio of many portfolios at once
+
+    Args:
+        weights: Weights of one portfolio (n,) or of m portfolios as rows (m, n)
+        mean_returns: Annualised mean returns from get_portfolio_moments
+        cov: Annualised covariance from get_portfolio_moments
+        risk_free: Risk free rate, as a decimal
+
+    Returns:
+        tuple: (returns, volatilities, Sharpe ratios), each of shape (m,) (or scalars for one
+        portfolio)
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    mean_returns, cov = np.asarray(mean_returns), np.asarray(cov)
+    portfolio_return = weights @ mean_returns
+    # w' cov w for every row of weights, without forming the (m, m) matrix
+    portfolio_vol = np.sqrt(np.sum((weights @ cov) * weights, axis=-1))
+    return portfolio_return, portfolio_vol, (portfolio_return - risk_free) / portfolio_vol
+
+
+def _portfolio_stats(weights: np.ndarray,
+                     mean_returns: pd.Series,
+                     cov: pd.DataFrame,
+                     risk_free: float) -> PortfolioStats:
+    portfolio_return, portfolio_vol, sharpe = \
+        get_portfolio_performance(weights, mean_returns, cov, risk_free)
+    return PortfolioStats(weights=pd.Series(weights, index=mean_returns.index),
+                          annualised_return=float(portfolio_return),
+                          annualised_volatility=float(portfolio_vol),
+                          sharpe_ratio=float(sharpe))
+
+
+def _solve_long_only(objective, n_securities: int, constraints: list = ()) -> np.ndarray:
+    """SLSQP over fully invested, long only weights, starting from equal weights"""
+    result = minimize(objective,
+                      x0=np.repeat(1 / n_securities, n_securities),
+                      method='SLSQP',
+                      bounds=[(0, 1)] * n_securities,
+                      constraints=[{'type': 'eq', 'fun': lambda w: np.sum(w) - 1}, *constraints])
+    assert result.success, f"Optimisation failed: {result.message}"
+    return result.x
+
+
+def get_min_variance_portfolio(mean_returns: pd.Series,
+                               cov: pd.DataFrame,
+                               risk_free: float = 0,
+                               long_only: bool = False) -> PortfolioStats:
+    """
+    Fully invested portfolio with the lowest volatility
+
+    Args:
+        mean_returns: Annualised mean returns from get_portfolio_moments
+        cov: Annualised covariance from get_portfolio_moments
+        risk_free: Risk free rate, used for the Sharpe ratio
+        long_only: Weights must lie between 0 and 1, otherwise short positions are allowed
+
+    Returns:
+        PortfolioStats: weights, annualised return, volatility and Sharpe ratio
+    """
+    cov_arr = np.asarray(cov)
+    if long_only:
+        weights = _solve_long_only(lambda w: w @ cov_arr @ w, n_securities=len(mean_returns))
+    else:
+        inv_ones = np.linalg.solve(cov_arr, np.ones(len(mean_returns)))
+        weights = inv_ones / inv_ones.sum()
+    return _portfolio_stats(weights, mean_returns, cov, risk_free)
+
+
+def get_max_sharpe_portfolio(mean_returns: pd.Series,
+                             cov: pd.DataFrame,
+                             risk_free: float = 0,
+                             long_only: bool = False) -> PortfolioStats:
+    """
+    Fully invested portfolio with the highest Sharpe ratio (the tangency portfolio)
+
+    Args:
+        mean_returns: Annualised mean returns from get_portfolio_moments
+        cov: Annualised covariance from get_portfolio_moments
+        risk_free: Risk free rate, as a decimal
+        long_only: Weights must lie between 0 and 1, otherwise short positions are allowed
+
+    Returns:
+        PortfolioStats: weights, annualised return, volatility and Sharpe ratio
+    """
+    mean_arr, cov_arr = np.asarray(mean_returns), np.asarray(cov)
+    if long_only:
+        def negative_sharpe(w):
+            return -(w @ mean_arr - risk_free) / np.sqrt(w @ cov_arr @ w)
+        weights = _solve_long_only(negative_sharpe, n_securities=len(mean_arr))
+    else:
+        excess = np.linalg.solve(cov_arr, mean_arr - risk_free)
+        assert excess.sum() > 0, \
+            "No tangency portfolio: the minimum variance return is below the risk free rate"
+        weights = excess / excess.sum()
+    return _portfolio_stats(weights, mean_returns, cov, risk_free)
+
+
+def get_target_return_weights(mean_returns: pd.Series,
+                              cov: pd.DataFrame,
+                              target_returns: Union[float, np.ndarray],
+                              long_only: bool = False) -> np.ndarray:
+    """
+    Weights of the lowest volatility, fully invested portfolio for each target return. Without
+    the long only constraint every target is solved at once from the closed form
+        w = ((C - B t) inv(cov) 1 + (A t - B) inv(cov) mu) / (AC - B^2)
+    with A = 1' inv(cov) 1, B = 1' inv(cov) mu and C = mu' inv(cov) mu
+
+    Args:
+        mean_returns: Annualised mean returns from get_portfolio_moments
+        cov: Annualised covariance from get_portfolio_moments
+        target_returns: Annualised target return(s)
+        long_only: Weights must lie between 0 and 1, so targets must lie between the lowest and
+            highest mean return
+
+    Returns:
+        np.array: weights with one row per target return (m, n)
+    """
+    mean_arr, cov_arr = np.asarray(mean_returns), np.asarray(cov)
+    targets = np.atleast_1d(np.asarray(target_returns, dtype=np.float64))
+
+    if long_only:
+        assert mean_arr.min() <= targets.min() and targets.max() <= mean_arr.max(), \
+            "Long only target returns must lie between the lowest and highest mean returns"
+        weights = []
+        for target in targets:
+            weights.append(_solve_long_only(
+                lambda w: w @ cov_arr @ w,
+                n_securities=len(mean_arr),
+                constraints=[{'type': 'eq', 'fun': lambda w, t=target: w @ mean_arr - t}]))
+        return np.array(weights)
+
+    inv_ones, inv_mean = np.linalg.solve(cov_arr, np.column_stack([np.ones(len(mean_arr)),
+                                                                    mean_arr])).T
+    a, b, c = inv_ones.sum(), inv_mean.sum(), mean_arr @ inv_mean
+    d = a * c - b ** 2
+    return (np.outer(c - b * targets, inv_ones) + np.outer(a * targets - b, inv_mean)) / d
+
+
+def get_efficient_frontier(mean_returns: pd.Series,
+                           cov: pd.DataFrame,
+                           n_points: int = 50,
+                           risk_free: float = 0,
+                           long_only: bool = False,
+                           max_return: float = None) -> pd.DataFrame:
+    """
+    Efficient frontier from the minimum variance portfolio up to max_return
+
+    Args:
+        mean_returns: Annualised mean returns from get_portfolio_moments
+        cov: Annualised covariance from get_portfolio_moments
+        n_points: Number of target returns on the frontier
+        risk_free: Risk free rate, used for the Sharpe ratio
+        long_only: Weights must lie between 0 and 1, otherwise short positions are allowed
+        max_return: Highest target return, default the highest mean return of a security
+
+    Returns:
+        pd.DataFrame: One row per point, with columns 'Return', 'Volatility', 'Sharpe Ratio'
+        followed by the weight of each security
+    """
+    min_variance = get_min_variance_portfolio(mean_returns, cov, long_only=long_only)
+    max_return = mean_returns.max() if max_return is None else max_return
+    targets = np.linspace(min_variance.annualised_return, max_return, n_points)
+
+    weights = get_target_return_weights(mean_returns, cov, targets, long_only=long_only)
+    portfolio_return, portfolio_vol, sharpe = \
+        get_portfolio_performance(weights, mean_returns, cov, risk_free)
+
+    frontier_df = pd.DataFrame({'Return': portfolio_return,
+                                'Volatility': portfolio_vol,
+                                'Sharpe Ratio': sharpe})
+    weights_df = pd.DataFrame(weights, columns=mean_returns.index)
+    return pd.concat([frontier_df, weights_df], axis=1)
+
+
+def simulate_portfolios(mean_returns: pd.Series,
+                        cov: pd.DataFrame,
+                        n_portfolios: int = 100000,
+                        risk_free: float = 0,
+                        random_state: np.random.RandomState = None,
+                        chunk_size: int = 100000,
+                        return_weights: bool = False) -> pd.DataFrame:
+    """
+    Monte Carlo portfolios with random long only weights (uniform over fully invested weights),
+    evaluated in chunks of matrix products rather than one portfolio at a time
+
+    Args:
+        mean_returns: Annualised mean returns from get_portfolio_moments
+        cov: Annualised covariance from get_portfolio_moments
+        n_portfolios: Number of random portfolios
+        risk_free: Risk free rate, used for the Sharpe ratio
+        random_state: numpy RandomState, for reproducible portfolios
+        chunk_size: Portfolios evaluated at once, limits memory to chunk_size * securities floats
+        return_weights: Include the weight of each security as columns
+
+    Returns:
+        pd.DataFrame: One row per portfolio with columns 'Return', 'Volatility', 'Sharpe Ratio'
+        (and the weights if return_weights)
+    """
+    random_state = random_state or np.random.RandomState()
+    n_securities = len(mean_returns)
+    results = np.empty((n_portfolios, 3))
+    all_weights = np.empty((n_portfolios, n_securities)) if return_weights else None
+
+    for start in range(0, n_portfolios, chunk_size):
+        stop = min(start + chunk_size, n_portfolios)
+        weights = random_state.dirichlet(np.ones(n_securities), size=stop - start)
+        results[start:stop] = np.column_stack(
+            get_portfolio_performance(weights, mean_returns, cov, risk_free))
+        if return_weights:
+            all_weights[start:stop] = weights
+
+    simulation_df = pd.DataFrame(results, columns=['Return', 'Volatility', 'Sharpe Ratio'])
+    if return_weights:
+        weights_df = pd.DataFrame(all_weights, columns=mean_returns.index)
+        simulation_df = pd.concat([simulation_df, weights_df], axis=1)
+    return simulation_df
 
-if __name__ == "main":
 
-    # For a given dataframe of security price data (sec_df) with n columns
-    # returns = sec_df.pct_change(), mean_returns = returns.mean()
-    # cov = returns.cov()
-    from src.small_projects.random_walks import random_price
+if __name__ == "__main__":
 
-    a, b = pd.Series(random_price(start=500, tick=2, num_walks=499)), pd.Series(
-        random_price(start=1000, tick=1, num_walks=499))
-    example_df = pd.DataFrame(data=pd.concat([a, b], axis=1))
-    # index=pd.date_range(start="2000-01-01", periods=500)
-    returns = example_df.pct_change()
-    mean_returns, cov = returns.mean(), returns.cov()
+    # random walks standing in for a dataframe of security price data (sec_df) with n columns
+    random_state = np.random.RandomState(0)
+    daily_rtn = random_state.normal(loc=[0.0004, 0.0006, 0.0002, 0.0008],
+                                    scale=[0.01, 0.015, 0.008, 0.02],
+                                    size=(500, 4))
+    example_df = pd.DataFrame(100 * np.cumprod(1 + daily_rtn, axis=0),
+                              index=pd.date_range(start="2000-01-01", periods=500),
+                              columns=['stock_a', 'stock_b', 'stock_c', 'stock_d'])
 
-    annualised_portfolio_returns = np.sum(mean_returns * np.repeat(0.5, 2)) * 252
-    std = np.sqrt(np.dot(np.repeat(0.5, 2).T, np.dot(cov, np.repeat(0.5, 2)))) * np.sqrt(252)
+    mean_returns, cov = get_portfolio_moments(data=example_df)
 
+    print(get_min_variance_portfolio(mean_returns, cov))
+    print(get_max_sharpe_portfolio(mean_returns, cov, risk_free=0.01, long_only=True))
+    frontier_df = get_efficient_frontier(mean_returns, cov, risk_free=0.01, long_only=True)
+    simulation_df = simulate_portfolios(mean_returns, cov, n_portfolios=200000,
+                                        risk_free=0.01, random_state=random_state)
+    print(frontier_df.head())
+    print(simulation_df.describe())
@@ -0,0 +1,125 @@
+"""
+Created on: 18 Oct 2026
+
+Streaming (online) risk metrics for live price updates. The accumulator keeps a running count,
+mean and sum of squared deviations of returns per security (Welford's method), so each new price
+updates annualised return, volatility and Sharpe ratio in O(securities) without recalculating
+over the history. Definitions match calculate_annualised_return_df and
+calculate_annual_volatility_df in utils_finance.
+"""
+from typing import List, Union
+
+import numpy as np
+import pandas as pd
+
+
+class OnlineMetricAccumulator:
+    """
+    Running return statistics, one array slot per security
+
+    Args:
+        securities: Names of the securities, in the order prices are given to update
+        periods_per_year: Number of updates per year used to annualise (252 for daily prices)
+
+    Example:
+        >>> acc = OnlineMetricAccumulator.from_prices(price_df)
+        >>> acc.update({'AMZN': 3210.5, 'GOOGL': 1752.3})
+        >>> acc.sharpe_ratio(risk_free=0.01)
+    """
+    __slots__ = ("securities", "periods_per_year", "last_price", "count", "mean", "m2")
+
+    def __init__(self, securities: List[str], periods_per_year: int = 252):
+        size = len(securities)
+        self.securities = list(securities)
+        self.periods_per_year = periods_per_year
+        self.last_price = np.full(size, np.nan)
+        self.count = np.zeros(size, dtype=np.int64)
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+
+    @classmethod
+    def from_prices(cls, data: pd.DataFrame, periods_per_year: int = 252):
+        """Seed the accumulator from a history of prices (securities as columns) in one pass,
+        missing prices are handled as in update"""
+        acc = cls(securities=list(data.columns), periods_per_year=periods_per_year)
+        values = data.values.astype(np.float64)
+        daily_rtn = values[1:] / values[:-1] - 1
+
+        acc.count = np.sum(~np.isnan(daily_rtn), axis=0).astype(np.int64)
+        has_returns = acc.count > 0
+        acc.mean[has_returns] = np.nanmean(daily_rtn[:, has_returns], axis=0)
+        acc.m2[has_returns] = np.nansum(
+            np.square(daily_rtn[:, has_returns] - acc.mean[has_returns]), axis=0)
+        acc.last_price = values[-1]
+        return acc
+
+    def update(self, prices: Union[np.ndarray, list, pd.Series, dict]) -> None:
+        """
+        Add the next prices. A missing (NaN) price gives no return into or out of the gap, as
+        calculate_return_df, so the next price after it (like the first price of a security) only
+        sets its last price. Securities left out of a Series/dict (a partial tick) are unchanged.
+
+        Args:
+            prices: Array in the order of securities (a NaN leaves that security unchanged), or
+                Series/dict keyed by security (an explicit NaN breaks the chain of returns)
+        """
+        if isinstance(prices, dict):
+            prices = pd.Series(prices, dtype=np.float64)
+        if isinstance(prices, pd.Series):
+            present = np.isin(self.securities, prices.index)
+            prices = prices.reindex(self.securities).values.astype(np.float64)
+        else:
+            prices = np.asarray(prices, dtype=np.float64)
+            present = ~np.isnan(prices)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rtn = prices / self.last_price - 1
+        valid = ~np.isnan(rtn)
+
+        self.count[valid] += 1
+        delta = rtn[valid] - self.mean[valid]
+        self.mean[valid] += delta / self.count[valid]
+        self.m2[valid] += delta * (rtn[valid] - self.mean[valid])
+        self.last_price = np.where(present, prices, self.last_price)
+
+    def _series(self, values: np.ndarray) -> pd.Series:
+        values = np.where(self.count > 0, values, np.nan)
+        return pd.Series(values, index=self.securities)
+
+    @property
+    def annualised_return(self) -> pd.Series:
+        """Mean return multiplied by periods_per_year"""
+        return self._series(self.mean * self.periods_per_year)
+
+    @property
+    def annual_volatility(self) -> pd.Series:
+        """Population standard deviation of returns, annualised"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            variance = self.m2 / self.count
+        return self._series(np.sqrt(variance * self.periods_per_year))
+
+    def sharpe_ratio(self, risk_free: float = 0) -> pd.Series:
+        """Annualised return less risk_free, divided by annualised volatility"""
+        return (self.annualised_return - risk_free) / self.annual_volatility
+
+    def save(self, path: str) -> None:
+        """Snapshot the accumulator to a .npz file"""
+        np.savez(path,
+                 securities=np.array(self.securities, dtype=str),
+                 periods_per_year=self.periods_per_year,
+                 last_price=self.last_price,
+                 count=self.count,
+                 mean=self.mean,
+                 m2=self.m2)
+
+    @classmethod
+    def load(cls, path: str):
+        """Restore an accumulator saved with save"""
+        with np.load(path, allow_pickle=False) as snapshot:
+            acc = cls(securities=snapshot["securities"].tolist(),
+                      periods_per_year=int(snapshot["periods_per_year"]))
+            acc.last_price = snapshot["last_price"]
+            acc.count = snapshot["count"]
+            acc.mean = snapshot["mean"]
+            acc.m2 = snapshot["m2"]
+        return acc
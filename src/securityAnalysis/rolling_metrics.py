@@ -0,0 +1,92 @@
+"""
+Created on: 18 Oct 2026
+
+Rolling window risk metrics (annualised return, volatility, Sharpe and Sortino ratios) for many
+securities at once. Running sums of the returns are taken once, so each window costs O(n) for
+every security regardless of the window length, instead of O(n * w) for recalculating each window.
+"""
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+
+ROLLING_METRICS = ('Annualised Return', 'Annualised Volatility', 'Sharpe Ratio', 'Sortino Ratio')
+
+
+def _running_sum(a: np.ndarray) -> np.ndarray:
+    """Cumulative sum down the rows with a leading row of zeros, so that the sum of rows i to j
+    (inclusive) is out[j + 1] - out[i]"""
+    out = np.zeros((a.shape[0] + 1, a.shape[1]))
+    np.cumsum(a, axis=0, out=out[1:])
+    return out
+
+
+def _window_sum(running_sum: np.ndarray, start: np.ndarray) -> np.ndarray:
+    """Sum over the window ending on each row, start is the first row of each window"""
+    return running_sum[1:] - running_sum[start]
+
+
+def calculate_rolling_metrics(returns: pd.DataFrame,
+                              windows: Iterable[int] = (21, 63, 252),
+                              risk_free: float = 0,
+                              target_return: float = 0,
+                              min_periods: int = None,
+                              periods_per_year: int = 252) -> Dict[int, pd.DataFrame]:
+    """
+    Rolling annualised return, volatility (population standard deviation, as in utils_finance),
+    Sharpe and Sortino ratios over each window, vectorised across columns.
+
+    Args:
+        returns: Daily returns with securities as columns, e.g. from calculate_return_df.
+            NaNs are treated as missing observations.
+        windows: Window lengths in rows
+        risk_free: Risk free rate, as a decimal
+        target_return: Target (daily) return for the Sortino ratio
+        min_periods: Non-NaN returns required in a window, default the window length
+        periods_per_year: Number of periods used to annualise
+
+    Returns:
+        dict: {window: pd.DataFrame with (metric, security) columns, on the returns index}
+    """
+    values = returns.values.astype(np.float64)
+    is_valid = ~np.isnan(values)
+
+    # centre each column before squaring, so the running sums stay small and the variance
+    # does not suffer from cancellation on long histories
+    centre = np.nanmean(values, axis=0)
+    centred = np.where(is_valid, values - centre, 0.)
+    downside = np.where(is_valid, np.minimum(values - target_return, 0), 0.)
+
+    count_sum = _running_sum(is_valid.astype(np.float64))
+    rtn_sum = _running_sum(centred)
+    sq_sum = _running_sum(np.square(centred))
+    downside_sq_sum = _running_sum(np.square(downside))
+
+    result = {}
+    for window in windows:
+        assert 0 < window <= len(values), f"window {window} must be between 1 and {len(values)}"
+        periods = window if min_periods is None else min_periods
+
+        # window ending on each row, the first rows only have a partial window
+        start = np.maximum(np.arange(1, len(values) + 1) - window, 0)
+        count = _window_sum(count_sum, start)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_centred = _window_sum(rtn_sum, start) / count
+            variance = np.maximum(_window_sum(sq_sum, start) / count - np.square(mean_centred), 0)
+            downside_dev = np.sqrt(_window_sum(downside_sq_sum, start) / count)
+
+            mean_rtn = mean_centred + centre
+            ann_rtn = mean_rtn * periods_per_year
+            ann_vol = np.sqrt(variance * periods_per_year)
+            metrics = (ann_rtn,
+                       ann_vol,
+                       (ann_rtn - risk_free) / ann_vol,
+                       (mean_rtn - risk_free) / downside_dev)
+
+        frames = {}
+        for name, metric in zip(ROLLING_METRICS, metrics):
+            metric[count < periods] = np.nan
+            frames[name] = pd.DataFrame(metric, index=returns.index, columns=returns.columns)
+        result[window] = pd.concat(frames, axis=1)
+
+    return result
@@ -6,6 +6,11 @@ Provide summary statistics on the data
 Introduce tests (such as Augmented Dickey Fuller) to check stationarity of time series
 Inspiration from: https://www.analyticsvidhya.com/blog/2018/09/non-stationary-time-series-python/
 """
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional, Union
+
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
@@ -13,6 +18,8 @@ import scipy.stats as stats
 from scipy.stats import kurtosis, skew
 from statsmodels.tsa.stattools import adfuller
 
+from securityAnalysis.adf import AdfResult, adfuller_batch
+from securityAnalysis.stationarity_cache import get_cache, series_key
 from securityAnalysis.utils_finance import calculate_return_df
 
 pd.set_option('display.max_columns', 10)
@@ -20,17 +27,40 @@ pd.set_option('display.width', 500)
 plt.style.use('seaborn')
 
 
-def test_stationarity_adf(time_series: np.array) -> None:
+def _adf_key(time_series: np.array) -> str:
+    return series_key(time_series, test='adf', autolag='AIC')
+
+
+def _adf_result(time_series: np.array, use_cache: bool = False) -> AdfResult:
+    """adfuller with the AIC lag search, as a typed record (from the stationarity cache if
+    use_cache and this series has been tested before)"""
+    if not use_cache:
+        return AdfResult(*adfuller(time_series, autolag='AIC'))
+
+    key = _adf_key(time_series)
+    df_test = get_cache().get(key)
+    if df_test is None:
+        df_test = AdfResult(*adfuller(time_series, autolag='AIC'))
+        get_cache().put(key, df_test)
+    return df_test
+
+
+def test_stationarity_adf(time_series: np.array,
+                          log: Optional[Callable[[str], None]] = print,
+                          use_cache: bool = False) -> AdfResult:
     """
     Wrapper on adfuller method from statsmodels package, to perform Dickey-Fuller test for
     Stationarity
 
     Parameter:
         time_series: time series containing non-null values which to perform stationarity test on
+        log: Called with the formatted results, None for no output
+        use_cache: Return the result from the stationarity cache if this series (by value) has
+            been tested before
 
     Returns
-        None: Print statement of ['Test Statistic', 'p-value', '# lags', '# observations', and
-        critical values for alpha 1, 5 and 10%
+        AdfResult: Test statistic, p-value, # lags, # observations, critical values for alpha 1,
+        5 and 10% and the best information criterion
 
     NOTE:
         Test statistic: t
@@ -39,17 +69,23 @@ def test_stationarity_adf(time_series: np.array) -> None:
         If t < c, reject H_0 --> time series is stationary
         If t > c, fail to reject H_0 --> time series is non-stationary (has some drift with time)
     """
-    print('Results of Dickey-Fuller Test:')
-    df_test = adfuller(time_series, autolag='AIC')
-    df_output = pd.Series(df_test[0:4],
-                          index=['Test Statistic', 'p-value', '#Lags Used',
-                                 'Number of Observations Used'])
-    for key, value in df_test[4].items():
-        df_output['Critical Value (%s)' % key] = value
-    print(df_output)
-
-
-def get_aug_dickey_fuller_result(time_series: np.array, alpha: int = 5) -> bool:
+    df_test = _adf_result(time_series, use_cache=use_cache)
+    if log is not None:
+        df_output = pd.Series(df_test[0:4],
+                              index=['Test Statistic', 'p-value', '#Lags Used',
+                                     'Number of Observations Used'])
+        for key, value in df_test.critical_values.items():
+            df_output['Critical Value (%s)' % key] = value
+        log('Results of Dickey-Fuller Test:')
+        log(str(df_output))
+
+    return df_test
+
+
+def get_aug_dickey_fuller_result(time_series: np.array,
+                                 alpha: int = 5,
+                                 log: Optional[Callable[[str], None]] = print,
+                                 use_cache: bool = False) -> bool:
     """
     Method to perform Augmented Dickey Fuller Test for stationarity on time_series, at a
     given level of significance alpha
@@ -57,38 +93,172 @@ def get_aug_dickey_fuller_result(time_series: np.array, alpha: int = 5) -> bool:
     Parameters:
         time_series: 1-D array of time series data to be tested for stationarity
         alpha: chosen level of significance, must be one of 1,5 or 10%
+        log: Called with progress messages, None for no output
+        use_cache: Use the stationarity cache, so only series not tested before are tested
 
     Returns:
         bool: True if stationary data (t-statistic less than critical value at significance level
         alpha, reject H_0), False for non-stationary data
     """
     assert alpha in [1, 5, 10], "Choose appropriate alpha significance: [1, 5 or 10%]"
-    print(f"Performing augmented Dickey Fuller test at significance level alpha: {alpha}")
+    if log is not None:
+        log(f"Performing augmented Dickey Fuller test at significance level alpha: {alpha}")
 
-    df_test = adfuller(time_series, autolag='AIC')
-    test_stats = {
-        'test_statistic': df_test[0],
-        'p-values': df_test[4]
-    }
-    is_stationary = test_stats['test_statistic'] < test_stats['p-values'][f"{str(alpha)}%"]
+    df_test = _adf_result(time_series, use_cache=use_cache)
+    is_stationary = df_test.statistic < df_test.critical_values[f"{str(alpha)}%"]
 
     return is_stationary
 
 
-def get_descriptive_stats(data: pd.DataFrame, alpha: float = 0.05) -> dict:
+def get_aug_dickey_fuller_batch(data: pd.DataFrame,
+                                alpha: int = 5,
+                                log: Optional[Callable[[str], None]] = print,
+                                use_cache: bool = False) -> pd.Series:
+    """
+    Augmented Dickey Fuller test on every column of data at once, using the batched regressions
+    of adfuller_batch rather than one adfuller call per column
+
+    Parameters:
+        data: Time series as columns, all of the same length with no NaNs
+        alpha: chosen level of significance, must be one of 1,5 or 10%
+        log: Called with progress messages, None for no output
+        use_cache: Use the stationarity cache, so only series not tested before are tested
+
+    Returns:
+        pd.Series: True for each stationary column, as in get_aug_dickey_fuller_result
+    """
+    assert alpha in [1, 5, 10], "Choose appropriate alpha significance: [1, 5 or 10%]"
+    if log is not None:
+        log(f"Performing augmented Dickey Fuller test on {data.shape[1]} series at significance "
+            f"level alpha: {alpha}")
+
+    if not use_cache:
+        adf_df = adfuller_batch(data=data, autolag='AIC')
+        return adf_df['Test Statistic'] < adf_df[f"Critical Value ({alpha}%)"]
+
+    cache = get_cache()
+    keys = [_adf_key(data.iloc[:, i]) for i in range(data.shape[1])]
+    df_tests = [cache.get(key) for key in keys]
+    missing = [i for i, df_test in enumerate(df_tests) if df_test is None]
+    if missing:
+        records = adfuller_batch(data=data.iloc[:, missing], autolag='AIC', output="array")
+        for i, record in zip(missing, records):
+            df_tests[i] = AdfResult(statistic=record['statistic'],
+                                    p_value=record['p_value'],
+                                    lags=int(record['lags']),
+                                    nobs=int(record['nobs']),
+                                    critical_values={'1%': record['crit_1'],
+                                                     '5%': record['crit_5'],
+                                                     '10%': record['crit_10']},
+                                    ic_best=record['ic_best'])
+            cache.put(keys[i], df_tests[i])
+
+    return pd.Series([df_test.statistic < df_test.critical_values[f"{alpha}%"]
+                      for df_test in df_tests], index=data.columns)
+
+
+def _adf_worker(time_series: np.ndarray) -> bool:
+    """Module level wrapper so the ADF test can be pickled and run (quietly) in a worker process"""
+    return get_aug_dickey_fuller_result(time_series, log=None)
+
+
+def _get_adf_results(data: pd.DataFrame,
+                     n_jobs: int = 1,
+                     chunk_size: int = None,
+                     log: Optional[Callable[[str], None]] = print) -> list:
+    """
+    Run the augmented Dickey Fuller test on every column of data, in column order
+
+    Args:
+        data: Clean dataframe with no NaNs
+        n_jobs: Number of worker processes, 1 runs in this process and -1 uses every core
+        chunk_size: Columns sent to a worker at a time, default splits the columns into about
+            4 chunks per worker
+        log: Called with progress messages, None for no output
+
+    Returns:
+        list: ADF result of each column, in the order of data.columns
+    """
+    columns = [data[i].values for i in data.columns]
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    assert n_jobs >= 1, f"n_jobs of {n_jobs} is not valid, must be -1 or at least 1"
+    n_jobs = min(n_jobs, len(columns))
+
+    if n_jobs <= 1:
+        return [get_aug_dickey_fuller_result(i, log=log) for i in columns]
+
+    if chunk_size is None:
+        chunk_size = math.ceil(len(columns) / (4 * n_jobs))
+    if log is not None:
+        log(f"Running augmented Dickey Fuller tests on {n_jobs} processes")
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        return list(executor.map(_adf_worker, columns, chunksize=chunk_size))
+
+
+def get_descriptive_stats(data: pd.DataFrame,
+                          alpha: float = 0.05,
+                          n_jobs: int = 1,
+                          chunk_size: int = None,
+                          as_dict: bool = True,
+                          log: Optional[Callable[[str], None]] = print,
+                          use_cache: bool = False) -> Union[dict, pd.DataFrame]:
     """Compute descriptive, high level stats (p-values given for two tailed tests),
     incuding skewness and kurtosis, specifying alpha (for tests of skewness and kurtosis)
 
     Args:
         data: Clean dataframe with no NaNs
         alpha: level of significance for the two-tailed test. must lie between 0 and 1
+        n_jobs: Number of processes for the (per column) augmented Dickey Fuller tests, 1 runs
+            sequentially and -1 uses every core. The other statistics are vectorised in this process
+        chunk_size: Columns sent to each ADF worker at a time, default about 4 chunks per worker
+        as_dict: Convert the results to a dict of {column: {statistic: value}}, False keeps the
+            (columnar) DataFrame with one row per column of data
+        log: Called with progress messages, None for no output
+        use_cache: Use the stationarity cache (keyed by the values of each column and alpha), so
+            only columns not seen before are calculated
 
     Returns
-        dict of results for descriptive level statistics
+        dict (or pd.DataFrame) of results for descriptive level statistics
     """
     assert 0 < alpha < 1, f"Alpha level of {alpha} is not valid, must lie between 0 and 1"
-    print("Getting descriptive level stats for dataframe...")
+    if log is not None:
+        log("Getting descriptive level stats for dataframe...")
+
+    if not use_cache:
+        result_df = _descriptive_stats_df(data=data, alpha=alpha, n_jobs=n_jobs,
+                                          chunk_size=chunk_size, log=log)
+    else:
+        cache = get_cache()
+        keys = [series_key(data.iloc[:, i], test='descriptive', alpha=alpha)
+                for i in range(data.shape[1])]
+        rows = [cache.get(key) for key in keys]
+        missing = [i for i, row in enumerate(rows) if row is None]
+        if log is not None:
+            log(f"{len(missing)} of {len(keys)} series not in the stationarity cache")
+        if missing:
+            missing_df = _descriptive_stats_df(data=data.iloc[:, missing], alpha=alpha,
+                                               n_jobs=n_jobs, chunk_size=chunk_size, log=log)
+            for row, i in enumerate(missing):
+                rows[i] = missing_df.iloc[[row]]
+                cache.put(keys[i], rows[i])
+        result_df = pd.concat(rows)
+        result_df.index = data.columns
+
+    if not as_dict:
+        return result_df
 
+    result_dict = result_df.T.to_dict()
+
+    return result_dict
+
+
+def _descriptive_stats_df(data: pd.DataFrame,
+                          alpha: float,
+                          n_jobs: int,
+                          chunk_size: int,
+                          log: Optional[Callable[[str], None]]) -> pd.DataFrame:
+    """Descriptive stats of get_descriptive_stats, with one row per column of data"""
     result_df = pd.DataFrame(columns=['Size', 'Mean', 'Std Dev', 'Skewness', 'Excess Kurtosis'])
 
     result_df['Size'] = data.count()
@@ -117,14 +287,12 @@ def get_descriptive_stats(data: pd.DataFrame, alpha: float = 0.05) -> dict:
     result_df['Excess Kurtosis accept H_0'] = kurt_h0_values
     result_df.rename(columns={'Excess Kurtosis accept H_0': kurt_h0_title}, inplace=True)
 
-    adf_results = []
-    for i in data.columns:
-        adf_results.append(get_aug_dickey_fuller_result(data.loc[:, i]))
+    result_df['Aug Dickey-Fuller Test'] = _get_adf_results(data=data,
+                                                           n_jobs=n_jobs,
+                                                           chunk_size=chunk_size,
+                                                           log=log)
 
-    result_df['Aug Dickey-Fuller Test'] = adf_results
-    result_dict = result_df.T.to_dict()
-
-    return result_dict
+    return result_df
 
 
 if __name__ == '__main__':
@@ -0,0 +1,120 @@
+"""
+Created on: 18 Oct 2026
+
+Memoised stationarity results. Results are keyed by a hash of the series values and the test
+parameters, so re-running the daily tests only recalculates series whose history has changed.
+Keeps the most recently used results in memory, and optionally writes every result to cache_dir so
+they persist between sessions.
+"""
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Any, Union
+
+import numpy as np
+
+from utils_generic import array_key
+
+DEFAULT_MAX_ENTRIES = 100000
+
+
+def series_key(time_series: Union[np.ndarray, list], **params) -> str:
+    """
+    Hash of the values of a series and the parameters of the test run on it
+
+    Args:
+        time_series: 1-D array (or pd.Series) of the series tested
+        params: Test parameters which change the result, e.g. test="adf", autolag="AIC"
+
+    Returns:
+        str: blake2b hex digest (utils_generic.array_key), the same for equal values regardless
+        of index or dtype
+    """
+    return array_key(time_series, **params)
+
+
+class StationarityCache:
+    """
+    Least recently used cache of {series_key: result}, with optional persistence to disk
+
+    Args:
+        max_entries: Number of results kept in memory before the least recently used is dropped
+        cache_dir: Folder to pickle each result to, None to keep results in memory only
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, cache_dir: str = None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _file_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def get(self, key: str) -> Any:
+        """Cached result for key, or None if the series has not been tested with these params"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self._file_path(key), "rb") as fp:
+                result = pickle.load(fp)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        self._set(key, result)
+        return result
+
+    def _set(self, key: str, result: Any) -> None:
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def put(self, key: str, result: Any) -> None:
+        """Store the result for key, in memory and on disk if cache_dir was given"""
+        self._set(key, result)
+        if self.cache_dir is not None:
+            tmp_path = self._file_path(key) + ".tmp"
+            with open(tmp_path, "wb") as fp:
+                pickle.dump(result, fp, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._file_path(key))
+
+    def clear(self) -> None:
+        """Remove every result, from memory and disk"""
+        with self._lock:
+            self._entries.clear()
+            if self.cache_dir is not None:
+                for file_name in os.listdir(self.cache_dir):
+                    if file_name.endswith(".pkl"):
+                        os.remove(os.path.join(self.cache_dir, file_name))
+
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_cache() -> StationarityCache:
+    """Process wide cache used by the stationarity tests when use_cache=True (in memory only)"""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = StationarityCache()
+        return _CACHE
+
+
+def set_cache(cache: Union[StationarityCache, None]) -> None:
+    """Replace the process wide cache, e.g. with one persisted to disk, None resets to default"""
+    global _CACHE
+    with _CACHE_LOCK:
+        _CACHE = cache
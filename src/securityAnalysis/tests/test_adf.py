@@ -0,0 +1,80 @@
+# Created on 18 Oct 2026
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.stattools import adfuller
+
+from securityAnalysis import adf
+from securityAnalysis.adf import ADF_DTYPE, adfuller_batch
+
+
+class TestAdfullerBatch(unittest.TestCase):
+    def setUp(self) -> None:
+        random_state = np.random.RandomState(11)
+        noise = random_state.normal(size=(300, 8))
+        noise[:, ::2] = np.cumsum(noise[:, ::2], axis=0)
+        self.data = pd.DataFrame(noise, columns=[f"stock_{i}" for i in range(8)])
+
+    def assert_matches_adfuller(self, regression, autolag, maxlag=None):
+        result = adfuller_batch(data=self.data, maxlag=maxlag, regression=regression,
+                                autolag=autolag, chunk_size=3)
+        for i in self.data.columns:
+            expected = adfuller(self.data[i], maxlag=maxlag, regression=regression,
+                                autolag=autolag)
+            row = result.loc[i]
+            self.assertAlmostEqual(row['Test Statistic'], expected[0], places=8)
+            self.assertAlmostEqual(row['p-value'], expected[1], places=8)
+            self.assertEqual(row['#Lags Used'], expected[2])
+            self.assertEqual(row['Number of Observations Used'], expected[3])
+            self.assertAlmostEqual(row['Critical Value (5%)'], expected[4]['5%'], places=8)
+            if autolag is not None:
+                self.assertAlmostEqual(row['IC Best'], expected[5], places=6)
+
+    def test_adfuller_batch__aic(self):
+        for regression in ('n', 'c', 'ct'):
+            self.assert_matches_adfuller(regression=regression, autolag='AIC')
+
+    def test_adfuller_batch__bic(self):
+        self.assert_matches_adfuller(regression='c', autolag='BIC')
+
+    def test_adfuller_batch__fixed_lag(self):
+        self.assert_matches_adfuller(regression='c', autolag=None, maxlag=4)
+
+    def test_adfuller_batch__no_trend_spellings(self):
+        expected = adfuller_batch(data=self.data, regression='n')
+        pd.testing.assert_frame_equal(adfuller_batch(data=self.data, regression='nc'), expected)
+
+        # statsmodels before 0.12 only understands 'nc'
+        regressions = []
+
+        def old_spelling(func):
+            def wrapped(*args, regression, **kwargs):
+                regressions.append(regression)
+                assert regression != 'n', "regression keyword n not understood"
+                return func(*args, regression='n' if regression == 'nc' else regression, **kwargs)
+            return wrapped
+
+        with mock.patch.object(adf, '_MACKINNON_NO_TREND', 'nc'), \
+                mock.patch.object(adf, 'mackinnonp', old_spelling(adf.mackinnonp)), \
+                mock.patch.object(adf, 'mackinnoncrit', old_spelling(adf.mackinnoncrit)):
+            result = adfuller_batch(data=self.data, regression='n')
+        self.assertEqual(set(regressions), {'nc'})
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_adfuller_batch__array(self):
+        result = adfuller_batch(data=self.data['stock_0'].values)
+        self.assertEqual(len(result), 1)
+        self.assertAlmostEqual(result['Test Statistic'].iloc[0], adfuller(self.data['stock_0'])[0])
+
+    def test_adfuller_batch__structured_array(self):
+        result = adfuller_batch(data=self.data, output="array")
+        expected = adfuller_batch(data=self.data)
+        self.assertEqual(result.dtype, ADF_DTYPE)
+        np.testing.assert_array_equal(result['statistic'], expected['Test Statistic'])
+        np.testing.assert_array_equal(result['crit_5'], expected['Critical Value (5%)'])
+
+
+if __name__ == '__main__':
+    unittest.main()
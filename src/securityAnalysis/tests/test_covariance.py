@@ -0,0 +1,69 @@
+# Created on 18 Oct 2026
+import unittest
+
+import numpy as np
+import pandas as pd
+from sklearn.covariance import ledoit_wolf
+
+from securityAnalysis import covariance
+from securityAnalysis.covariance import CovarianceEstimator, get_covariance
+
+
+class TestCovarianceEstimator(unittest.TestCase):
+    def setUp(self) -> None:
+        random_state = np.random.RandomState(19)
+        market = random_state.normal(0, 0.01, size=(250, 1))
+        self.returns = pd.DataFrame(random_state.normal(0.0005, 0.01, size=(250, 6)) + market,
+                                    index=pd.date_range('2020-01-01', periods=250),
+                                    columns=[f"stock_{i}" for i in range(6)])
+        self.estimator = CovarianceEstimator.from_returns(self.returns.iloc[:100])
+        self.estimator.update(self.returns.iloc[100:200])
+        for i in range(200, 250):
+            self.estimator.update(self.returns.iloc[i].values)
+
+    def test_sample_covariance(self):
+        pd.testing.assert_frame_equal(self.estimator.covariance(method="sample"),
+                                      self.returns.cov())
+
+    def test_ledoit_wolf_covariance(self):
+        expected_cov, expected_shrinkage = ledoit_wolf(self.returns.values)
+        cov, shrinkage = self.estimator.ledoit_wolf_covariance()
+        self.assertAlmostEqual(shrinkage, expected_shrinkage)
+        np.testing.assert_allclose(cov, expected_cov, rtol=1e-10)
+
+    def test_ewma_covariance(self):
+        expected = self.returns.ewm(alpha=1 - 0.94).cov(bias=True).loc[self.returns.index[-1]]
+        np.testing.assert_allclose(self.estimator.covariance(method="ewma").values,
+                                   expected.values, rtol=1e-10)
+
+    def test_update__aligns_columns(self):
+        estimator = CovarianceEstimator(securities=list(self.returns.columns))
+        estimator.update(self.returns[self.returns.columns[::-1]])
+        pd.testing.assert_frame_equal(estimator.covariance(), self.returns.cov())
+        self.assertEqual(estimator.as_of, self.returns.index[-1])
+
+    def test_get_covariance__cache(self):
+        covariance.get_cache().clear()
+        cov = get_covariance(self.returns, method="ledoit_wolf")
+        self.assertIs(get_covariance(self.returns, method="ledoit_wolf"), cov)
+        self.assertIsNot(get_covariance(self.returns.iloc[1:], method="ledoit_wolf"), cov)
+        self.assertEqual(len(covariance.get_cache()), 2)
+
+    def test_get_covariance__cache_same_shape(self):
+        covariance.get_cache().clear()
+        # same columns, dates and length but different values must not share a result
+        scaled = self.returns * 3
+        cov = get_covariance(self.returns, method="sample")
+        pd.testing.assert_frame_equal(get_covariance(scaled, method="sample"), scaled.cov())
+        self.assertIs(get_covariance(self.returns, method="sample"), cov)
+
+    def test_ledoit_wolf_sums_only_when_needed(self):
+        estimator = CovarianceEstimator.from_returns(self.returns, ledoit_wolf=False)
+        self.assertFalse(estimator._cross_sq.any())
+        pd.testing.assert_frame_equal(estimator.covariance(method="sample"), self.returns.cov())
+        with self.assertRaises(AssertionError):
+            estimator.ledoit_wolf_covariance()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+# Created on 18 Oct 2026
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from securityAnalysis.efficient_frontier import (get_efficient_frontier,
+                                                 get_max_sharpe_portfolio,
+                                                 get_min_variance_portfolio,
+                                                 get_portfolio_moments,
+                                                 get_portfolio_performance,
+                                                 get_target_return_weights, simulate_portfolios)
+
+
+class TestEfficientFrontier(unittest.TestCase):
+    def setUp(self) -> None:
+        random_state = np.random.RandomState(17)
+        daily_rtn = random_state.normal(loc=[0.0004, 0.0006, 0.0002, 0.0008],
+                                        scale=[0.01, 0.015, 0.008, 0.02],
+                                        size=(500, 4))
+        prices = pd.DataFrame(100 * np.cumprod(1 + daily_rtn, axis=0),
+                              columns=['stock_a', 'stock_b', 'stock_c', 'stock_d'])
+        self.returns = prices.pct_change()
+        self.mean_returns, self.cov = get_portfolio_moments(data=prices)
+        self.simulation_df = simulate_portfolios(self.mean_returns, self.cov, n_portfolios=20000,
+                                                 risk_free=0.01,
+                                                 random_state=np.random.RandomState(1),
+                                                 chunk_size=3000)
+
+    def test_get_portfolio_moments__same_rows(self):
+        returns = self.returns.iloc[1:].copy()
+        returns.iloc[:50, 0] = np.nan
+        mean_returns, cov = get_portfolio_moments(data=returns, is_returns=True)
+        pd.testing.assert_series_equal(mean_returns, returns.iloc[50:].mean() * 252)
+        pd.testing.assert_frame_equal(cov, returns.iloc[50:].cov() * 252)
+
+    def test_get_portfolio_performance(self):
+        weights = np.array([[0.25, 0.25, 0.25, 0.25], [0.1, 0.2, 0.3, 0.4]])
+        portfolio_return, portfolio_vol, sharpe = \
+            get_portfolio_performance(weights, self.mean_returns, self.cov, risk_free=0.01)
+        self.assertAlmostEqual(portfolio_return[1], np.dot(weights[1], self.mean_returns))
+        self.assertAlmostEqual(portfolio_vol[1],
+                               np.sqrt(weights[1] @ self.cov.values @ weights[1]))
+        self.assertAlmostEqual(sharpe[0], (portfolio_return[0] - 0.01) / portfolio_vol[0])
+
+    def test_get_min_variance_portfolio(self):
+        portfolio = get_min_variance_portfolio(self.mean_returns, self.cov)
+        self.assertAlmostEqual(portfolio.weights.sum(), 1)
+        # the gradient of the variance is equal for every security at the minimum
+        gradient = self.cov.values @ portfolio.weights.values
+        np.testing.assert_allclose(gradient, gradient[0])
+        self.assertLessEqual(portfolio.annualised_volatility,
+                             self.simulation_df['Volatility'].min())
+
+        long_only = get_min_variance_portfolio(self.mean_returns, self.cov, long_only=True)
+        self.assertAlmostEqual(long_only.annualised_volatility, portfolio.annualised_volatility,
+                               places=5)
+
+    def test_get_max_sharpe_portfolio(self):
+        portfolio = get_max_sharpe_portfolio(self.mean_returns, self.cov, risk_free=0.01)
+        long_only = get_max_sharpe_portfolio(self.mean_returns, self.cov, risk_free=0.01,
+                                             long_only=True)
+        self.assertTrue((long_only.weights >= -1e-10).all())
+        self.assertGreaterEqual(portfolio.sharpe_ratio, long_only.sharpe_ratio - 1e-8)
+        self.assertGreaterEqual(long_only.sharpe_ratio + 1e-6,
+                                self.simulation_df['Sharpe Ratio'].max())
+
+    def test_get_target_return_weights(self):
+        targets = np.array([0.15, 0.25, 0.35])
+        for long_only in (False, True):
+            weights = get_target_return_weights(self.mean_returns, self.cov, targets,
+                                                long_only=long_only)
+            np.testing.assert_allclose(weights.sum(axis=1), 1)
+            np.testing.assert_allclose(weights @ self.mean_returns.values, targets)
+
+    def test_get_efficient_frontier(self):
+        frontier_df = get_efficient_frontier(self.mean_returns, self.cov, n_points=50,
+                                             long_only=True)
+        self.assertEqual(list(frontier_df.columns[3:]), list(self.mean_returns.index))
+        self.assertTrue(frontier_df['Volatility'].is_monotonic_increasing)
+        # no random portfolio lies above the frontier (allowing for the linear interpolation
+        # between points, which lies just below the concave frontier)
+        on_frontier = np.interp(self.simulation_df['Volatility'],
+                                frontier_df['Volatility'], frontier_df['Return'])
+        self.assertTrue((self.simulation_df['Return'] <= on_frontier + 1e-3).all())
+
+    def test_simulate_portfolios(self):
+        simulation_df = simulate_portfolios(self.mean_returns, self.cov, n_portfolios=10,
+                                            random_state=np.random.RandomState(2),
+                                            return_weights=True)
+        weights = simulation_df[self.mean_returns.index].values
+        np.testing.assert_allclose(weights.sum(axis=1), 1)
+        np.testing.assert_allclose(simulation_df['Return'], weights @ self.mean_returns.values)
+
+
+if __name__ == '__main__':
+    unittest.main()
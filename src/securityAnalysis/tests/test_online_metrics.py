@@ -0,0 +1,88 @@
+# Created on 18 Oct 2026
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from securityAnalysis.online_metrics import OnlineMetricAccumulator
+from securityAnalysis.utils_finance import (calculate_annualised_return_df,
+                                            calculate_annual_volatility_df, return_sharpe_ratio)
+
+
+class TestOnlineMetricAccumulator(unittest.TestCase):
+    def setUp(self) -> None:
+        random_state = np.random.RandomState(3)
+        self.data = pd.DataFrame(
+            100 * np.cumprod(1 + random_state.normal(0.0005, 0.01, size=(50, 3)), axis=0),
+            columns=['stock_a', 'stock_b', 'stock_c'])
+
+    def assert_matches_utils_finance(self, acc, data):
+        pd.testing.assert_series_equal(acc.annualised_return,
+                                       calculate_annualised_return_df(data=data))
+        pd.testing.assert_series_equal(acc.annual_volatility,
+                                       calculate_annual_volatility_df(data=data))
+        pd.testing.assert_series_equal(acc.sharpe_ratio(risk_free=0.01),
+                                       return_sharpe_ratio(data=data, risk_free=0.01))
+
+    def test_update(self):
+        acc = OnlineMetricAccumulator(securities=list(self.data.columns))
+        for _, prices in self.data.iterrows():
+            acc.update(prices.values)
+        self.assert_matches_utils_finance(acc, self.data)
+
+    def test_from_prices_then_update(self):
+        acc = OnlineMetricAccumulator.from_prices(self.data.iloc[:30])
+        for _, prices in self.data.iloc[30:].iterrows():
+            acc.update(prices[::-1])  # series are aligned by security
+        self.assert_matches_utils_finance(acc, self.data)
+
+    def test_update__missing_price(self):
+        acc = OnlineMetricAccumulator.from_prices(self.data)
+        acc.update({'stock_a': 120., 'stock_b': np.nan})
+        self.assertEqual(acc.count.tolist(), [50, 49, 49])
+        self.assertEqual(acc.last_price[0], 120.)
+        # the price after the gap only sets the last price
+        acc.update({'stock_a': 121., 'stock_b': 130.})
+        self.assertEqual(acc.count.tolist(), [51, 49, 49])
+        self.assertEqual(acc.last_price[1], 130.)
+
+    def test_update__partial_tick(self):
+        acc = OnlineMetricAccumulator(securities=['AMZN', 'GOOGL'])
+        acc.update({'AMZN': 100., 'GOOGL': 50.})
+        acc.update({'AMZN': 101.})
+        acc.update({'AMZN': 102., 'GOOGL': 52.})
+        self.assertEqual(acc.count.tolist(), [2, 1])
+        self.assertAlmostEqual(acc.mean[1], 52. / 50. - 1)
+        # an explicit NaN breaks the chain, the next price only sets the last price
+        acc.update({'GOOGL': np.nan})
+        acc.update({'GOOGL': 53.})
+        self.assertEqual(acc.count.tolist(), [2, 1])
+        self.assertEqual(acc.last_price[1], 53.)
+
+    def test_update__missing_prices_match_from_prices(self):
+        data = self.data.copy()
+        data.iloc[[0, 10, 11, 25], 0] = np.nan
+        data.iloc[[20, 49], 1] = np.nan
+        acc = OnlineMetricAccumulator.from_prices(data.iloc[:15])
+        for _, prices in data.iloc[15:].iterrows():
+            acc.update(prices)
+        expected = OnlineMetricAccumulator.from_prices(data)
+        np.testing.assert_array_equal(acc.count, expected.count)
+        np.testing.assert_array_equal(acc.last_price, expected.last_price)
+        pd.testing.assert_series_equal(acc.sharpe_ratio(), expected.sharpe_ratio())
+        self.assert_matches_utils_finance(expected, data)
+
+    def test_save_and_load(self):
+        acc = OnlineMetricAccumulator.from_prices(self.data)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'snapshot.npz')
+            acc.save(path)
+            restored = OnlineMetricAccumulator.load(path)
+        self.assertEqual(restored.securities, acc.securities)
+        pd.testing.assert_series_equal(restored.sharpe_ratio(), acc.sharpe_ratio())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+# Created on 18 Oct 2026
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from securityAnalysis.rolling_metrics import calculate_rolling_metrics
+
+
+class TestRollingMetrics(unittest.TestCase):
+    def setUp(self) -> None:
+        random_state = np.random.RandomState(5)
+        self.returns = pd.DataFrame(random_state.normal(0.0005, 0.01, size=(300, 3)),
+                                    index=pd.date_range('2019-01-01', periods=300),
+                                    columns=['stock_a', 'stock_b', 'stock_c'])
+
+    def test_calculate_rolling_metrics__matches_pandas_rolling(self):
+        result = calculate_rolling_metrics(returns=self.returns, windows=(21, 63), risk_free=0.01)
+        rolling = self.returns.rolling(63)
+        ann_rtn = rolling.mean() * 252
+        ann_vol = rolling.std(ddof=0) * np.sqrt(252)
+
+        pd.testing.assert_frame_equal(result[63]['Annualised Return'], ann_rtn)
+        pd.testing.assert_frame_equal(result[63]['Annualised Volatility'], ann_vol)
+        pd.testing.assert_frame_equal(result[63]['Sharpe Ratio'], (ann_rtn - 0.01) / ann_vol)
+        self.assertEqual(result[21]['Sharpe Ratio'].notna().all(axis=1).sum(), 280)
+
+    def test_calculate_rolling_metrics__sortino(self):
+        result = calculate_rolling_metrics(returns=self.returns, windows=(21,))
+        window = self.returns.iloc[-21:]
+        downside_dev = np.sqrt(np.square(np.minimum(window, 0)).sum() / 21)
+        pd.testing.assert_series_equal(result[21]['Sortino Ratio'].iloc[-1],
+                                       window.mean() / downside_dev,
+                                       check_names=False)
+
+    def test_calculate_rolling_metrics__missing_values(self):
+        returns = self.returns.copy()
+        returns.iloc[100, 0] = np.nan
+        result = calculate_rolling_metrics(returns=returns, windows=(21,), min_periods=20)
+        pd.testing.assert_frame_equal(result[21]['Annualised Return'],
+                                      returns.rolling(21, min_periods=20).mean() * 252)
+
+
+if __name__ == '__main__':
+    unittest.main()
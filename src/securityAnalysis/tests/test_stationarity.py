@@ -0,0 +1,94 @@
+# Created on 18 Oct 2026
+import contextlib
+import io
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from securityAnalysis import stationarity
+from securityAnalysis.adf import AdfResult
+from securityAnalysis.stationarity_cache import StationarityCache, set_cache
+from securityAnalysis.stationarity import (get_aug_dickey_fuller_result,
+                                           get_aug_dickey_fuller_batch, get_descriptive_stats)
+
+
+class TestDescriptiveStats(unittest.TestCase):
+    def setUp(self) -> None:
+        random_state = np.random.RandomState(7)
+        noise = random_state.normal(size=(200, 6))
+        # alternate stationary (white noise) and non-stationary (random walk) columns
+        noise[:, 1::2] = np.cumsum(noise[:, 1::2], axis=0)
+        self.data = pd.DataFrame(noise, columns=[f"stock_{i}" for i in range(6)])
+
+    def test_get_descriptive_stats(self):
+        result = get_descriptive_stats(data=self.data)
+        self.assertEqual(list(result.keys()), list(self.data.columns))
+        self.assertEqual(result['stock_0']['Size'], 200)
+        self.assertAlmostEqual(result['stock_0']['Mean'], self.data['stock_0'].mean())
+        self.assertEqual([result[i]['Aug Dickey-Fuller Test'] for i in self.data.columns],
+                         [get_aug_dickey_fuller_result(self.data[i]) for i in self.data.columns])
+
+    def test_get_descriptive_stats__process_pool(self):
+        expected = get_descriptive_stats(data=self.data)
+        result = get_descriptive_stats(data=self.data, n_jobs=2, chunk_size=2)
+        self.assertEqual(list(result.keys()), list(self.data.columns))
+        self.assertEqual([result[i]['Aug Dickey-Fuller Test'] for i in self.data.columns],
+                         [expected[i]['Aug Dickey-Fuller Test'] for i in self.data.columns])
+
+    def test_get_aug_dickey_fuller_batch(self):
+        result = get_aug_dickey_fuller_batch(data=self.data)
+        self.assertEqual(result.tolist(),
+                         [get_aug_dickey_fuller_result(self.data[i]) for i in self.data.columns])
+
+    def test_get_descriptive_stats__quiet_frame(self):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            result_df = get_descriptive_stats(data=self.data, as_dict=False, log=None)
+        self.assertEqual(stdout.getvalue(), '')
+        self.assertEqual(list(result_df.index), list(self.data.columns))
+        self.assertEqual(result_df.loc['stock_0'].to_dict(),
+                         get_descriptive_stats(data=self.data, log=None)['stock_0'])
+
+    def test_test_stationarity_adf(self):
+        messages = []
+        result = stationarity.test_stationarity_adf(time_series=self.data['stock_1'],
+                                                    log=messages.append)
+        self.assertIsInstance(result, AdfResult)
+        self.assertEqual(result.nobs + result.lags + 1, 200)
+        self.assertIn('Critical Value (5%)', messages[-1])
+
+    def test_get_descriptive_stats__cache(self):
+        set_cache(StationarityCache())
+        self.addCleanup(set_cache, None)
+        expected = get_descriptive_stats(data=self.data, as_dict=False, log=None)
+
+        get_descriptive_stats(data=self.data.iloc[:, :4], log=None, use_cache=True)
+        data = self.data.copy()
+        data.iloc[-1, 0] += 1.
+        with mock.patch.object(stationarity, '_get_adf_results',
+                               wraps=stationarity._get_adf_results) as get_adf_results:
+            result_df = get_descriptive_stats(data=data, as_dict=False, log=None, use_cache=True)
+        # only the changed column and the two columns not seen before are recalculated
+        self.assertEqual(list(get_adf_results.call_args[1]['data'].columns),
+                         ['stock_0', 'stock_4', 'stock_5'])
+        pd.testing.assert_frame_equal(result_df.iloc[1:], expected.iloc[1:])
+        self.assertNotEqual(result_df.loc['stock_0', 'Mean'], expected.loc['stock_0', 'Mean'])
+
+    def test_get_aug_dickey_fuller_batch__cache(self):
+        set_cache(StationarityCache())
+        self.addCleanup(set_cache, None)
+        expected = get_aug_dickey_fuller_batch(data=self.data, log=None)
+        get_aug_dickey_fuller_result(self.data['stock_2'], log=None, use_cache=True)
+        with mock.patch.object(stationarity, 'adfuller_batch',
+                               wraps=stationarity.adfuller_batch) as batch:
+            result = get_aug_dickey_fuller_batch(data=self.data, log=None, use_cache=True)
+            self.assertEqual(batch.call_args[1]['data'].shape[1], 5)
+            get_aug_dickey_fuller_batch(data=self.data, log=None, use_cache=True)
+            self.assertEqual(batch.call_count, 1)
+        pd.testing.assert_series_equal(result, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+# Created on 18 Oct 2026
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from securityAnalysis.stationarity_cache import StationarityCache, series_key
+
+
+class TestStationarityCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.series = np.random.RandomState(13).normal(size=100)
+
+    def test_series_key(self):
+        key = series_key(self.series, test='adf', autolag='AIC')
+        # same values with a different index or dtype give the same key
+        self.assertEqual(key, series_key(pd.Series(self.series, index=range(5, 105)),
+                                         autolag='AIC', test='adf'))
+        self.assertNotEqual(key, series_key(self.series, test='adf', autolag='BIC'))
+        changed = self.series.copy()
+        changed[-1] += 1e-12
+        self.assertNotEqual(key, series_key(changed, test='adf', autolag='AIC'))
+
+    def test_least_recently_used(self):
+        cache = StationarityCache(max_entries=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+
+    def test_disk_persistence(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            StationarityCache(cache_dir=tmp_dir).put('a', {'statistic': -3.1})
+            cache = StationarityCache(cache_dir=tmp_dir)
+            self.assertEqual(cache.get('a'), {'statistic': -3.1})
+            cache.clear()
+            self.assertIsNone(StationarityCache(cache_dir=tmp_dir).get('a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,17 @@
 # Created on 20 Sep 2020
+import io
 import unittest
+import warnings
 
 import numpy as np
 import pandas as pd
 
 from securityAnalysis.utils_finance import (calculate_relative_return_arr, calculate_return_df,
-                                            calculate_annualised_return_df)
+                                            calculate_annualised_return_df, calculate_return_arr,
+                                            return_info_ratio, return_sortino_ratio,
+                                            return_sharpe_ratio, calculate_annual_volatility_df,
+                                            return_risk_report, read_bloomberg_csv,
+                                            iter_bloomberg_csv)
 
 np.random.seed(1)  # set the random seed so the unit tests use synthetic data
 
@@ -94,6 +100,116 @@ class TestFinanceUtils(unittest.TestCase):
             pd.Series({'stock_a': -0.34537152900184453, 'stock_b': 1.8952787319995616})
         )
 
+    def test_calculate_annualised_return_df__periods_per_year(self):
+        pd.testing.assert_series_equal(
+            calculate_annualised_return_df(data=self.data, periods_per_year=250.5),
+            calculate_annualised_return_df(data=self.data) * 250.5 / 252
+        )
+        pd.testing.assert_series_equal(
+            return_sharpe_ratio(data=self.data, periods_per_year=250.5),
+            return_sharpe_ratio(data=self.data) * np.sqrt(250.5 / 252)
+        )
+
+    def test_calculate_return_arr__multi_period(self):
+        np.testing.assert_array_almost_equal(
+            calculate_return_arr(self.data.values, return_type="relative", periods=2),
+            (self.data / self.data.shift(2) - 1).values[2:]
+        )
+
+    def test_calculate_return_arr__float32_into_buffer(self):
+        out = np.empty((4, 2), dtype=np.float32)
+        result = calculate_return_arr(self.data.values, return_type="log", dtype=np.float32,
+                                      out=out)
+        self.assertIs(result, out)
+        np.testing.assert_array_almost_equal(
+            out, np.log(self.data / self.data.shift(1)).values[1:], decimal=6)
+
+    def test_calculate_return_df__single_row(self):
+        # too few rows for a return gives no returns rather than an error
+        result = calculate_return_df(data=self.data.iloc[:1])
+        self.assertEqual(result.shape, (0, 2))
+        self.assertEqual(calculate_return_arr(self.data.values[:2], periods=3).shape, (0, 2))
+
+    def test_return_info_ratio(self):
+        daily_rtn = self.data.pct_change(1).iloc[1:, ]
+        pd.testing.assert_series_equal(
+            return_info_ratio(data=self.data),
+            daily_rtn.mean() / daily_rtn.std(ddof=0) * np.sqrt(252)
+        )
+
+    def test_return_sortino_ratio(self):
+        pd.testing.assert_series_equal(
+            return_sortino_ratio(data=self.data, target_return=0, risk_free=0),
+            pd.Series({'stock_a': -0.3204235303580043, 'stock_b': np.inf})
+        )
+
+    def test_return_risk_report(self):
+        report = return_risk_report(data=self.data, risk_free=0.01)
+        pd.testing.assert_series_equal(report['Annualised Return'],
+                                       calculate_annualised_return_df(data=self.data),
+                                       check_names=False)
+        pd.testing.assert_series_equal(report['Annualised Volatility'],
+                                       calculate_annual_volatility_df(data=self.data),
+                                       check_names=False)
+        pd.testing.assert_series_equal(report['Sharpe Ratio'],
+                                       return_sharpe_ratio(data=self.data, risk_free=0.01),
+                                       check_names=False)
+        pd.testing.assert_series_equal(
+            report['Sortino Ratio'],
+            return_sortino_ratio(data=self.data, target_return=0, risk_free=0.01),
+            check_names=False)
+        pd.testing.assert_series_equal(report['Information Ratio'],
+                                       return_info_ratio(data=self.data),
+                                       check_names=False)
+        # stock_a peaks at 325.7 and 325.5, stock_b never falls
+        pd.testing.assert_series_equal(
+            report['Max Drawdown'],
+            pd.Series({'stock_a': 323.3 / 325.7 - 1, 'stock_b': 0.}),
+            check_names=False)
+
+    def test_return_risk_report__benchmark(self):
+        report = return_risk_report(data=self.data, benchmark=self.data['stock_b'])
+        self.assertTrue(np.isnan(report.loc['stock_b', 'Information Ratio']))
+        self.assertLess(report.loc['stock_a', 'Information Ratio'], 0)
+
+    def test_return_risk_report__flat_prices(self):
+        data = pd.DataFrame({'flat': [1., 1., 1., 1.], 'rising': [1., 2., 3., 4.]},
+                            index=pd.date_range('2020-01-01', periods=4))
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', RuntimeWarning)
+            report = return_risk_report(data=data, benchmark=data['rising'])
+        self.assertTrue(np.isnan(report.loc['flat', 'Sharpe Ratio']))
+        self.assertEqual(report.loc['rising', 'Sortino Ratio'], np.inf)
+
+
+class TestBloombergCsv(unittest.TestCase):
+    def setUp(self) -> None:
+        # two products separated by a blank column, the second with a shorter history and an
+        # Excel serial date (43833 is 03/01/2020)
+        self.csv = ("AMZN US Equity,,,TSLA US Equity,\n"
+                    "Date,PX_LAST,,Date,PX_LAST\n"
+                    "02/01/2020,1898.01,,02/01/2020,86.05\n"
+                    "03/01/2020,1874.97,,43833,88.60\n"
+                    "06/01/2020,1902.88,,,\n")
+        self.expected = pd.DataFrame({
+            'product': ['AMZN US Equity'] * 3 + ['TSLA US Equity'] * 2,
+            'date': pd.to_datetime(['2020-01-02', '2020-01-03', '2020-01-06',
+                                    '2020-01-02', '2020-01-03']),
+            'price': [1898.01, 1874.97, 1902.88, 86.05, 88.60]})
+
+    def test_read_bloomberg_csv(self):
+        pd.testing.assert_frame_equal(read_bloomberg_csv(io.StringIO(self.csv)), self.expected)
+
+    def test_read_bloomberg_csv__chunks(self):
+        pd.testing.assert_frame_equal(read_bloomberg_csv(io.StringIO(self.csv), chunksize=2),
+                                      self.expected)
+        chunks = list(iter_bloomberg_csv(io.StringIO(self.csv), chunksize=2))
+        self.assertEqual([len(i) for i in chunks], [4, 1])
+
+    def test_read_bloomberg_csv__wrong_format(self):
+        with self.assertRaises(TypeError):
+            read_bloomberg_csv(io.StringIO("AMZN US Equity,\nDate,PX_OPEN\n02/01/2020,1.\n"))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -2,6 +2,8 @@
 Created: 17 June 2020
 Utils specific for financial security data
 """
+from typing import Iterator, List, Tuple
+
 import numpy as np
 import pandas as pd
 
@@ -9,17 +11,65 @@ from decorators import deprecated
 from utils_date import excel_date_to_np
 
 
+RETURN_TYPES = ("relative", "log", "absolute")
+BLOOMBERG_FIELDS = ("Date", "PX_LAST")
+
+
 # array methods
 def calculate_relative_return_arr(a: np.array) -> np.array:
     """Calculate relative return of an array"""
     return a[1:] / a[:-1]
 
 
+def calculate_return_arr(a: np.ndarray,
+                         return_type: str = "relative",
+                         periods: int = 1,
+                         dtype: np.dtype = None,
+                         out: np.ndarray = None) -> np.ndarray:
+    """
+    Return kernel: calculate returns over all columns of a 1-D or 2-D (dates x securities) array
+    in one vectorised pass, all utils_finance metrics use this
+
+    Args:
+        a: Prices, rows as dates
+        return_type: One of "relative" (a_t / a_t-p - 1), "log" (log(a_t / a_t-p)) or
+            "absolute" (a_t - a_t-p)
+        periods: Number of rows p the return is calculated over
+        dtype: Calculate in this dtype (e.g. np.float32 to halve memory), default float64
+        out: Preallocated array of shape (len(a) - periods, ...) to write the returns into
+
+    Returns:
+        np.ndarray: returns, with periods fewer rows than a (no rows, all NaN, if a has no more
+        than periods rows, e.g. the first day of a refresh)
+    """
+    assert return_type in RETURN_TYPES, f"return_type must be one of {RETURN_TYPES}"
+    assert periods > 0, "periods must be positive"
+
+    a = np.asarray(a, dtype=dtype if dtype is not None else np.float64)
+    if out is None:
+        out = np.empty((max(a.shape[0] - periods, 0),) + a.shape[1:], dtype=a.dtype)
+    if periods >= len(a):
+        out.fill(np.nan)
+        return out
+
+    if return_type == "absolute":
+        np.subtract(a[periods:], a[:-periods], out=out)
+    else:
+        np.divide(a[periods:], a[:-periods], out=out)
+        if return_type == "log":
+            np.log(out, out=out)
+        else:
+            np.subtract(out, 1, out=out)
+    return out
+
+
 # dataframe methods
 def calculate_return_df(data: pd.DataFrame,
                         is_relative_return: bool = True,
                         is_log_return: bool = False,
-                        is_absolute_return: bool = False):
+                        is_absolute_return: bool = False,
+                        periods: int = 1,
+                        dtype: np.dtype = None) -> pd.DataFrame:
     """Method to calculate different types of return from dataframe
 
     Parameters
@@ -27,28 +77,42 @@ def calculate_return_df(data: pd.DataFrame,
         is_relative_return
         is_log_return
         is_absolute_return
+        periods: Number of rows the return is calculated over
+        dtype: Calculate in this dtype, default float64 (see calculate_return_arr)
 
     Returns
         pd.DataFrame:  a dataframe with returns shifted as instructed
     """
-    data = data.select_dtypes(exclude=['string', 'object'])
-
     if is_log_return:
         print("Calculating log returns...")
-        return_df = data.apply(lambda x: np.log(x / x.shift(1)))[1:]
+        return_type = "log"
     elif is_relative_return:
         print("Calculating relative returns...")
-        return_df = data.apply(lambda x: (x / x.shift(1)) - 1)[1:]
+        return_type = "relative"
     elif is_absolute_return:
         print("Calculating absolute_returns...")
-        return_df = data.apply(lambda x: x - x.shift(1))[1:]
+        return_type = "absolute"
     else:
-        print("not a valid return type")
+        raise ValueError("not a valid return type")
+
+    return _return_df(data=data, return_type=return_type, periods=periods, dtype=dtype)
 
-    return return_df
+
+def _return_df(data: pd.DataFrame,
+               return_type: str = "relative",
+               periods: int = 1,
+               dtype: np.dtype = None) -> pd.DataFrame:
+    """Numeric columns of data through calculate_return_arr, keeping the labels"""
+    data = data.select_dtypes(exclude=['string', 'object'])
+    return_arr = calculate_return_arr(a=data.values,
+                                      return_type=return_type,
+                                      periods=periods,
+                                      dtype=dtype)
+    return pd.DataFrame(return_arr, index=data.index[periods:], columns=data.columns)
 
 
-def calculate_annualised_return_df(data: pd.DataFrame) -> pd.Series:
+def calculate_annualised_return_df(data: pd.DataFrame,
+                                   periods_per_year: float = 252) -> pd.Series:
     """
     Calculate annualised return (assuming input data is daily).
     For example, see unit test: test_utils_finance
@@ -56,55 +120,62 @@ def calculate_annualised_return_df(data: pd.DataFrame) -> pd.Series:
     Parameters:
         data: Input dataframe with numeric columns as the stock data, and the date being
         the index
+        periods_per_year: Number of periods used to annualise, 252 business days by default
+        (utils_date.annualisation_factor gives the actual trading days of an exchange)
 
     Returns:
         pd.Series: Annualised return for input_df (in decimal form),
         labels are input columns
     """
     daily_rtn = calculate_return_df(data=data, is_relative_return=True)
-    ann_rtn = np.mean(daily_rtn) * 252  # num business days in a year
+    ann_rtn = np.mean(daily_rtn) * periods_per_year
     return ann_rtn
 
 
-def calculate_annual_volatility_df(data: pd.DataFrame) -> pd.DataFrame:
+def calculate_annual_volatility_df(data: pd.DataFrame,
+                                   periods_per_year: float = 252) -> pd.DataFrame:
     """
     Calculate annualised return (assuming input data is daily).
     For example, see unit test: test_utils_finance
 
     Parameters:
         data: Input dataframe with numeric columns filtered for analysis
+        periods_per_year: Number of periods used to annualise, 252 business days by default
 
     Returns:
         pd.Series: Annualised volatility for input_df, labels are input columns
     """
     daily_rtn = calculate_return_df(data=data, is_relative_return=True)
-    ann_vol = np.std(daily_rtn) * np.sqrt(252)  # num business days in a year
+    ann_vol = np.std(daily_rtn) * np.sqrt(periods_per_year)
     return ann_vol
 
 
-def return_info_ratio(data: pd.DataFrame) -> pd.DataFrame:
+def return_info_ratio(data: pd.DataFrame, periods_per_year: float = 252) -> pd.DataFrame:
     """Annual return from securities data(frame)"""
-    daily_rtn = data.pct_change(1).iloc[1:, ]
-    annual_rtn = np.mean(daily_rtn) * 252
-    ann_vol = np.std(daily_rtn) * np.sqrt(252)
+    daily_rtn = _return_df(data=data, return_type="relative")
+    annual_rtn = np.mean(daily_rtn) * periods_per_year
+    ann_vol = np.std(daily_rtn) * np.sqrt(periods_per_year)
     info_ratio = np.divide(annual_rtn, ann_vol)
     return info_ratio
 
 
-def return_sharpe_ratio(data: pd.DataFrame, risk_free: float = 0) -> pd.Series:
+def return_sharpe_ratio(data: pd.DataFrame,
+                        risk_free: float = 0,
+                        periods_per_year: float = 252) -> pd.Series:
     """Function to give annualised Sharpe Ratio measure from input data,
     user input risk free rate
 
     Args:
         data
         risk_free: Risk free rate, as a decimal, so RFR of 6% = 0.06
+        periods_per_year: Number of periods used to annualise, 252 business days by default
 
     Returns:
         np.ndarray
     """
     print(f"Risk free rate set as: {risk_free}")
-    annual_rtn = calculate_annualised_return_df(data=data)
-    annual_vol = calculate_annual_volatility_df(data=data)
+    annual_rtn = calculate_annualised_return_df(data=data, periods_per_year=periods_per_year)
+    annual_vol = calculate_annual_volatility_df(data=data, periods_per_year=periods_per_year)
     sharpe_ratio = np.divide(annual_rtn - risk_free, annual_vol)
     return sharpe_ratio
 
@@ -126,7 +197,7 @@ def return_sortino_ratio(data: pd.DataFrame,
         ndarray: sortino ratio
     """
 
-    period_return = data.pct_change(rtn_period).iloc[1:, ]
+    period_return = _return_df(data=data, return_type="relative", periods=rtn_period)
     downside_return = np.array(period_return.values - target_return)
 
     inner_bit = np.minimum(np.zeros(shape=downside_return.shape[1]), downside_return)
@@ -139,6 +210,66 @@ def return_sortino_ratio(data: pd.DataFrame,
     return sortino
 
 
+def return_risk_report(data: pd.DataFrame,
+                       risk_free: float = 0,
+                       target_return: float = 0,
+                       benchmark: pd.Series = None,
+                       periods_per_year: float = 252) -> pd.DataFrame:
+    """
+    Risk metrics for every security from one returns matrix, rather than recalculating returns
+    for each ratio. Definitions match the individual methods in this module.
+
+    Args:
+        data: Prices with securities as columns, dates as the index (assumed daily)
+        risk_free: Risk free rate, as a decimal, so RFR of 6% = 0.06
+        target_return: Target (daily) return for the Sortino ratio and downside deviation
+        benchmark: Benchmark prices on the same index as data. If given, the information ratio
+            is of returns in excess of the benchmark, otherwise as return_info_ratio
+        periods_per_year: Number of periods used to annualise, 252 business days by default
+
+    Returns:
+        pd.DataFrame: one row per security, with columns ['Annualised Return',
+        'Annualised Volatility', 'Sharpe Ratio', 'Sortino Ratio', 'Information Ratio',
+        'Max Drawdown', 'Downside Deviation'] (downside deviation is annualised)
+    """
+    prices = data.select_dtypes(exclude=['string', 'object'])
+    values = prices.values.astype(np.float64)
+    daily_rtn = calculate_return_arr(values, return_type="relative")
+
+    mean_rtn = np.nanmean(daily_rtn, axis=0)
+    ann_rtn = mean_rtn * periods_per_year
+    ann_vol = np.nanstd(daily_rtn, axis=0) * np.sqrt(periods_per_year)
+
+    # zero volatility, downside deviation or drawdown gives inf/NaN ratios rather than warnings
+    with np.errstate(divide='ignore', invalid='ignore'):
+        downside_rtn = np.minimum(daily_rtn - target_return, 0)
+        downside_dev = np.sqrt(np.nansum(np.square(downside_rtn), axis=0) / len(daily_rtn))
+
+        if benchmark is None:
+            info_ratio = ann_rtn / ann_vol
+        else:
+            benchmark_rtn = calculate_return_arr(benchmark.reindex(prices.index).values)
+            active_rtn = daily_rtn - benchmark_rtn[:, None]
+            info_ratio = np.nanmean(active_rtn, axis=0) / np.nanstd(active_rtn, axis=0) \
+                * np.sqrt(periods_per_year)
+
+        # drawdown from the running peak, NaN prices do not reset the peak
+        running_max = np.fmax.accumulate(values, axis=0)
+        max_drawdown = np.nanmin(values / running_max - 1, axis=0)
+
+        report = pd.DataFrame({
+            'Annualised Return': ann_rtn,
+            'Annualised Volatility': ann_vol,
+            'Sharpe Ratio': (ann_rtn - risk_free) / ann_vol,
+            'Sortino Ratio': (mean_rtn - risk_free) / downside_dev,
+            'Information Ratio': info_ratio,
+            'Max Drawdown': max_drawdown,
+            'Downside Deviation': downside_dev * np.sqrt(periods_per_year)
+        }, index=prices.columns)
+
+    return report
+
+
 @deprecated
 def clean_bloomberg_security_data(input_file):
     """
@@ -167,7 +298,103 @@ def clean_bloomberg_security_data(input_file):
     return data
 
 
-@deprecated
+def _bloomberg_pairs(input_file) -> Tuple[List[str], List[int], List[int]]:
+    """Products and (date, price) column positions from the two header rows of a Bloomberg csv,
+    skipping any blank columns between pairs"""
+    header = pd.read_csv(input_file, header=None, nrows=2, dtype=str)
+    fields = header.iloc[1].values
+    date_cols = [i for i in range(len(fields) - 1)
+                 if fields[i] == BLOOMBERG_FIELDS[0] and fields[i + 1] == BLOOMBERG_FIELDS[1]]
+    if not date_cols:
+        raise TypeError(f"The dataframe is not in the format expected with columns: "
+                        f"[{', '.join(BLOOMBERG_FIELDS)}]")
+    products = header.iloc[0, date_cols].tolist()
+    return products, date_cols, [i + 1 for i in date_cols]
+
+
+def _melt_bloomberg_chunk(chunk: pd.DataFrame,
+                          products: List[str],
+                          date_format: str) -> pd.DataFrame:
+    """
+    Melt the paired (date, price) columns of a chunk of rows in one pass: product by product, rows
+    with no date or price dropped. Dates can be strings in date_format or Excel serial numbers.
+    """
+    n_rows, n_products = chunk.shape[0], len(products)
+    # chunk columns are [date_0, price_0, date_1, price_1, ...]
+    dates = chunk.iloc[:, 0::2].values.ravel(order='F')
+    prices = pd.to_numeric(chunk.iloc[:, 1::2].values.ravel(order='F'), errors='coerce')
+    product = np.repeat(np.array(products, dtype=object), n_rows)
+
+    is_valid = pd.notna(dates) & ~np.isnan(prices)
+    dates, prices, product = dates[is_valid].astype(str), prices[is_valid], product[is_valid]
+
+    # Excel serials are whole numbers, everything else should be a date string
+    serials = pd.to_numeric(dates, errors='coerce')
+    is_serial = ~np.isnan(serials)
+    parsed = np.empty(len(dates), dtype='datetime64[ns]')
+    parsed[is_serial] = excel_date_to_np(serials[is_serial].astype(np.int64))
+    unique_dates, inverse = np.unique(dates[~is_serial], return_inverse=True)
+    parsed[~is_serial] = pd.to_datetime(unique_dates, format=date_format).values[inverse]
+
+    return pd.DataFrame({'product': product, 'date': parsed, 'price': prices})
+
+
+def iter_bloomberg_csv(input_file,
+                       chunksize: int = 100000,
+                       date_format: str = "%d/%m/%Y") -> Iterator[pd.DataFrame]:
+    """
+    Read a Bloomberg csv export of paired columns in chunks of rows, so memory stays bounded by
+    chunksize * number of columns however long the file is. See read_bloomberg_csv for the format.
+
+    Args:
+        input_file: Path (or buffer) of the csv
+        chunksize: Number of rows read at a time, None reads the whole file as one chunk
+        date_format: Format of the date strings, Excel serial numbers are also converted
+
+    Returns:
+        Iterator of melted pd.DataFrame with columns ['product', 'date', 'price'], one per chunk
+    """
+    products, date_cols, price_cols = _bloomberg_pairs(input_file)
+    use_cols = sorted(date_cols + price_cols)
+    if hasattr(input_file, 'seek'):
+        input_file.seek(0)
+    reader = pd.read_csv(input_file, header=None, skiprows=2, usecols=use_cols, dtype=str,
+                         chunksize=chunksize)
+    for chunk in ([reader] if chunksize is None else reader):
+        yield _melt_bloomberg_chunk(chunk[use_cols], products=products, date_format=date_format)
+
+
+def read_bloomberg_csv(input_file,
+                       chunksize: int = None,
+                       date_format: str = "%d/%m/%Y") -> pd.DataFrame:
+    """
+    Read csv file with Bloomberg data (in format below with or without blank columns) and create
+    melted pivot format, converting the dates (strings or Excel serials) in bulk
+    bb ticker | (empty)         | bb ticker | (empty)
+    Date      | "PX_LAST"       | Date      | "PX_LAST"
+    dd/mm/yyyy| float           | dd/mm/yyyy| float
+
+    Args:
+        input_file: Path (or buffer) of the csv
+        chunksize: Read this many rows at a time (see iter_bloomberg_csv), default the whole file
+        date_format: Format of the date strings
+
+    Returns:
+        pd.DataFrame:
+        product     | date          | price
+        xxxx        | datetime64    | ##.##
+    """
+    chunks = list(iter_bloomberg_csv(input_file, chunksize=chunksize, date_format=date_format))
+    if len(chunks) == 1:
+        return chunks[0]
+
+    melted_df = pd.concat(chunks, ignore_index=True)
+    # chunks are each product by product, restore the order of the whole file
+    product_order = pd.Categorical(melted_df['product'], categories=melted_df['product'].unique())
+    return melted_df.iloc[np.argsort(product_order.codes, kind='stable')].reset_index(drop=True)
+
+
+@deprecated(print_msg="Use read_bloomberg_csv (or iter_bloomberg_csv for large files)")
 def return_melted_df(input_file):
     """
     Read csv file with Bloomberg data (in format below with or without blank columns) and create
@@ -1,12 +1,20 @@
 # Created on 24 Dec 2019
 
 import datetime
+import os
+import tempfile
 import unittest
 
 import numpy as np
 import pandas as pd
 
-from src.utils_date import np_dt_to_str, char_to_date, excel_date_to_np, datetime_to_str
+from src import utils_date
+from src.utils_date import (np_dt_to_str, char_to_date, excel_date_to_np, datetime_to_str,
+                            parse_dates, infer_date_format, clear_date_caches,
+                            fixed_width_to_date, dates_to_str, excel_to_datetime64,
+                            datetime64_to_excel, date_to_excel, BusinessCalendar,
+                            load_holidays, get_calendar, busday_count, busday_offset,
+                            busday_roll, annualisation_factor)
 
 
 class TestDateFuncs(unittest.TestCase):
@@ -36,11 +44,101 @@ class TestDateFuncs(unittest.TestCase):
             self.dates
         )
 
+    def test_char_to_date__dataframe(self):
+        df = pd.DataFrame({'trade_date': ['13/01/2020', '14/01/2020', None],
+                           'price': [1., 2., 3.]})
+        out = char_to_date(df)
+        self.assertEqual(df['trade_date'].dtype, object)  # input is not changed
+        np.testing.assert_array_equal(out['trade_date'].values,
+                                      np.array(['2020-01-13', '2020-01-14', 'NaT'],
+                                               dtype='datetime64[ns]'))
+
+        self.assertIs(char_to_date(df, inplace=True), df)
+        self.assertEqual(df['trade_date'].dtype, np.dtype('<M8[ns]'))
+
+    def test_parse_dates(self):
+        clear_date_caches()
+        values = np.array(['13/01/2020', '01/01/2020', None, '13/01/2020'], dtype=object)
+        np.testing.assert_array_equal(
+            parse_dates(values),
+            np.array(['2020-01-13', '2020-01-01', 'NaT', '2020-01-13'], dtype='datetime64[ns]'))
+        self.assertEqual(len(utils_date._PARSE_CACHE['%d/%m/%Y']), 2)
+        # reshaped to the input
+        self.assertEqual(parse_dates(values.reshape(2, 2)).shape, (2, 2))
+
+    def test_infer_date_format(self):
+        clear_date_caches()
+        self.assertEqual(infer_date_format(np.array(['01/02/2020', '25/02/2020'])), '%d/%m/%Y')
+        self.assertEqual(utils_date._FORMAT_CACHE, {'99/99/9999': '%d/%m/%Y'})
+        # the same shape of date, but month first, fails the cached format and is re-inferred
+        self.assertEqual(infer_date_format(np.array(['02/25/2020'])), '%m/%d/%Y')
+        # ambiguous dates are not cached
+        clear_date_caches()
+        self.assertEqual(infer_date_format(np.array(['01/02/2020'])), '%d/%m/%Y')
+        self.assertEqual(utils_date._FORMAT_CACHE, {})
+
+    def test_fixed_width_to_date(self):
+        dates = np.arange("1999-12-25", "2001-03-05", dtype='datetime64[D]')
+        for strings in (dates.astype(str),
+                        np.char.replace(dates.astype(str), "-", ""),
+                        np.char.replace(dates.astype(str), "-", "/").astype('S10')):
+            np.testing.assert_array_equal(fixed_width_to_date(strings), dates)
+        # layouts which are not fixed width, or are not valid dates, are left to parse_dates
+        self.assertIsNone(fixed_width_to_date(['2020-01-01', '20200101']))
+        self.assertIsNone(fixed_width_to_date(['13/01/2020']))
+        self.assertIsNone(fixed_width_to_date(['2019-02-29']))
+        self.assertIsNone(fixed_width_to_date(['2020-1-01']))
+
+    def test_parse_dates__fixed_width(self):
+        clear_date_caches()
+        np.testing.assert_array_equal(parse_dates(np.array(['20200131', '20200201'])),
+                                      np.array(['2020-01-31', '2020-02-01'], dtype='M8[ns]'))
+        self.assertEqual(utils_date._PARSE_CACHE, {})
+
+    def test_dates_to_str(self):
+        dates = np.array(['2020-01-05T13:00', '1999-12-31', 'NaT'], dtype='datetime64[ns]')
+        np.testing.assert_array_equal(dates_to_str(dates), ['20200105', '19991231', ''])
+        np.testing.assert_array_equal(dates_to_str(dates, sep="-"),
+                                      ['2020-01-05', '1999-12-31', ''])
+        np.testing.assert_array_equal(np_dt_to_str(self.dates), ['20100101', '20100102',
+                                                                 '20100103', '20100104'])
+
     def test_x2pdate(self):
         self.assertEqual(list(excel_date_to_np(xl_date=43100)),
                          [np.datetime64('2017-12-31')],
                          "Should be 2017-12-31 in a list")
 
+    def test_excel_to_datetime64(self):
+        # Excel treats 1900 as a leap year: serial 60 is 29 Feb 1900
+        np.testing.assert_array_equal(
+            excel_to_datetime64(np.array([1, 59, 60, 61, 43100])),
+            np.array(['1900-01-01', '1900-02-28', 'NaT', '1900-03-01', '2017-12-31'],
+                     dtype='datetime64[D]'))
+        np.testing.assert_array_equal(
+            excel_to_datetime64(np.array([43100.25, np.nan, -1.])),
+            np.array(['2017-12-31T06:00', 'NaT', 'NaT'], dtype='datetime64[ns]'))
+
+    def test_datetime64_to_excel(self):
+        serials = np.array([1, 59, 61, 43100])
+        np.testing.assert_array_equal(datetime64_to_excel(excel_to_datetime64(serials)), serials)
+        np.testing.assert_array_equal(
+            datetime64_to_excel(pd.DatetimeIndex(['2017-12-31 18:00', 'NaT'])), [43100.75, np.nan])
+        np.testing.assert_array_equal(
+            date_to_excel(pd.Series(pd.to_datetime(['2017-12-31 18:00']))), [43100])
+
+    def test_excel_serials_outside_ns_range(self):
+        # Excel's last date is far beyond the datetime64[ns] range
+        np.testing.assert_array_equal(
+            excel_to_datetime64(np.array([2958465, 2958466])),
+            np.array(['9999-12-31', 'NaT'], dtype='datetime64[D]'))
+        self.assertTrue(np.isnat(excel_to_datetime64(1e6)))
+        np.testing.assert_array_equal(
+            datetime64_to_excel(np.array(['3000-01-01', '9999-12-31', '1899-12-30'], 'M8[D]')),
+            [401769, 2958465, np.nan])
+        np.testing.assert_array_equal(
+            datetime64_to_excel(np.array([datetime.datetime(3000, 1, 1, 12), None])),
+            [401769.5, np.nan])
+
     def test_datetime_to_str(self):
         self.assertEqual(
             datetime_to_str(input_date=datetime.datetime(2020, 1, 1)),
@@ -48,5 +146,57 @@ class TestDateFuncs(unittest.TestCase):
         )
 
 
+class TestBusinessCalendar(unittest.TestCase):
+    def setUp(self) -> None:
+        # Christmas 2020 is a Friday, New Year 2021 a Friday
+        self.calendar = BusinessCalendar(holidays=['2021-01-01', '2020-12-25'], name="test")
+
+    def test_load_holidays(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "test.csv")
+            with open(path, "w") as fp:
+                fp.write("date,name\n# comment\n2021-01-01,New Year\n2020-12-25,Christmas\n")
+            holidays = load_holidays(path)
+            calendar = get_calendar(path)
+            self.assertIs(get_calendar(path), calendar)
+        np.testing.assert_array_equal(
+            holidays, np.array(['2020-12-25', '2021-01-01'], dtype='datetime64[D]'))
+        np.testing.assert_array_equal(calendar.holidays, holidays)
+
+    def test_busday_count(self):
+        start = np.array(['2020-12-21', '2020-12-28', '2021-01-04'], dtype='datetime64[D]')
+        end = pd.Series(pd.to_datetime(['2021-01-04', '2021-01-04', '2020-12-21']))
+        np.testing.assert_array_equal(self.calendar.busday_count(start, end), [8, 4, -8])
+        # weekdays only without a calendar
+        np.testing.assert_array_equal(busday_count(start, end), [10, 5, -10])
+
+    def test_busday_offset_and_roll(self):
+        dates = ['2020-12-24', '2020-12-25', '2020-12-26']
+        np.testing.assert_array_equal(
+            busday_offset(dates, 1, calendar=self.calendar),
+            np.array(['2020-12-28', '2020-12-29', '2020-12-29'], dtype='datetime64[D]'))
+        np.testing.assert_array_equal(
+            busday_roll(dates, roll="preceding", calendar=self.calendar),
+            np.array(['2020-12-24', '2020-12-24', '2020-12-24'], dtype='datetime64[D]'))
+        np.testing.assert_array_equal(self.calendar.is_busday(dates), [True, False, False])
+
+    def test_business_days(self):
+        days = self.calendar.business_days('2020-12-24', '2021-01-05')
+        self.assertEqual(len(days), self.calendar.busday_count('2020-12-24', '2021-01-05'))
+        self.assertNotIn(np.datetime64('2020-12-25'), days)
+        self.assertTrue(np.all(np.diff(days) > np.timedelta64(0, 'D')))
+        # outside the precomputed index
+        for start, end in [('1969-12-01', '1970-01-10'), ('2069-12-20', '2070-01-10')]:
+            days = self.calendar.business_days(start, end)
+            self.assertEqual(len(days), self.calendar.busday_count(start, end))
+            self.assertEqual(days[-1], self.calendar.roll(np.datetime64(end) - 1, 'preceding'))
+
+    def test_annualisation_factor(self):
+        dates = pd.date_range('2020-01-01', '2020-12-31', freq='B')
+        self.assertAlmostEqual(annualisation_factor(dates), len(dates) * 365.25 / 366)
+        self.assertAlmostEqual(annualisation_factor(dates, calendar=self.calendar),
+                               (len(dates) - 1) * 365.25 / 366)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -6,7 +6,8 @@ import pandas as pd
 
 from utils_generic import (average, difference, flatten_dict, return_dict_keys,
                            return_dict_values, change_dict_keys, df_columns_to_dict,
-                           convert_config_dates, drop_null_columns_df)
+                           convert_config_dates, drop_null_columns_df, match, MatchIndex,
+                           array_key)
 
 np.random.seed(10)
 
@@ -80,6 +81,14 @@ class TestUtilsGeneric(unittest.TestCase):
              'DATE': np.datetime64('2010-12-25')}
         )
 
+    def test_array_key(self):
+        values = np.arange(6.).reshape(3, 2)
+        key = array_key(values, method='sample')
+        self.assertEqual(key, array_key(pd.DataFrame(values.astype(int)), method='sample'))
+        self.assertNotEqual(key, array_key(values * 2, method='sample'))
+        self.assertNotEqual(key, array_key(values.reshape(2, 3), method='sample'))
+        self.assertNotEqual(key, array_key(values, method='ewma'))
+
     def test_drop_null_columns_df(self):
         # used random numbers using np.random.seed(1)
         pd.testing.assert_frame_equal(
@@ -103,5 +112,39 @@ class TestUtilsGeneric(unittest.TestCase):
         )
 
 
+class TestMatch(unittest.TestCase):
+    def test_match(self):
+        np.testing.assert_array_equal(
+            match(['b', 'a', 'c'], pd.Series(['a', 'b', 'a', 'c'])), [1, 0, 3])
+
+    def test_match__not_strict(self):
+        np.testing.assert_array_equal(
+            match(np.array([3, np.nan, 9]), [1, 3, 3, np.nan], strict=False), [1, np.nan, np.nan])
+
+    def test_match__strict_missing(self):
+        with self.assertRaises(AssertionError):
+            match(['a', 'd'], ['a', 'b'])
+
+    def test_match__unorderable(self):
+        # None cannot be ordered against strings, NaN never matches
+        np.testing.assert_array_equal(match([None, 'a'], ['a', None], strict=False), [1, 0])
+        np.testing.assert_array_equal(
+            match(np.array([1., np.nan]), np.array([np.nan, 1.], dtype=object), strict=False),
+            [1, np.nan])
+        np.testing.assert_array_equal(match(['a', None], ['b', 'a'], strict=False), [1, np.nan])
+
+    def test_match__prebuilt_index(self):
+        random_state = np.random.RandomState(3)
+        y = random_state.randint(0, 50, 40)
+        index = MatchIndex(y)
+        self.assertEqual(len(index), 40)
+        for _ in range(3):
+            x = random_state.randint(0, 60, 100)
+            # same result as comparing every pair of elements
+            mask = x[:, None] == y
+            expected = np.where(mask.any(axis=1), np.argmax(mask, axis=1), np.nan)
+            np.testing.assert_array_equal(match(x, index, strict=False), expected)
+
+
 if __name__ == '__main__':
     unittest.main()
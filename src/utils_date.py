@@ -3,31 +3,324 @@ Created 17 June 2020
 Generic utility methods for handling dates
 """
 import datetime
+import os
 import re
-from typing import Union, List
+import threading
+from typing import Iterable, List, Union
 
 import numpy as np
 import pandas as pd
 
+from src.get_paths import get_data_path
 from src.utils_generic import to_array
 
+FIXED_WIDTH_SEPARATORS = ("-", "/")
+_MONTH_DAYS = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+NS_DATE_BOUNDS = np.array(["1677-09-22", "2262-04-11"], dtype="datetime64[D]")
+EXCEL_EPOCH = np.datetime64("1899-12-30", "D")
+EXCEL_LEAP_BUG_SERIAL = 60  # Excel's 29 Feb 1900
+EXCEL_MAX_SERIAL = 2958465  # 31 Dec 9999
+DEFAULT_WEEKMASK = "1111100"  # Monday to Friday
+CALENDAR_DIR = get_data_path("calendars")
+DATE_SAMPLE_SIZE = 1000
+DATE_CACHE_SIZE = 1000000  # parsed dates kept per format before the parse cache is reset
 
-def np_dt_to_str(d: np.datetime64) -> str:
-    """Convert from np.datetime64 to str without hyphens"""
-    return d.astype(str).replace("-", "")
+# process wide caches: {value pattern, e.g. "99/99/9999": format} for formats inferred without
+# ambiguity, and {format: {date string: datetime64[ns] as int64}}
+_FORMAT_CACHE = {}
+_PARSE_CACHE = {}
+
+
+def np_dt_to_str(d: Union[np.datetime64, np.ndarray]) -> Union[str, np.ndarray]:
+    """Convert from np.datetime64 to str without hyphens, an array is converted in bulk
+    (see dates_to_str)"""
+    if np.ndim(d) == 0:
+        return d.astype(str).replace("-", "")
+    return dates_to_str(d)
+
+
+def dates_to_str(dates: Union[np.ndarray, pd.Series], sep: str = "") -> np.ndarray:
+    """
+    Vectorised datetime64 to fixed width strings, the inverse of fixed_width_to_date
+
+    Args:
+        dates: Array of datetime64 (any unit, time of day is dropped)
+        sep: Separator between year, month and day, "" for YYYYMMDD or "-" for YYYY-MM-DD
+
+    Returns:
+        np.array: unicode strings, empty for NaT
+    """
+    days = np.asarray(dates).astype("datetime64[D]")
+    is_nat = np.isnat(days)
+
+    # civil date from days since 1970-01-01, integer arithmetic only
+    z = np.where(is_nat, 0, days.view(np.int64)) + 719468
+    era = z // 146097
+    day_of_era = z - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524
+                   - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    shifted_month = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * shifted_month + 2) // 5 + 1
+    month = shifted_month + np.where(shifted_month < 10, 3, -9)
+    year = year_of_era + era * 400 + (month <= 2)
+
+    # write the code points of each field into a (n, width) matrix, viewed as unicode strings
+    columns = []
+    for i, (value, width) in enumerate([(year, 4), (month, 2), (day, 2)]):
+        if i and sep:
+            columns.append(np.full(days.shape + (1,), ord(sep), dtype=np.uint32))
+        powers = 10 ** np.arange(width - 1, -1, -1)
+        columns.append((value[..., None] // powers % 10 + ord("0")).astype(np.uint32))
+    width = 8 + 2 * len(sep)
+    chars = np.ascontiguousarray(np.concatenate(columns, axis=-1))
+    out = chars.view(f"U{width}").reshape(days.shape)
+    out[is_nat] = ""
+    return out
+
+
+def fixed_width_to_date(values: Union[np.ndarray, List[str]]) -> Union[np.ndarray, None]:
+    """
+    Fast path for fixed width YYYY-MM-DD (or YYYY/MM/DD) and YYYYMMDD date strings: the strings are
+    viewed as a matrix of ascii bytes and the year, month and day come from integer arithmetic on
+    the digit columns, with no per string parsing.
+
+    Args:
+        values: Date strings, all in the same layout
+
+    Returns:
+        np.array: datetime64[D] of the same shape as values, None if any value does not match one
+        of the layouts or is not a valid date (use parse_dates then)
+    """
+    arr = np.asarray(values)
+    if arr.dtype.kind not in "US" or arr.size == 0:
+        return None
+
+    # one row of character codes per string: bytes for S, UCS4 code points for U, zero padded
+    code_type = np.uint8 if arr.dtype.kind == "S" else np.uint32
+    n_chars = arr.dtype.itemsize // np.dtype(code_type).itemsize
+    chars = np.ascontiguousarray(arr).reshape(-1).view(code_type).reshape(-1, n_chars)
+    lengths = (chars != 0).sum(axis=1)
+    width = lengths[0]
+    if width not in (8, 10) or (lengths != width).any():
+        return None
+
+    # positions of the year, month and day digits
+    if width == 10:
+        seps = chars[:, [4, 7]]
+        if chr(seps[0, 0]) not in FIXED_WIDTH_SEPARATORS or (seps != seps[0, 0]).any():
+            return None
+        positions = (0, 1, 2, 3, 5, 6, 8, 9)
+    else:
+        positions = tuple(range(8))
+    digits = [chars[:, i].astype(np.int32) - ord("0") for i in positions]
+    if any(((i < 0) | (i > 9)).any() for i in digits):
+        return None
+
+    year = digits[0] * 1000 + digits[1] * 100 + digits[2] * 10 + digits[3]
+    month = digits[4] * 10 + digits[5]
+    day = digits[6] * 10 + digits[7]
+    is_leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    month_days = _MONTH_DAYS[np.clip(month, 0, 12)] + ((month == 2) & is_leap)
+    if ((month < 1) | (month > 12) | (day < 1) | (day > month_days)).any():
+        return None
+
+    # days since 1970-01-01 of the (proleptic Gregorian) date, integer arithmetic only
+    year = year - (month <= 2)
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    dates = (era * 146097 + day_of_era - 719468).astype("datetime64[D]")
+    return dates.reshape(arr.shape)
+
+
+def _find_format(s: np.ndarray) -> Union[str, None]:
+    """
+    Infer the strptime format of an array of date strings, None if it cannot be inferred
+
+    Handles dates with the following formats:
+    '%Y-%m-%d', '%Y/%m/%d', '%d-%m-%Y', '%d/%m/%Y', '%d-%b-%Y', '%d/%b/%Y' (and %y years)
+    """
+    try:
+        sep = "/"
+        if pd.Series(s).str.contains("-").all():
+            sep = "-"
+        x = pd.Series(s).str.split("/|-", expand=True).values
+        x = x.astype(int)
+        month_pattern = "%m"
+    except ValueError:
+        month_pattern = "%b"
+
+    year_col, month_col, date_col = None, None, None
+    for i in range(x.shape[-1]):
+        if x[:, i].dtype != object:
+            if all(x[:, i].astype(int) > 1000):
+                year_col = i
+            elif all(x[:, i].astype(int) <= 12):
+                month_col = i
+            elif all(x[:, i].astype(int) <= 31):
+                date_col = i
+        else:
+            date_col, month_col, year_col = 0, 1, 2  # only month can be string and must be in the middle
+            break
+
+    if year_col is None:
+        return None  # cannot find year in date string, let pandas do it
+    try:
+        year_pattern = "%Y" if (x[:, year_col].astype(int) > 1000).all() else "%y"
+    except (ValueError, TypeError, IndexError):
+        return None  # last resort couldn"t figure format out, let pandas do it
+
+    month_and_date = lambda m, d, month_pattern: sep.join(
+        ("%d", "%s" % month_pattern)) if m > d else sep.join(
+        ("%s" % month_pattern, "%d"))
+
+    if year_col == 0:
+        if month_col is not None and date_col is not None:
+            fmt = sep.join((year_pattern, month_and_date(month_col, date_col, month_pattern)))
+        else:
+            fmt = sep.join(
+                (year_pattern, "%s" % month_pattern, "%d"))  # default to non US style
+    elif year_col == 2:
+        if month_col is not None and date_col is not None:
+            fmt = sep.join((month_and_date(month_col, date_col, month_pattern), year_pattern))
+        else:
+            fmt = sep.join(
+                ("%d", "%s" % month_pattern, year_pattern))  # default to non US style
+    else:
+        raise ValueError("year in the middle of date separators!")
+
+    return fmt
+
+
+def _date_pattern(value: str) -> str:
+    """Shape of a date string, digits as 9 and letters as a, e.g. '99/aaa/9999'"""
+    return re.sub("[a-zA-Z]", "a", re.sub("[0-9]", "9", value))
+
+
+def infer_date_format(values: np.ndarray,
+                      sample_size: int = DATE_SAMPLE_SIZE) -> Union[str, None]:
+    """
+    Infer the format of unique date strings from a sample of them. Formats which are not
+    ambiguous (day and month could not be swapped) are cached by the shape of the strings, so
+    later calls with the same shape of dates only check the sample parses with the cached format.
+
+    Args:
+        values: Unique date strings
+        sample_size: Number of values the format is inferred from
+
+    Returns:
+        str: strptime format, None if it cannot be inferred (pandas will then infer it per date)
+    """
+    if len(values) == 0:
+        return None
+    pattern = _date_pattern(str(values[0]))
+    sample = values[np.linspace(0, len(values) - 1, min(sample_size, len(values))).astype(int)]
+    if pattern in _FORMAT_CACHE:
+        try:
+            # the same shape could be day or month first, so check the sample still parses
+            pd.to_datetime(sample, format=_FORMAT_CACHE[pattern])
+            return _FORMAT_CACHE[pattern]
+        except ValueError:
+            pass
+
+    fmt = _find_format(sample)
+    if fmt is not None and "%b" not in fmt:
+        # only cache when a day above 12 showed which part is the day
+        parts = pd.Series(sample).str.split("/|-", expand=True).values.astype(int)
+        if (parts > 12).any(axis=0).sum() >= 2:
+            _FORMAT_CACHE[pattern] = fmt
+    return fmt
+
+
+def _fixed_width_to_ns(values: np.ndarray) -> Union[np.ndarray, None]:
+    """fixed_width_to_date as datetime64[ns], None (so pandas raises) when out of the ns range"""
+    dates = fixed_width_to_date(values)
+    if dates is None or (dates < NS_DATE_BOUNDS[0]).any() or (dates > NS_DATE_BOUNDS[1]).any():
+        return None
+    return dates.astype("datetime64[ns]")
+
+
+def parse_dates(values: Union[np.ndarray, pd.Series, List[str]],
+                fmt: str = None,
+                use_cache: bool = True) -> np.ndarray:
+    """
+    Parse date strings to datetime64[ns]. Dates are often repeated, so only the unique values
+    are parsed (pd.factorize, as np.unique with return_inverse but hashing rather than sorting the
+    strings) and the result is rebuilt by integer indexing. YYYY-MM-DD and YYYYMMDD strings take
+    the fixed_width_to_date fast path.
+    Parsed values are kept in a process wide cache, so dates seen in earlier calls are not parsed
+    again.
+
+    Args:
+        values: Date strings, may contain None/NaN (returned as NaT)
+        fmt: strptime format, inferred from a sample of the values by default
+        use_cache: Use (and fill) the process wide parse cache
+
+    Returns:
+        np.array: datetime64[ns] of the same shape as values
+    """
+    if fmt is None or fmt in ("%Y-%m-%d", "%Y/%m/%d", "%Y%m%d"):
+        # string arrays (which cannot hold missing values) can go straight to the fast path
+        if np.asarray(values).dtype.kind in "US":
+            dates = _fixed_width_to_ns(values)
+            if dates is not None:
+                return dates
+
+    arr = np.asarray(values, dtype=object)
+    shape, arr = arr.shape, arr.ravel()
+    out = np.full(arr.shape, np.datetime64("NaT"), dtype="datetime64[ns]")
+
+    # hash based equivalent of np.unique(return_inverse=True), without sorting every string
+    inverse, unique_values = pd.factorize(arr)
+    is_valid = inverse >= 0  # missing values are coded -1
+    if not is_valid.any():
+        return out.reshape(shape)
+    unique_values, inverse = np.asarray(unique_values).astype(str), inverse[is_valid]
+    if fmt is None or fmt in ("%Y-%m-%d", "%Y/%m/%d", "%Y%m%d"):
+        dates = _fixed_width_to_ns(unique_values)
+        if dates is not None:
+            out[is_valid] = dates[inverse]
+            return out.reshape(shape)
+
+    fmt = fmt or infer_date_format(unique_values)
+
+    cache = _PARSE_CACHE.setdefault(fmt, {}) if use_cache else {}
+    parsed = np.fromiter((cache.get(i, np.iinfo(np.int64).min) for i in unique_values),
+                         dtype=np.int64, count=len(unique_values))
+    is_new = parsed == np.iinfo(np.int64).min  # NaT is the min int64, never a cached value
+    if is_new.any():
+        new_dates = pd.to_datetime(unique_values[is_new], format=fmt).values.astype(np.int64)
+        parsed[is_new] = new_dates
+        if use_cache:
+            if len(cache) + len(new_dates) > DATE_CACHE_SIZE:
+                cache.clear()
+            cache.update(zip(unique_values[is_new], new_dates))
+
+    out[is_valid] = parsed.view("datetime64[ns]")[inverse]
+    return out.reshape(shape)
+
+
+def clear_date_caches() -> None:
+    """Reset the process wide format and parse caches"""
+    _FORMAT_CACHE.clear()
+    _PARSE_CACHE.clear()
 
 
 def char_to_date(
-        s: Union[pd.DataFrame, pd.Series, np.ndarray, List[str], str]
-) -> Union[pd.Series, pd.DataFrame]:
+        s: Union[pd.DataFrame, pd.Series, np.ndarray, List[str], str],
+        inplace: bool = False
+) -> Union[pd.Series, pd.DataFrame, np.ndarray]:
     """
-    Turning date from object to np.datetime64
+    Turning date from object to np.datetime64, see parse_dates
 
     Handles dates with the following formats:
     '%Y-%m-%d', '%Y/%m/%d', '%d-%m-%Y', '%d/%m/%Y', '%d-%b-%Y', '%d/%b/%Y'
 
     Args
         s: Pass in dataframe if multi column process is needed
+        inplace: For a dataframe, convert the columns of s rather than of a copy
 
     Returns
         pd.Series
@@ -38,156 +331,124 @@ def char_to_date(
         This method can handle EITHER "/" or "-" date separators but not a combination of both.
         Users should check that there are no mixtures of separators if s is an array
     """
-
-    def find_format(s):
-        try:
-            sep = "/"
-            if pd.Series(s).str.contains("-").all():
-                sep = "-"
-            x = pd.Series(s).str.split("/|-", expand=True).values
-            x = x.astype(int)
-            month_pattern = "%m"
-        except ValueError:
-            month_pattern = "%b"
-
-        year_col, month_col, date_col = None, None, None
-        for i in range(x.shape[-1]):
-            if x[:, i].dtype != object:
-                if all(x[:, i].astype(int) > 1000):
-                    year_col = i
-                elif all(x[:, i].astype(int) <= 12):
-                    month_col = i
-                elif all(x[:, i].astype(int) <= 31):
-                    date_col = i
-            else:
-                date_col, month_col, year_col = 0, 1, 2  # only month can be string and must be in the middle
-                break
-
-        assert year_col is not None, "cannot find year in date string"
-        try:
-            year_pattern = "%Y" if (x[:, year_col].astype(int) > 1000).all() else "%y"
-        except (ValueError, TypeError, IndexError):
-            return None  # last resort couldn"t figure format out, let pandas do it
-
-        month_and_date = lambda m, d, month_pattern: sep.join(
-            ("%d", "%s" % month_pattern)) if m > d else sep.join(
-            ("%s" % month_pattern, "%d"))
-
-        if year_col == 0:
-            if month_col is not None and date_col is not None:
-                fmt = sep.join((year_pattern, month_and_date(month_col, date_col, month_pattern)))
-            else:
-                fmt = sep.join(
-                    (year_pattern, "%s" % month_pattern, "%d"))  # default to non US style
-        elif year_col == 2:
-            if month_col is not None and date_col is not None:
-                fmt = sep.join((month_and_date(month_col, date_col, month_pattern), year_pattern))
-            else:
-                fmt = sep.join(
-                    ("%d", "%s" % month_pattern, year_pattern))  # default to non US style
-        else:
-            raise ValueError("year in the middle of date separators!")
-
-        return fmt
-
-    # This is an extremely fast approach to datetime parsing. Some dates are often repeated. Rather than
-    # re-parse these, we store all unique dates, parse them, and use a lookup to convert all dates.
-    # TODO: each column/Series should be passed back into this function
     if isinstance(s, pd.DataFrame):
-        # TODO: add an inplace argument, to allow change columns without making copy
-        out = s.copy(True)  # this is the bottleneck
-        for columnName, column in out.iteritems():
+        # converted columns are replaced rather than modified, so a shallow copy leaves s unchanged
+        out = s if inplace else s.copy(deep=False)
+        for columnName, column in out.items():
             # loop through all the columns passed in
             if "date" in columnName.lower():
                 if column.dtype != "<M8[ns]" and ~column.isnull().all():
                     # if date is provided as a string then ignore and set to int
                     try:
-                        col = column.astype(int)
-                        out[columnName] = col
-                    except:
-                        # find the date columns(case in-sensitive), if pandas cant find the format, ignore error and maintain input
-                        uDates = pd.to_datetime(column.unique(),
-                                                format=find_format(column.unique()),
-                                                errors="ignore")
-                        dates = dict(zip(column.unique(), uDates.tolist()))
-                        out[columnName] = column.map(dates.get)
+                        out[columnName] = column.astype(int)
+                    except (ValueError, TypeError):
+                        # if pandas cant find the format, ignore error and maintain input
+                        try:
+                            out[columnName] = parse_dates(column.values)
+                        except (ValueError, TypeError):
+                            pass
 
         return out
-    # TODO: remove this elif, leaving for now to avoid possible breaks
+
     elif isinstance(s, pd.Series):
         if s.dtype == "<M8[ns]":
             return s
-        uDates = pd.to_datetime(s.unique(), format=find_format(s.unique()))
-        dates = dict(zip(s.unique(), uDates.tolist()))
+        return pd.Series(parse_dates(s.values), index=s.index, name=s.name)
 
-        return s.map(dates.get)
-
-    # numpy array - NOTE: below will work for pd.Series
-    elif isinstance(s, (np.ndarray, pd.Series)):
+    elif isinstance(s, np.ndarray):
         # check if dtype is some variation of datetime64
         if bool(re.search('^datetime64', str(s.dtype))):
             return s
-        # create a mapping of unique dates
-        else:
-            unique_s = np.unique(s)
-            uDates = pd.to_datetime(unique_s, format=find_format(unique_s))
-            # uDates is an Index with values datetime64[ns]
-            dates = dict(zip(unique_s, uDates.values))
-            if isinstance(s, np.ndarray):
-                return np.vectorize(dates.get)(s)
-            # else assume is pd.Series and use map method
-            else:
-                return s.map(dates.get)
+        return parse_dates(s)
 
     # otherwise convert input to array and run again
     else:
         x, = to_array(s)
         return char_to_date(x)
 
-    # This is an extremely fast approach to datetime parsing. Some dates are often repeated.
-    # Rather than
-    # re-parse these, we store all unique dates, parse them, and use a lookup to convert all dates.
-    if isinstance(s, pd.DataFrame):
-        out = s.copy(True)  # this is the bottleneck
-        for columnName, column in out.iteritems():
-            # loop through all the columns passed in
-            if 'date' in columnName.lower():
-                if column.dtype != '<M8[ns]' and \
-                        ~column.isnull().all() and \
-                        ~column.str.contains('^[a-zA-z]').all():
-                    # if date is provided as a string then ignore and set to int
-                    try:
-                        col = column.astype(int)
-                        out[columnName] = col
-                    except:
-                        # find the date columns(case in-sensitive), if pandas cant
-                        # find the format, ignore error and maintain input
-                        unique_dates = pd.to_datetime(column.unique(),
-                                                      format=findFormat(column.unique()),
-                                                      errors='ignore')
-                        dates = dict(zip(column.unique(), unique_dates.tolist()))
-                        out[columnName] = column.map(dates.get)
 
-        return out
+def excel_to_datetime64(serials: Union[np.ndarray, pd.Series, List[float], float]) -> np.ndarray:
+    """
+    Bulk Excel (1900 date system) serial numbers to datetime64, without Python objects
 
-    else:
-        if s.dtype == '<M8[ns]':
-            return s
-        unique_dates = pd.to_datetime(s.unique(), format=findFormat(s.unique()))
-        dates = dict(zip(s.unique(), unique_dates.tolist()))
+    Excel counts 1900 as a leap year, so serial 60 is the non existent 29 Feb 1900 (returned as
+    NaT) and serials before it are one day later than a plain count from 30 Dec 1899.
+
+    Args:
+        serials: Excel serials, integers for dates or floats with the time of day as the fraction
+            (rounded to the microsecond). NaN, infinite, negative and serials after
+            EXCEL_MAX_SERIAL are returned as NaT, as are float serials after the datetime64[ns]
+            range (11 Apr 2262)
+
+    Returns:
+        np.array: datetime64[D] for integer serials, datetime64[ns] for float serials
+    """
+    arr = np.asarray(serials)
+    shape, arr = arr.shape, arr.reshape(-1)
+    if arr.dtype.kind in "iub":
+        is_nat = (arr < 0) | (arr == EXCEL_LEAP_BUG_SERIAL) | (arr > EXCEL_MAX_SERIAL)
+        days = np.where(is_nat, 0, arr).astype(np.int64)
+        days = days + (days < EXCEL_LEAP_BUG_SERIAL)
+        out = (EXCEL_EPOCH + days).astype("datetime64[D]")
+        out[is_nat] = np.datetime64("NaT")
+        return out.reshape(shape)
+
+    arr = arr.astype(np.float64)
+    is_nat = ~np.isfinite(arr) | (arr < 0) | ((arr >= EXCEL_LEAP_BUG_SERIAL)
+                                              & (arr < EXCEL_LEAP_BUG_SERIAL + 1))
+    # checked in days before converting, so late serials cannot wrap around the ns range
+    is_nat |= arr >= (NS_DATE_BOUNDS[1] - EXCEL_EPOCH).astype(np.int64)
+    arr = np.where(is_nat, 0., arr)
+    whole_days = np.floor(arr)
+    micros = np.round((arr - whole_days) * 86400e6).astype(np.int64)
+    days = whole_days.astype(np.int64) + (whole_days < EXCEL_LEAP_BUG_SERIAL)
+    out = (EXCEL_EPOCH + days).astype("datetime64[ns]") + micros.astype("timedelta64[us]")
+    out[is_nat] = np.datetime64("NaT")
+    return out.reshape(shape)
+
+
+def datetime64_to_excel(dates: Union[np.ndarray, pd.Series, pd.DatetimeIndex],
+                        fractional: bool = True) -> np.ndarray:
+    """
+    Bulk datetime64 to Excel (1900 date system) serial numbers, the inverse of excel_to_datetime64
+
+    Args:
+        dates: Array like of datetime64 (any unit), Series, DatetimeIndex or Timestamp
+        fractional: Include the time of day as the fraction of the serial, otherwise whole days
 
-        return s.map(dates.get)
+    Returns:
+        np.array: int64 serials for whole days with no NaT, otherwise float64 with NaN for NaT
+        and for dates outside Excel's range (before 31 Dec 1899 or after 31 Dec 9999)
+    """
+    arr = np.asarray(dates)
+    shape, arr = arr.shape, arr.reshape(-1)
+    if arr.dtype.kind == "O":  # e.g. Timestamps or datetimes, which may be outside the ns range
+        arr = np.array([np.datetime64("NaT") if pd.isna(x) else np.datetime64(x, "us")
+                        for x in arr], dtype="datetime64[us]")
+    # days in the unit of the input, so dates outside the ns range do not overflow
+    days = arr.astype("datetime64[D]")
+    whole_days = (days - EXCEL_EPOCH).astype(np.int64)
+    whole_days = whole_days - (whole_days <= EXCEL_LEAP_BUG_SERIAL)
+    is_nan = np.isnat(arr) | (whole_days < 0) | (whole_days > EXCEL_MAX_SERIAL)
+
+    if fractional and (arr != days).any():
+        serials = whole_days + (arr - days) / np.timedelta64(1, "D")
+    elif is_nan.any():
+        serials = whole_days.astype(np.float64)
+    else:
+        return whole_days.reshape(shape)
+    serials[is_nan] = np.nan
+    return serials.reshape(shape)
 
 
 def excel_date_to_np(xl_date):
-    """Excel date serial (as int) to numpy datetime"""
-    return np.array(['1899-12-30'], dtype='datetime64[D]') + xl_date
+    """Excel date serial(s) to numpy datetime, see excel_to_datetime64"""
+    return np.atleast_1d(excel_to_datetime64(xl_date))
 
 
 def date_to_excel(pdate):
-    """converts datetime to Excel date serial"""
-    delta = pdate.to_datetime() - datetime.datetime(1899, 12, 30)
-    return (delta.days.astype(float) + delta.seconds.astype(float) / 86400).astype(int)
+    """converts datetime(s) to whole day Excel date serial(s), see datetime64_to_excel"""
+    return datetime64_to_excel(pdate, fractional=False)
 
 
 def time_delta_to_days(td):
@@ -200,5 +461,172 @@ def datetime_to_str(input_date: datetime.datetime):
     return datetime.datetime.strftime(input_date, format="%Y%m%d")
 
 
+def load_holidays(calendar: str) -> np.ndarray:
+    """
+    Holidays of an exchange from a local file, one date per line (e.g. YYYY-MM-DD) in the first
+    column. Lines which are not dates (a header or # comments) are skipped.
+
+    Args:
+        calendar: Name of a file in CALENDAR_DIR (e.g. "NYSE" for NYSE.csv), or a path to a file
+
+    Returns:
+        np.array: sorted unique holidays as datetime64[D]
+    """
+    path = calendar if os.path.isfile(calendar) else os.path.join(CALENDAR_DIR, f"{calendar}.csv")
+    assert os.path.isfile(path), f"No holiday file for {calendar} in {CALENDAR_DIR}"
+
+    values = pd.read_csv(path, header=None, usecols=[0], comment="#", dtype=str)[0]
+    dates = pd.to_datetime(values.str.strip(), errors="coerce").dropna()
+    return np.unique(dates.values.astype("datetime64[D]"))
+
+
+class BusinessCalendar:
+    """
+    Business days of an exchange: a weekmask and a set of holidays, with a precomputed sorted
+    index of business days so counts and offsets over arrays of dates are array lookups
+
+    Args:
+        holidays: Holiday dates
+        weekmask: Seven 0/1 flags for Monday to Sunday, "1111100" for a Monday to Friday week
+        name: Name of the calendar, for reference
+    """
+    __slots__ = ("name", "holidays", "weekmask", "busdaycal", "index", "index_range")
+
+    def __init__(self,
+                 holidays: Iterable = (),
+                 weekmask: str = DEFAULT_WEEKMASK,
+                 name: str = None):
+        self.name = name
+        self.weekmask = weekmask
+        self.holidays = np.unique(np.asarray(list(holidays), dtype="datetime64[D]"))
+        self.busdaycal = np.busdaycalendar(weekmask=weekmask, holidays=self.holidays)
+
+        # business days over the holiday years (or 1970 to 2070 when there are no holidays)
+        start, end = np.datetime64("1970-01-01"), np.datetime64("2070-01-01")
+        if len(self.holidays):
+            start = min(start, self.holidays[0].astype("datetime64[Y]").astype("datetime64[D]"))
+            end = max(end, (self.holidays[-1].astype("datetime64[Y]") + 1).astype("datetime64[D]"))
+        days = np.arange(start, end, dtype="datetime64[D]")
+        self.index = days[np.is_busday(days, busdaycal=self.busdaycal)]
+        self.index_range = (start, end)
+
+    def is_busday(self, dates) -> np.ndarray:
+        """True for each date that is a business day"""
+        return np.is_busday(_to_days(dates), busdaycal=self.busdaycal)
+
+    def busday_count(self, start_dates, end_dates) -> np.ndarray:
+        """Business days in [start, end) for each pair of dates (negative if end is before start)"""
+        return np.busday_count(_to_days(start_dates), _to_days(end_dates), busdaycal=self.busdaycal)
+
+    def busday_offset(self, dates, offsets=0, roll: str = "following") -> np.ndarray:
+        """
+        Move each date by a number of business days, after rolling dates which are not business
+        days (see roll)
+        """
+        return np.busday_offset(_to_days(dates), offsets, roll=roll, busdaycal=self.busdaycal)
+
+    def roll(self, dates, roll: str = "following") -> np.ndarray:
+        """
+        Roll dates which are not business days: "following", "preceding", "modifiedfollowing"
+        (following unless it changes month) or "modifiedpreceding"
+        """
+        return self.busday_offset(dates, 0, roll=roll)
+
+    def business_days(self, start_date, end_date) -> np.ndarray:
+        """Business days in [start_date, end_date), from the precomputed index when the dates
+        fall inside index_range"""
+        start_date, end_date = _to_days([start_date, end_date])
+        if self.index_range[0] <= start_date and end_date <= self.index_range[1]:
+            start, end = np.searchsorted(self.index, [start_date, end_date])
+            return self.index[start:end]
+        days = np.arange(start_date, end_date, dtype="datetime64[D]")
+        return days[np.is_busday(days, busdaycal=self.busdaycal)]
+
+    def periods_per_year(self, start_date=None, end_date=None) -> float:
+        """
+        Average business days per year between the dates, the annualisation factor of daily data
+        (use as periods_per_year in utils_finance). Defaults to the whole index.
+        """
+        start = _to_days(start_date) if start_date is not None else self.index[0]
+        end = _to_days(end_date) if end_date is not None else self.index[-1] + 1
+        years = (end - start).astype(np.int64) / 365.25
+        assert years > 0, "end_date must be after start_date"
+        return float(self.busday_count(start, end)) / years
+
+
+def _to_days(dates) -> np.ndarray:
+    """Dates (strings, datetime64, pd.Series/DatetimeIndex or Timestamps) as datetime64[D]"""
+    if isinstance(dates, (pd.Series, pd.Index)):
+        return dates.values.astype("datetime64[D]")
+    if isinstance(dates, (pd.Timestamp, datetime.date)):
+        return np.datetime64(pd.Timestamp(dates).date(), "D")
+    arr = np.asarray(dates)
+    if arr.dtype.kind == "O":
+        arr = pd.to_datetime(arr.ravel()).values.reshape(arr.shape)
+    return arr.astype("datetime64[D]")
+
+
+_CALENDARS = {}
+_CALENDARS_LOCK = threading.Lock()
+
+
+def get_calendar(calendar: Union[str, BusinessCalendar, None] = None) -> BusinessCalendar:
+    """
+    Business calendar by name, loading the holiday file the first time it is used and reusing it
+    for the rest of the process
+
+    Args:
+        calendar: Name (or path) of a holiday file, see load_holidays. None for weekdays only
+
+    Returns:
+        BusinessCalendar
+    """
+    if isinstance(calendar, BusinessCalendar):
+        return calendar
+    with _CALENDARS_LOCK:
+        if calendar not in _CALENDARS:
+            holidays = () if calendar is None else load_holidays(calendar)
+            _CALENDARS[calendar] = BusinessCalendar(holidays=holidays, name=calendar)
+        return _CALENDARS[calendar]
+
+
+def busday_count(start_dates, end_dates, calendar: Union[str, BusinessCalendar] = None):
+    """Business days in [start, end) for arrays of dates, see BusinessCalendar.busday_count"""
+    return get_calendar(calendar).busday_count(start_dates, end_dates)
+
+
+def busday_offset(dates, offsets=0, roll: str = "following",
+                  calendar: Union[str, BusinessCalendar] = None):
+    """Move arrays of dates by business days, see BusinessCalendar.busday_offset"""
+    return get_calendar(calendar).busday_offset(dates, offsets, roll=roll)
+
+
+def busday_roll(dates, roll: str = "following", calendar: Union[str, BusinessCalendar] = None):
+    """Roll arrays of dates onto business days, see BusinessCalendar.roll"""
+    return get_calendar(calendar).roll(dates, roll=roll)
+
+
+def time_delta_to_busdays(start_dates, end_dates,
+                          calendar: Union[str, BusinessCalendar] = None) -> np.ndarray:
+    """Business day counterpart of time_delta_to_days: business days from start to end dates"""
+    return busday_count(start_dates, end_dates, calendar=calendar)
+
+
+def annualisation_factor(dates, calendar: Union[str, BusinessCalendar] = None) -> float:
+    """
+    Business days per year over the span of dates (e.g. the index of a price dataframe), to
+    annualise daily returns with actual trading days rather than a fixed 252
+
+    Args:
+        dates: Dates of the data, only the first and last are used
+        calendar: Name of a holiday file or a BusinessCalendar, None for weekdays only
+
+    Returns:
+        float: periods_per_year for utils_finance
+    """
+    days = _to_days(dates)
+    return get_calendar(calendar).periods_per_year(days.min(), days.max() + 1)
+
+
 if __name__ == "__main__":
     char_to_date(np.array(['2020-08-20'], dtype=np.datetime64))